@@ -2,21 +2,25 @@ import os
 import tempfile
 import torch
 import streamlit as st
-import whisper
-import pysrt
-import numpy as np
 import warnings
-import collections
-import contextlib
-import wave
 import subprocess
-from tqdm import tqdm
 from datetime import timedelta
 import time
-import re
+import contextlib
 from dotenv import load_dotenv
-from openai import OpenAI
-import anthropic
+from model_cache import get_registry, default_device, resolve_dtype, is_smaller_model, INT8
+from vad import detect_voice_segments, pack_segments, StreamingVAD, DEFAULT_VAD_WORKERS
+from audio_io import decode_audio, stream_audio, probe_duration, pcm_duration, SAMPLE_RATE
+from transcription import BatchTranscriber, TranscriptionCache, hash_bytes, MAX_STREAM_SEGMENT_SECONDS
+from jobs import JobCheckpoint, make_job_id
+from job_queue import JobQueue, QueueFullError
+from subtitle_format import srt_to_vtt
+from metrics import JobMetrics
+from progress import ProgressEstimator
+from cpu_threads import get_scheduler, configure_threads, DEFAULT_INTRA_OP_THREADS, DEFAULT_INTER_OP_THREADS
+from segmentation import build_cues, to_subrip
+from llm_correction import (LLMCorrector, CorrectionPipeline, create_llm_client, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_MINUTE,
+                            DEFAULT_BATCH_SIZE, CorrectionCache)
 
 # .env 파일 로드
 load_dotenv()
@@ -140,90 +144,24 @@ try:
 except ImportError:
     st.warning("webrtcvad 모듈이 설치되지 않았습니다. 'pip install webrtcvad'로 설치하세요. VAD 없이 계속 진행합니다.")
 
-class Frame(object):
-    """VAD를 위한 프레임 클래스"""
-    def __init__(self, bytes, timestamp, duration):
-        self.bytes = bytes
-        self.timestamp = timestamp
-        self.duration = duration
-
-def frame_generator(frame_duration_ms, audio, sample_rate):
-    """오디오를 프레임으로 분할"""
-    n = int(sample_rate * (frame_duration_ms / 1000.0) * 2)
-    offset = 0
-    timestamp = 0.0
-    duration = (float(n) / sample_rate) / 2.0
-    while offset + n < len(audio):
-        yield Frame(audio[offset:offset + n], timestamp, duration)
-        timestamp += duration
-        offset += n
-
-def vad_collector(sample_rate, frame_duration_ms, padding_duration_ms, vad, frames):
-    """VAD를 사용하여 음성 구간 감지"""
-    num_padding_frames = int(padding_duration_ms / frame_duration_ms)
-    ring_buffer = collections.deque(maxlen=num_padding_frames)
-    triggered = False
-    voiced_frames = []
-    
-    for frame in frames:
-        is_speech = vad.is_speech(frame.bytes, sample_rate)
-        
-        if not triggered:
-            ring_buffer.append((frame, is_speech))
-            num_voiced = len([f for f, speech in ring_buffer if speech])
-            
-            if num_voiced > 0.9 * ring_buffer.maxlen:
-                triggered = True
-                for f, s in ring_buffer:
-                    voiced_frames.append(f)
-                ring_buffer.clear()
-        else:
-            voiced_frames.append(frame)
-            ring_buffer.append((frame, is_speech))
-            num_unvoiced = len([f for f, speech in ring_buffer if not speech])
-            
-            if num_unvoiced > 0.9 * ring_buffer.maxlen:
-                triggered = False
-                yield (voiced_frames[0].timestamp,
-                      voiced_frames[-1].timestamp + voiced_frames[-1].duration,
-                      b''.join([f.bytes for f in voiced_frames]))
-                ring_buffer.clear()
-                voiced_frames = []
-    
-    if voiced_frames:
-        yield (voiced_frames[0].timestamp,
-               voiced_frames[-1].timestamp + voiced_frames[-1].duration,
-               b''.join([f.bytes for f in voiced_frames]))
+def process_with_vad(pcm, sample_rate=SAMPLE_RATE, aggressiveness=1, workers=1):
+    """VAD를 사용하여 음성 구간 처리 (pcm: 16비트 모노 PCM 배열 또는 bytes)
 
-def process_with_vad(audio_path, aggressiveness=1):
-    """VAD를 사용하여 음성 구간 처리"""
+    workers가 2 이상이면 긴 오디오를 겹치는 청크로 나누어 여러 프로세스에서 VAD를 수행합니다.
+    """
+    pcm_data = memoryview(pcm).cast('B')
     if not st.session_state.vad_module_loaded:
         # VAD를 사용할 수 없는 경우 전체 오디오를 하나의 세그먼트로 처리
-        import soundfile as sf
-        info = sf.info(audio_path)
-        return [(0, info.duration)]
-    
-    with contextlib.closing(wave.open(audio_path, 'rb')) as wf:
-        pcm_data = wf.readframes(wf.getnframes())
-        sample_rate = wf.getframerate()
-        sample_width = wf.getsampwidth()
+        return [(0, len(pcm_data) / 2 / sample_rate)]
     
-    vad = webrtcvad.Vad(aggressiveness)
-    frames = frame_generator(30, pcm_data, sample_rate)
-    frames = list(frames)
-    segments = vad_collector(sample_rate, 30, 2000, vad, frames)
-    
-    voice_segments = []
-    for start, end, _ in segments:
-        voice_segments.append((start, end))
-    
-    return voice_segments
+    return detect_voice_segments(pcm_data, sample_rate, aggressiveness, workers)
 
 class PromptManager:
     def __init__(self, prompts_dir="prompts"):
         self.prompts_dir = prompts_dir
         self.system_prompt = self._load_prompt("system_prompt.md")
         self.user_prompt_template = self._load_prompt("user_prompt.md")
+        self.batch_user_prompt_template = self._load_prompt("batch_user_prompt.md")
     
     def _load_prompt(self, filename):
         """마크다운 파일에서 프롬프트 로드"""
@@ -243,13 +181,46 @@ class PromptManager:
             current_sub=current_sub,
             next_subs='\n'.join(next_subs) if next_subs else '없음'
         )
+    
+    def get_batch_user_prompt(self, context, current_subs, previous_subs, next_subs):
+        """여러 자막을 한 번에 교정하는 사용자 프롬프트 생성"""
+        return self.batch_user_prompt_template.format(
+            context=context or '없음',
+            previous_subs='\n'.join(previous_subs) if previous_subs else '없음',
+            current_subs='\n'.join(f"{i}. {sub}" for i, sub in enumerate(current_subs, 1)),
+            next_subs='\n'.join(next_subs) if next_subs else '없음',
+            count=len(current_subs)
+        )
 
 class SubtitleGenerator:
-    def __init__(self, model_size="small", llm_provider=None):
+    def __init__(self, model_size="small", llm_provider=None, device=None, dtype=None,
+                 llm_max_workers=DEFAULT_MAX_WORKERS, llm_requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 llm_batch_size=DEFAULT_BATCH_SIZE, llm_cache_enabled=True, transcription_cache_enabled=True,
+                 vad_workers=DEFAULT_VAD_WORKERS, intra_op_threads=DEFAULT_INTRA_OP_THREADS,
+                 inter_op_threads=DEFAULT_INTER_OP_THREADS, draft_model_size=None):
+        # 모델은 프로세스 전역 캐시에서 가져오므로 재실행/세션 간에 다시 로드하지 않음
+        self.model_size = model_size
+        # 초안 모델: 모든 구간을 먼저 인식하고 신뢰도가 낮은 구간만 model_size 모델로 다시 인식
+        # (model_size보다 작은 모델만 사용, 화면에서는 선택할 때 경고)
+        self.draft_model_size = draft_model_size if is_smaller_model(draft_model_size, model_size) else None
+        self.device = device or default_device()
+        self.dtype = resolve_dtype(self.device, dtype)
+        self.vad_workers = vad_workers
+        # 음성 인식 CPU 스레드 수 (0이면 동시에 실행 중인 작업 수로 코어를 나눔, cpu_threads 참고)
+        self.intra_op_threads = intra_op_threads
+        configure_threads(inter_op=inter_op_threads)
+        # 현재 작업의 단계별 측정값 (metrics.JobMetrics)과 진행률/남은 시간 추정 (progress.ProgressEstimator)
+        self.metrics = None
+        self.progress = None
         with st.spinner("Whisper 모델 로딩 중..."):
-            self.model = whisper.load_model(model_size)
+            self.model = get_registry().get(model_size, device=self.device, dtype=self.dtype)
+            self.draft_model = None
+            if self.draft_model_size:
+                self.draft_model = get_registry().get(self.draft_model_size, device=self.device, dtype=self.dtype)
         st.success("모델 로딩 완료!")
 
+        self.transcription_cache = TranscriptionCache() if transcription_cache_enabled else None
+
         self.llm_provider = llm_provider
         self.prompt_manager = PromptManager()
         
@@ -257,153 +228,63 @@ class SubtitleGenerator:
         if llm_provider == "openai":
             openai_api_key = os.getenv("OPENAI_API_KEY") or st.session_state.get('openai_api_key')
             if openai_api_key:
-                self.llm_client = OpenAI(api_key=openai_api_key)
+                self.llm_client = create_llm_client("openai", openai_api_key)
             else:
                 st.warning("OpenAI API 키가 필요합니다. 설정에서 입력해주세요.")
         elif llm_provider == "anthropic":
             anthropic_api_key = os.getenv("ANTHROPIC_API_KEY") or st.session_state.get('anthropic_api_key')
             if anthropic_api_key:
-                self.llm_client = anthropic.Anthropic(api_key=anthropic_api_key)
+                self.llm_client = create_llm_client("anthropic", anthropic_api_key)
             else:
                 st.warning("Anthropic API 키가 필요합니다. 설정에서 입력해주세요.")
+
+        self.llm_corrector = None
+        if self.llm_client:
+            self.llm_corrector = LLMCorrector(
+                llm_provider, self.llm_client, self.prompt_manager,
+                max_tokens=1000,
+                max_workers=llm_max_workers,
+                requests_per_minute=llm_requests_per_minute,
+                batch_size=llm_batch_size,
+                cache=CorrectionCache(prompt_manager=self.prompt_manager) if llm_cache_enabled else None
+            )
     
-    def convert_to_wav(self, input_file):
-        """업로드된 파일을 WAV 형식으로 변환"""
+    def load_audio(self, input_file):
+        """업로드된 파일을 임시 파일 없이 16kHz 모노 PCM으로 메모리에 디코딩"""
         try:
-            # 임시 파일 생성
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_wav:
-                temp_wav_path = temp_wav.name
-            
-            # 원본 파일을 임시 파일로 저장
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(input_file.name)[1]) as temp_input:
-                temp_input.write(input_file.getbuffer())
-                temp_input_path = temp_input.name
-            
-            # FFmpeg를 사용한 변환
-            try:
-                import ffmpeg
-                
-                # FFmpeg를 사용하여 변환
-                (
-                    ffmpeg
-                    .input(temp_input_path)
-                    .output(temp_wav_path, acodec='pcm_s16le', ar=16000, ac=1)
-                    .run(quiet=True, overwrite_output=True)
-                )
-                
-                # 파일 길이 확인
-                probe = ffmpeg.probe(temp_wav_path)
-                audio_info = next(s for s in probe['streams'] if s['codec_type'] == 'audio')
-                total_seconds = float(audio_info.get('duration', 0))
-                
-                return temp_wav_path, total_seconds, temp_input_path
-                
-            except ImportError:
-                st.error("ffmpeg-python 패키지가 설치되지 않았습니다. 'pip install ffmpeg-python'으로 설치하세요.")
-                raise
-            except ffmpeg.Error as e:
-                st.error(f"FFmpeg 변환 오류: {e.stderr.decode() if e.stderr else str(e)}")
-                raise
-                
+            return decode_audio(input_file, SAMPLE_RATE)
         except Exception as e:
             st.error(f"오디오 변환 중 오류 발생: {str(e)}")
             import traceback
             st.error(traceback.format_exc())
-            
-            # 임시 파일 정리
-            if 'temp_input_path' in locals() and os.path.exists(temp_input_path):
-                os.unlink(temp_input_path)
-            if 'temp_wav_path' in locals() and os.path.exists(temp_wav_path):
-                os.unlink(temp_wav_path)
-                
-            return None, None, None
-
-    def merge_short_subtitles(self, subtitles, min_chars):
-        """짧은 자막들을 병합"""
-        if not subtitles:
-            return subtitles
-        
-        merged = []
-        current = subtitles[0]
-        
-        for next_sub in subtitles[1:]:
-            # 현재 자막이 최소 글자 수보다 적고, 다음 자막과의 시간 간격이 2초 이내인 경우
-            if (len(current.text) < min_chars and 
-                (next_sub.start.hours * 3600 + next_sub.start.minutes * 60 + next_sub.start.seconds) - 
-                (current.end.hours * 3600 + current.end.minutes * 60 + current.end.seconds) <= 2):
-                
-                # 병합된 텍스트가 최대 글자 수를 초과하지 않는 경우에만 병합
-                if len(current.text + " " + next_sub.text) <= 100:  # 기본 최대 글자 수 제한
-                    current.text += " " + next_sub.text
-                    current.end = next_sub.end
-                else:
-                    merged.append(current)
-                    current = next_sub
-            else:
-                merged.append(current)
-                current = next_sub
-        
-        merged.append(current)
-        
-        # 인덱스 재정렬
-        for i, sub in enumerate(merged, 1):
-            sub.index = i
-        
-        return merged
+            return None
 
     def correct_subtitle_with_llm(self, subtitle_text, context=None, previous_subs=None, next_subs=None):
         """LLM을 사용하여 자막 텍스트를 교정"""
-        if not self.llm_client:
+        if not self.llm_corrector:
             return subtitle_text
         
         try:
-            # 원본 자막 로그 추가
-            log_entry = f"원본 자막: {subtitle_text}"
-            if 'correction_logs' not in st.session_state:
-                st.session_state.correction_logs = []
-            st.session_state.correction_logs.append(log_entry)
-            
-            if self.llm_provider == "openai":
-                response = self.llm_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": self.prompt_manager.system_prompt},
-                        {"role": "user", "content": self.prompt_manager.get_user_prompt(
-                            context, subtitle_text, previous_subs, next_subs
-                        )}
-                    ],
-                    temperature=0.3
-                )
-                corrected_text = response.choices[0].message.content.strip()
-                
-            elif self.llm_provider == "anthropic":
-                response = self.llm_client.messages.create(
-                    model="claude-3-5-haiku-20241022",
-                    max_tokens=1000,
-                    temperature=0.3,
-                    system=self.prompt_manager.system_prompt,
-                    messages=[{
-                        "role": "user", 
-                        "content": self.prompt_manager.get_user_prompt(
-                            context, subtitle_text, previous_subs, next_subs
-                        )
-                    }]
-                )
-                corrected_text = response.content[0].text.strip()
-            
-            # 교정된 자막 로그 추가
-            log_entry = f"교정된 자막: {corrected_text}"
-            st.session_state.correction_logs.append(log_entry)
-            
-            # 자동 스크롤을 위해 세션 상태 업데이트
-            st.session_state.log_updated = True
-            
+            corrected_text = self.llm_corrector.correct(subtitle_text, context, previous_subs, next_subs)
+            self._log_correction(subtitle_text, corrected_text)
             return corrected_text
                 
         except Exception as e:
-            error_msg = f"자막 교정 중 오류 발생: {str(e)}"
-            st.session_state.correction_logs.append(error_msg)
+            self._log_correction(subtitle_text, subtitle_text, e)
             return subtitle_text
+
+    def _log_correction(self, original_text, corrected_text, error=None):
+        """교정 로그 기록"""
+        if 'correction_logs' not in st.session_state:
+            st.session_state.correction_logs = []
+        st.session_state.correction_logs.append(f"원본 자막: {original_text}")
+        if error is not None:
+            st.session_state.correction_logs.append(f"자막 교정 중 오류 발생: {str(error)}")
+        else:
+            st.session_state.correction_logs.append(f"교정된 자막: {corrected_text}")
+        
+        # 자동 스크롤을 위해 세션 상태 업데이트
+        st.session_state.log_updated = True
         
     def _update_correction_log_display(self, log_placeholder):
         """교정 로그 디스플레이 업데이트"""
@@ -429,9 +310,134 @@ class SubtitleGenerator:
         # 로그 표시
         log_placeholder.markdown(log_html, unsafe_allow_html=True)
 
-    def generate_subtitles(self, audio_file, progress_bar, status_text, language=None, max_chars=None, min_chars=None, max_duration=None, context=None, vad_enabled=True, vad_aggressiveness=1):
-        """자막 생성 함수"""
+    def _span(self, name):
+        """현재 작업의 단계 처리 시간 측정 (측정 중인 작업이 없으면 아무것도 하지 않음)"""
+        return self.metrics.span(name) if self.metrics is not None else contextlib.nullcontext()
+
+    def _create_transcriber(self, batch_size, word_timestamps, threads, vad_trusted):
+        """음성 인식기 생성 (초안 모델이 있으면 초안 모델 인식기가 현재 모델 인식기로 검증)"""
+        options = {"batch_size": batch_size, "fp16": self.dtype == "float16", "word_timestamps": word_timestamps,
+                   "threads": threads, "vad_trusted": vad_trusted}
+        transcriber = BatchTranscriber(self.model, **options)
+        if self.draft_model is not None:
+            transcriber = BatchTranscriber(self.draft_model, verifier=transcriber, **options)
+        return transcriber
+
+    def transcribe_audio(self, audio_file, progress_bar, status_text, language=None, vad_enabled=True, vad_aggressiveness=1, batch_size=8,
+                         segment_callback=None, checkpoint=None, word_timestamps=False, vad_trusted=False):
+        """업로드 파일을 디코딩하고 VAD와 Whisper로 음성 인식 (실패 시 None)
+
+        segment_callback(세그먼트 목록)은 앞 구간부터 순서대로 인식이 끝날 때마다 호출됩니다.
+        checkpoint가 주어지면 VAD 결과와 구간별 인식 결과를 저장하고, 중단된 작업은 이어서 처리합니다.
+        """
+        # FFmpeg 출력을 메모리로 받아 VAD와 Whisper가 같은 PCM 버퍼를 사용
+        with self._span("decode"):
+            audio = self.load_audio(audio_file)
+        if audio is None:
+            return None
+        sample_rate = SAMPLE_RATE
+        if self.metrics is not None:
+            self.metrics.audio_seconds = pcm_duration(audio, sample_rate)
+        
+        status_text.text("오디오 디코딩 완료")
+        progress_bar.progress(10)
+        
+        # VAD를 사용하여 음성 구간 감지
+        voice_segments = checkpoint.voice_segments() if checkpoint is not None else None
+        if voice_segments is not None:
+            status_text.text(f"저장된 음성 구간 사용: {len(voice_segments)}개")
+        elif vad_enabled:
+            status_text.text("음성 구간 감지 중...")
+            with self._span("vad"):
+                voice_segments = process_with_vad(audio, sample_rate, vad_aggressiveness, self.vad_workers)
+                # 짧은 구간은 묶고 긴 구간은 조용한 지점에서 나누어 Whisper 창 수를 줄임
+                windows = pack_segments(voice_segments, audio, sample_rate)
+            status_text.text(f"감지된 음성 구간: {len(voice_segments)}개 (인식 창 {len(windows)}개)")
+            voice_segments = windows
+        else:
+            # VAD를 사용하지 않는 경우 전체 오디오를 하나의 세그먼트로 처리
+            voice_segments = [(0, pcm_duration(audio, sample_rate))]
+            status_text.text("VAD 비활성화: 전체 오디오를 한 번에 처리합니다")
+        if checkpoint is not None:
+            checkpoint.save_voice_segments(voice_segments)
+            
+        progress_bar.progress(20)
+        
+        # 음성 구간 처리
+        status_text.text("음성 인식 시작...")
+        
+        # 구간 길이가 제각각이므로 구간 수 대신 음성 길이와 측정한 처리 속도로 진행률 계산
+        progress = self.progress or ProgressEstimator()
+        progress.start()
+        progress.asr.add(sum(end - start for start, end in voice_segments))
+        if checkpoint is not None:
+            progress.asr.skip(sum(voice_segments[i][1] - voice_segments[i][0]
+                                  for i in checkpoint.completed_segments() if i < len(voice_segments)))
+        
+        def update_transcribe_progress(done_seconds, total_seconds):
+            progress.asr.update(done_seconds)
+            status_text.text(f"음성 인식 {timedelta(seconds=int(done_seconds))}/{timedelta(seconds=int(total_seconds))} "
+                             f"완료... {progress.describe()}")
+            progress_bar.progress(int(20 + progress.fraction() * 70))
+
+        # 여러 음성 구간을 배치로 묶어 Whisper로 음성 인식
+        if not language:
+            status_text.text("언어 감지 중...")
+        # 다른 세션의 작업과 CPU 코어를 나누어 사용
+        with get_scheduler().acquire(self.intra_op_threads) as threads:
+            transcriber = self._create_transcriber(batch_size, word_timestamps, threads, vad_trusted)
+            with self._span("asr"):
+                result = transcriber.transcribe_segments(
+                    audio, voice_segments, sample_rate, language, update_transcribe_progress, segment_callback, checkpoint
+                )
+        return result
+
+    def transcribe_audio_stream(self, audio_file, progress_bar, status_text, language=None, vad_enabled=True, vad_aggressiveness=1, batch_size=8,
+                                segment_callback=None, word_timestamps=False, vad_trusted=False):
+        """업로드 파일을 일정 길이씩 디코딩하면서 VAD와 Whisper로 음성 인식 (실패 시 None)
+
+        파일 전체를 메모리에 올리지 않으므로 매우 긴 파일도 메모리 사용량이 거의 일정합니다.
+        """
+        # 전체 길이를 알 수 있으면 남은 시간도 추정
+        progress = self.progress or ProgressEstimator()
+        duration = probe_duration(audio_file)
+        total_text = f"/{timedelta(seconds=int(duration))}" if duration else ""
+        progress.start()
+        if duration:
+            progress.asr.add(duration)
+        
+        def update_stream_progress(seconds):
+            if self.metrics is not None:
+                self.metrics.audio_seconds = seconds
+            progress.asr.update(seconds)
+            status_text.text(f"처리한 오디오: {timedelta(seconds=int(seconds))}{total_text} {progress.describe()}")
+            progress_bar.progress(int(20 + progress.fraction() * 70))
+
+        vad = None
+        if vad_enabled:
+            vad = StreamingVAD(SAMPLE_RATE, vad_aggressiveness, max_segment_seconds=MAX_STREAM_SEGMENT_SECONDS)
+        status_text.text("스트리밍 음성 인식 시작...")
+        progress_bar.progress(20)
+        try:
+            with get_scheduler().acquire(self.intra_op_threads) as threads:
+                transcriber = self._create_transcriber(batch_size, word_timestamps, threads, vad_trusted)
+                # 디코딩, VAD, 음성 인식이 번갈아 실행되므로 하나의 단계로 측정
+                with self._span("stream"):
+                    return transcriber.transcribe_stream(
+                        stream_audio(audio_file, SAMPLE_RATE), SAMPLE_RATE, language, vad, update_stream_progress,
+                        segment_callback
+                    )
+        except RuntimeError as e:
+            st.error(f"오디오 변환 중 오류 발생: {str(e)}")
+            return None
+
+    def generate_subtitles(self, audio_file, progress_bar, status_text, language=None, max_chars=None, min_chars=None, max_duration=None, context=None, vad_enabled=True, vad_aggressiveness=1, batch_size=8,
+                           streaming=False, word_timestamps=False, vad_trusted=False):
+        """자막 생성 함수 (streaming: 긴 파일을 일정 길이씩 읽으며 처리, word_timestamps: 단어 시각에 맞춰 자막 분할,
+        vad_trusted: VAD 구간을 믿고 온도 폴백과 토큰 수를 제한한 빠른 디코딩)"""
         temp_files = []
+        correction_pipeline = None
+        checkpoint = None
 
         # 로그 컨테이너 초기화
         st.session_state.correction_logs = []
@@ -479,395 +485,215 @@ class SubtitleGenerator:
         if self.llm_client:
             log_heading.subheader("실시간 자막 교정 로그")
         
+        # 단계별 처리 시간과 LLM 요청 측정
+        metrics = JobMetrics(labels={"model": self.model_size, "draft_model": self.draft_model_size,
+                                     "device": str(self.device), "llm": self.llm_provider or "none"})
+        self.metrics = metrics
+        if self.llm_corrector:
+            self.llm_corrector.metrics = metrics
+        
+        # 이 세션에서 같은 모델/LLM으로 측정한 처리 속도로 첫 측정 전의 남은 시간 추정
+        measured_rtf = st.session_state.setdefault('measured_rtf', {})
+        asr_rtf_key = f"{self.model_size}/{self.device}/{self.dtype}"
+        progress = ProgressEstimator(llm=self.llm_corrector is not None,
+                                     asr_rtf=measured_rtf.get(asr_rtf_key),
+                                     llm_rtf=measured_rtf.get(self.llm_provider))
+        self.progress = progress
+        
         try:
-            # WAV 파일 생성
-            wav_path, total_seconds, temp_input_path = self.convert_to_wav(audio_file)
-            if not wav_path:
-                return None
+            # 같은 파일과 인식 설정이면 같은 작업 ID가 되어 중단된 작업을 이어서 진행
+            vad_setting = vad_aggressiveness if vad_enabled and st.session_state.vad_module_loaded else None
+            # VAD 구간이 없으면 믿을 구간도 없으므로 빠른 디코딩을 사용하지 않음
+            vad_trusted = vad_trusted and vad_setting is not None
+            with metrics.span("hash"):
+                audio_hash = hash_bytes(audio_file.getbuffer())
+            job_id = make_job_id(audio_hash, self.model_size, self.dtype, language, vad_setting, word_timestamps,
+                                 vad_trusted, self.draft_model_size)
+            metrics.job_id = job_id
+            checkpoint = JobCheckpoint(job_id, info={"file_name": audio_file.name})
+            if checkpoint.resumed:
+                status_container.info(f"작업 ID: {job_id} (중단된 작업을 이어서 진행합니다)")
+            else:
+                status_container.info(f"작업 ID: {job_id}")
             
-            temp_files.extend([wav_path, temp_input_path])
-            status_text.text("WAV 파일 생성 완료")
-            progress_bar.progress(10)
+            # LLM 교정은 음성 인식과 겹쳐 실행하여, 다음 자막 문맥이 준비된 자막부터 바로 교정
+            subtitle_seconds = []
+            if self.llm_corrector:
+                completed = 0
+                saved_corrections = checkpoint.completed_corrections(self.llm_corrector.fingerprint(context))
+                
+                def on_corrected(i, original_text, corrected_text, error):
+                    nonlocal completed
+                    completed += 1
+                    
+                    # 교정한 자막 길이로 교정 속도를 측정하여 진행률과 남은 시간 갱신
+                    # (저장된 결과를 그대로 쓴 자막만 건너뜀, 일부만 저장된 묶음은 다시 교정하므로 측정)
+                    if i in correction_pipeline.reused:
+                        progress.llm.skip(subtitle_seconds[i])
+                    else:
+                        progress.llm.advance(subtitle_seconds[i])
+                    total_segments = len(correction_pipeline.texts)
+                    progress_bar.progress(int(20 + progress.fraction() * 70))
+                    status_text.text(f"자막 교정 중... ({completed}/{total_segments}) {progress.describe()}")
+                    
+                    # 교정에 성공한 자막은 체크포인트에 저장
+                    if error is None:
+                        checkpoint.save_correction(i, corrected_text)
+                    
+                    # 로그 업데이트 및 화면 갱신
+                    self._log_correction(original_text, corrected_text, error)
+                    self._update_correction_log_display(log_placeholder)
+                
+                correction_pipeline = CorrectionPipeline(
+                    self.llm_corrector, context, on_corrected, completed=saved_corrections
+                )
+
+            def on_segments(segments):
+                if correction_pipeline is not None:
+                    seconds = [segment["end"] - segment["start"] for segment in segments]
+                    subtitle_seconds.extend(seconds)
+                    progress.llm.add(sum(seconds))
+                    correction_pipeline.feed([segment["text"] for segment in segments])
+
+            # 같은 파일을 같은 설정으로 인식한 결과가 있으면 재사용
+            cache_key = None
+            result = None
+            if self.transcription_cache is not None:
+                status_text.text("저장된 음성 인식 결과 확인 중...")
+                cache_key = self.transcription_cache.key(
+                    audio_hash, self.model_size, self.dtype, language, vad_setting, word_timestamps, vad_trusted,
+                    self.draft_model_size
+                )
+                result = self.transcription_cache.get(cache_key)
+            if result is None:
+                # 중단된 작업에서 모든 구간의 인식이 끝나 있었으면 디코딩 없이 사용
+                result = checkpoint.transcription_result()
             
-            # VAD를 사용하여 음성 구간 감지
-            if vad_enabled:
-                status_text.text("음성 구간 감지 중...")
-                voice_segments = process_with_vad(wav_path, vad_aggressiveness)
-                status_text.text(f"감지된 음성 구간: {len(voice_segments)}개")
+            if result is not None:
+                status_text.text("저장된 음성 인식 결과를 사용합니다")
+                progress.start()
+                on_segments(result["segments"])
+            elif streaming:
+                result = self.transcribe_audio_stream(
+                    audio_file, progress_bar, status_text, language,
+                    vad_enabled, vad_aggressiveness, batch_size, on_segments, word_timestamps, vad_trusted
+                )
+                if result is None:
+                    return None
+                if cache_key is not None:
+                    self.transcription_cache.set(cache_key, result)
             else:
-                # VAD를 사용하지 않는 경우 전체 오디오를 하나의 세그먼트로 처리
-                import soundfile as sf
-                info = sf.info(wav_path)
-                voice_segments = [(0, info.duration)]
-                status_text.text("VAD 비활성화: 전체 오디오를 한 번에 처리합니다")
-                
-            progress_bar.progress(20)
+                result = self.transcribe_audio(
+                    audio_file, progress_bar, status_text, language,
+                    vad_enabled, vad_aggressiveness, batch_size, on_segments, checkpoint, word_timestamps,
+                    vad_trusted
+                )
+                if result is None:
+                    return None
+                if cache_key is not None:
+                    self.transcription_cache.set(cache_key, result)
             
             # 전체 자막 정보 저장용
             all_segments = []
-            
-            # 오디오 파일 로드
-            import soundfile as sf
-            audio, sample_rate = sf.read(wav_path)
-            audio = audio.astype(np.float32)
-            
-            # 음성 구간 처리
-            status_text.text("음성 인식 시작...")
-            total_segments = len(voice_segments)
-            
-            for i, (start, end) in enumerate(voice_segments):
-                status_text.text(f"음성 구간 {i+1}/{total_segments} 처리 중...")
-                
-                # 진행률 업데이트
-                segment_progress = 20 + (i / total_segments * 40)
-                progress_bar.progress(int(segment_progress))
-                
-                # 현재 구간의 오디오 추출
-                start_sample = int(start * sample_rate)
-                end_sample = min(int(end * sample_rate), len(audio))
-                segment_audio = audio[start_sample:end_sample]
-                
-                # Whisper로 음성 인식
-                transcribe_options = {}
-                if language:
-                    transcribe_options["language"] = language
-                    
-                result = self.model.transcribe(segment_audio, **transcribe_options)
-                
-                # 세그먼트 시간 조정 및 정보 저장
-                for segment in result["segments"]:
-                    adj_segment = {
-                        "start": start + segment["start"],
-                        "end": start + segment["end"],
-                        "text": segment["text"].strip(),
-                        "processed": False  # 이 세그먼트가 처리되었는지 표시
-                    }
-                    all_segments.append(adj_segment)
 
-            status_text.text("음성 인식 완료!")
-            progress_bar.progress(60)
+            # 감지된 언어 표시
+            st.session_state.detected_language = (result["language"], result["language_probability"])
+            if not language and result["language"]:
+                status_container.info(
+                    f"감지된 언어: {result['language']} (신뢰도 {result['language_probability'] * 100:.1f}%)"
+                )
+            escalation = result.get("escalation")
+            if escalation:
+                status_container.info(
+                    f"초안 모델({self.draft_model_size}) 인식 창 {escalation['windows']}개 중 "
+                    f"{escalation['escalated']}개({escalation['escalated_ratio'] * 100:.1f}%, "
+                    f"{escalation['escalated_seconds']:.0f}초)를 {self.model_size} 모델로 다시 인식했습니다"
+                )
+
+            # 세그먼트 정보 저장
+            for segment in result["segments"]:
+                adj_segment = {
+                    "start": segment["start"],
+                    "end": segment["end"],
+                    "text": segment["text"],
+                    "words": segment.get("words"),  # 단어 타임스탬프 (요청한 경우)
+                    "processed": False  # 이 세그먼트가 처리되었는지 표시
+                }
+                all_segments.append(adj_segment)
+
+            status_text.text(f"음성 인식 완료! {progress.describe()}")
+            progress_bar.progress(int(20 + progress.fraction() * 70))
 
             # LLM 교정 처리
-            if self.llm_client:
-                status_text.text("LLM 자막 교정 시작...")
+            if correction_pipeline is not None:
+                status_text.text("남은 자막 교정 중...")
                 
-                # 전체 세그먼트 수
-                total_segments = len(all_segments)
+                # 인식 중에 시작한 교정을 포함하여 모든 자막의 교정이 끝날 때까지 대기
+                with metrics.span("llm_finish"):
+                    corrected_texts = correction_pipeline.finish()
+                for segment, corrected_text in zip(all_segments, corrected_texts):
+                    segment["text"] = corrected_text
                 
-                for i, segment in enumerate(all_segments):
-                    # 이전/다음 자막 컨텍스트 수집 (최대 2개씩)
-                    previous_texts = [all_segments[j]["text"] for j in range(max(0, i-2), i)]
-                    next_texts = [all_segments[j]["text"] for j in range(i+1, min(len(all_segments), i+3))]
-                    
-                    # 진행률 업데이트
-                    segment_progress = 60 + ((i / total_segments) * 30)
-                    progress_bar.progress(int(segment_progress))
-                    
-                    # LLM으로 자막 교정
-                    status_text.text(f"자막 교정 중... ({i+1}/{total_segments})")
-                    
-                    segment["text"] = self.correct_subtitle_with_llm(
-                        segment["text"], context, previous_texts, next_texts
+                if self.llm_corrector.cache is not None:
+                    cache_stats = self.llm_corrector.cache.stats()
+                    status_container.info(
+                        f"교정 캐시: 적중 {cache_stats['hits']}회, 미적중 {cache_stats['misses']}회"
                     )
-                    
-                    # 로그 업데이트 및 화면 갱신
-                    self._update_correction_log_display(log_placeholder)
 
             # 자막 파일 생성
             status_text.text("자막 파일 생성 중...")
-            subs = pysrt.SubRipFile()
-            subtitle_index = 1
-
-            # 텍스트 분할 및 자막 생성
-            for segment in all_segments:
-                if not segment["text"]:  # 빈 텍스트는 건너뛰기
-                    continue
-                
-                text = segment["text"]
-                start_time = segment["start"]
-                end_time = segment["end"]
-                duration = end_time - start_time
-                
-                # 최대 시간 길이 체크
-                if max_duration and duration > max_duration:
-                    # 시간 간격으로 분할
-                    num_splits = int(np.ceil(duration / max_duration))
-                    sub_duration = duration / num_splits
-                    
-                    # 텍스트를 글자 수에 비례하여 공정하게 분할
-                    splits = []
-                    
-                    # 텍스트를 문장 단위로 분할 (더 자연스러운 분할 지점)
-                    sentence_breaks = re.split(r'([.!?] )', text)
-                    sentences = []
-                    
-                    # 문장 재구성 (구분자 포함)
-                    i = 0
-                    while i < len(sentence_breaks):
-                        if i + 1 < len(sentence_breaks) and re.match(r'[.!?] ', sentence_breaks[i+1]):
-                            sentences.append(sentence_breaks[i] + sentence_breaks[i+1])
-                            i += 2
-                        else:
-                            sentences.append(sentence_breaks[i])
-                            i += 1
-                    
-                    # 빈 문장 제거
-                    sentences = [s for s in sentences if s.strip()]
-                    
-                    if not sentences:  # 문장이 없으면 단어 단위로 분할
-                        words = text.split()
-                        chars_per_split = len(text) / num_splits
-                        current_split = []
-                        current_length = 0
-                        
-                        for word in words:
-                            if current_length + len(word) + (1 if current_length > 0 else 0) <= chars_per_split:
-                                current_split.append(word)
-                                current_length += len(word) + (1 if current_length > 0 else 0)
-                            else:
-                                if current_split:  # 현재 분할을 추가
-                                    splits.append(' '.join(current_split))
-                                current_split = [word]
-                                current_length = len(word)
-                        
-                        if current_split:  # 마지막 분할 추가
-                            splits.append(' '.join(current_split))
-                    else:
-                        # 문장을 적절히 그룹화하여 분할
-                        current_split = []
-                        current_length = 0
-                        target_length = len(text) / num_splits
-                        
-                        for sentence in sentences:
-                            if current_length + len(sentence) <= target_length * 1.3:  # 30% 여유 허용
-                                current_split.append(sentence)
-                                current_length += len(sentence)
-                            else:
-                                if current_split:
-                                    splits.append(''.join(current_split).strip())
-                                current_split = [sentence]
-                                current_length = len(sentence)
-                        
-                        if current_split:
-                            splits.append(''.join(current_split).strip())
-                    
-                    # 필요한 경우 분할 수 맞추기
-                    while len(splits) < num_splits:
-                        # 가장 긴 분할을 찾아 분할
-                        longest_idx = max(range(len(splits)), key=lambda i: len(splits[i]))
-                        longest_split = splits[longest_idx]
-                        
-                        if len(longest_split) < 10:  # 너무 짧으면 분할하지 않음
-                            break
-                            
-                        mid_point = len(longest_split) // 2
-                        # 공백을 찾아 분할점 조정
-                        while mid_point > 0 and mid_point < len(longest_split) - 1:
-                            if longest_split[mid_point] == ' ':
-                                break
-                            mid_point += 1
-                            
-                        if mid_point == 0 or mid_point >= len(longest_split) - 1:
-                            # 적절한 분할점을 찾지 못하면 그냥 중간에서 자름
-                            mid_point = len(longest_split) // 2
-                        
-                        first_half = longest_split[:mid_point].strip()
-                        second_half = longest_split[mid_point:].strip()
-                        
-                        splits[longest_idx] = first_half
-                        splits.insert(longest_idx + 1, second_half)
-                    
-                    # 시간 분배
-                    current_time = start_time
-                    for split_text in splits:
-                        split_ratio = len(split_text) / sum(len(s) for s in splits)
-                        split_duration = duration * split_ratio
-                        split_end = current_time + split_duration
-                        
-                        if max_chars and len(split_text) > max_chars:
-                            # 글자 수가 너무 많으면 추가 분할 (단어 경계 유지)
-                            words = split_text.split()
-                            current_chunk = ""
-                            chunks = []
-                            
-                            for word in words:
-                                test_chunk = (current_chunk + " " + word).strip()
-                                if len(test_chunk) <= max_chars:
-                                    current_chunk = test_chunk
-                                else:
-                                    if current_chunk:
-                                        chunks.append(current_chunk)
-                                    current_chunk = word
-                            
-                            if current_chunk:
-                                chunks.append(current_chunk)
-                            
-                            # 분할된 청크에 시간 배분
-                            chunk_time = current_time
-                            chunk_duration = split_duration / len(chunks)
-                            for chunk in chunks:
-                                chunk_end = chunk_time + chunk_duration
-                                
-                                # 자막 아이템 생성 및 추가
-                                hours = int(chunk_time) // 3600
-                                minutes = (int(chunk_time) % 3600) // 60
-                                seconds = int(chunk_time) % 60
-                                milliseconds = int((chunk_time % 1) * 1000)
-                                start_time_item = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                        seconds=seconds, milliseconds=milliseconds)
-                                
-                                hours = int(chunk_end) // 3600
-                                minutes = (int(chunk_end) % 3600) // 60
-                                seconds = int(chunk_end) % 60
-                                milliseconds = int((chunk_end % 1) * 1000)
-                                end_time_item = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                    seconds=seconds, milliseconds=milliseconds)
-                                
-                                sub = pysrt.SubRipItem(
-                                    index=subtitle_index,
-                                    start=start_time_item,
-                                    end=end_time_item,
-                                    text=chunk
-                                )
-                                subs.append(sub)
-                                subtitle_index += 1
-                                
-                                chunk_time = chunk_end
-                        else:
-                            # 최대 글자 수 이내인 경우 단일 자막으로 추가
-                            hours = int(current_time) // 3600
-                            minutes = (int(current_time) % 3600) // 60
-                            seconds = int(current_time) % 60
-                            milliseconds = int((current_time % 1) * 1000)
-                            start_time_item = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                    seconds=seconds, milliseconds=milliseconds)
-                            
-                            hours = int(split_end) // 3600
-                            minutes = (int(split_end) % 3600) // 60
-                            seconds = int(split_end) % 60
-                            milliseconds = int((split_end % 1) * 1000)
-                            end_time_item = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                seconds=seconds, milliseconds=milliseconds)
-                            
-                            sub = pysrt.SubRipItem(
-                                index=subtitle_index,
-                                start=start_time_item,
-                                end=end_time_item,
-                                text=split_text
-                            )
-                            subs.append(sub)
-                            subtitle_index += 1
-                        
-                        current_time = split_end
-                else:
-                    # 최대 시간 이내인 경우 최대 글자 수에 따라 처리
-                    if max_chars and len(text) > max_chars:
-                        # 단어 단위로 분할
-                        words = text.split()
-                        current_text = ""
-                        sub_splits = []
-                        
-                        for word in words:
-                            test_text = (current_text + " " + word).strip()
-                            if len(test_text) <= max_chars:
-                                current_text = test_text
-                            else:
-                                if current_text:
-                                    sub_splits.append(current_text)
-                                current_text = word
-                        
-                        if current_text:  # 마지막 부분 추가
-                            sub_splits.append(current_text)
-                        
-                        # 시간을 텍스트 길이에 비례하여 분배
-                        sub_duration = end_time - start_time
-                        total_chars = sum(len(s) for s in sub_splits)
-                        current_time = start_time
-                        
-                        for sub_text in sub_splits:
-                            ratio = len(sub_text) / total_chars
-                            split_duration = sub_duration * ratio
-                            split_end = current_time + split_duration
-                            
-                            hours = int(current_time) // 3600
-                            minutes = (int(current_time) % 3600) // 60
-                            seconds = int(current_time) % 60
-                            milliseconds = int((current_time % 1) * 1000)
-                            start_time_item = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                    seconds=seconds, milliseconds=milliseconds)
-                            
-                            hours = int(split_end) // 3600
-                            minutes = (int(split_end) % 3600) // 60
-                            seconds = int(split_end) % 60
-                            milliseconds = int((split_end % 1) * 1000)
-                            end_time_item = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                seconds=seconds, milliseconds=milliseconds)
-                            
-                            sub = pysrt.SubRipItem(
-                                index=subtitle_index,
-                                start=start_time_item,
-                                end=end_time_item,
-                                text=sub_text
-                            )
-                            subs.append(sub)
-                            subtitle_index += 1
-                            
-                            current_time = split_end
-                    else:
-                        # 그대로 추가
-                        hours = int(start_time) // 3600
-                        minutes = (int(start_time) % 3600) // 60
-                        seconds = int(start_time) % 60
-                        milliseconds = int((start_time % 1) * 1000)
-                        start_time_item = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                seconds=seconds, milliseconds=milliseconds)
-                        
-                        hours = int(end_time) // 3600
-                        minutes = (int(end_time) % 3600) // 60
-                        seconds = int(end_time) % 60
-                        milliseconds = int((end_time % 1) * 1000)
-                        end_time_item = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                            seconds=seconds, milliseconds=milliseconds)
-                        
-                        sub = pysrt.SubRipItem(
-                            index=subtitle_index,
-                            start=start_time_item,
-                            end=end_time_item,
-                            text=text
-                        )
-                        subs.append(sub)
-                        subtitle_index += 1
-            
-            # 최소 글자 수 제한이 설정된 경우 짧은 자막 병합
-            if min_chars:
-                status_text.text("짧은 자막 병합 중...")
-                merged_subs = self.merge_short_subtitles(subs, min_chars)
-                subs = pysrt.SubRipFile()
-                for sub in merged_subs:
-                    subs.append(sub)
+            # 최대 글자 수/시간에 맞게 나누고 짧은 자막은 병합 (segmentation.build_cues)
+            with metrics.span("segmentation"):
+                subs = to_subrip(build_cues(all_segments, None, max_chars, min_chars, max_duration))
             
             # 임시 SRT 파일 생성
             with tempfile.NamedTemporaryFile(delete=False, suffix='.srt') as temp_srt:
                 temp_srt_path = temp_srt.name
                 temp_files.append(temp_srt_path)
             
-            subs.save(temp_srt_path, encoding='utf-8')
+            with metrics.span("write"):
+                subs.save(temp_srt_path, encoding='utf-8')
+                
+                # SRT 파일 내용 읽기
+                with open(temp_srt_path, 'r', encoding='utf-8') as f:
+                    srt_content = f.read()
             status_text.text("자막 파일 생성 완료!")
             progress_bar.progress(100)
             
-            # SRT 파일 내용 읽기
-            with open(temp_srt_path, 'r', encoding='utf-8') as f:
-                srt_content = f.read()
+            # 작업이 끝났으므로 체크포인트 삭제
+            checkpoint.finish()
+            
+            # 다음 작업의 남은 시간 추정에 사용할 처리 속도
+            rates = progress.rates()
+            if rates["asr"] is not None:
+                measured_rtf[asr_rtf_key] = rates["asr"]
+            if rates["llm"] is not None:
+                measured_rtf[self.llm_provider] = rates["llm"]
             
+            # 처리 통계 저장 (화면의 "처리 통계"와 모니터링용 파일)
+            metrics.finish()
+            st.session_state.last_metrics = metrics.summary()
+            metrics.export()
             return srt_content
             
         except Exception as e:
             st.error(f"자막 생성 중 오류 발생: {str(e)}")
             import traceback
             st.error(traceback.format_exc())
+            if checkpoint is not None:
+                st.info(f"진행 상황이 작업 ID {checkpoint.job_id}로 저장되었습니다. 같은 파일을 같은 설정으로 다시 실행하면 이어서 처리합니다.")
             return None
             
         finally:
+            # 오류로 중단된 경우 아직 시작하지 않은 교정 요청 취소
+            if correction_pipeline is not None:
+                correction_pipeline.close(cancel=True)
+            metrics.finish()
+            self.metrics = None
+            self.progress = None
+            if self.llm_corrector:
+                self.llm_corrector.metrics = None
+            
             # 임시 파일 정리
             for temp_file in temp_files:
                 if os.path.exists(temp_file):
@@ -875,30 +701,7 @@ class SubtitleGenerator:
 
     def convert_srt_to_vtt(self, srt_content):
         """SRT 형식의 자막을 VTT 형식으로 변환합니다."""
-        # VTT 헤더 추가
-        vtt_content = "WEBVTT\n\n"
-        
-        # SRT 블록 단위로 분할
-        srt_blocks = srt_content.strip().split('\n\n')
-        
-        for block in srt_blocks:
-            lines = block.split('\n')
-            
-            # 각 블록은 최소 3줄 이상이어야 함 (인덱스, 시간, 텍스트)
-            if len(lines) >= 3:
-                # 인덱스 라인은 건너뛰기
-                
-                # 시간 포맷 변환 (00:00:00,000 --> 00:00:00.000)
-                time_line = lines[1].replace(',', '.')
-                
-                # 텍스트 라인 유지
-                text_lines = lines[2:]
-                
-                # VTT 블록 생성
-                vtt_block = time_line + '\n' + '\n'.join(text_lines)
-                vtt_content += vtt_block + '\n\n'
-        
-        return vtt_content
+        return srt_to_vtt(srt_content)
 
 def save_to_subtitle_history(filename, srt_content, vtt_content=None, correction_logs=None):
     """자막과 교정 로그를 히스토리에 저장하고 생성된 ID를 반환하는 함수"""
@@ -946,6 +749,99 @@ def save_to_subtitle_history(filename, srt_content, vtt_content=None, correction
         # 이미 존재하는 경우 기존 ID 반환
         return existing_id
 
+# 백그라운드 작업 상태를 다시 확인하는 간격(초)
+QUEUE_POLL_SECONDS = 1.0
+
+@st.cache_resource
+def get_job_queue():
+    """서버 전체에서 공유하는 백그라운드 작업 큐 (작업자 프로세스가 Whisper 모델을 보유)"""
+    return JobQueue()
+
+def show_job_metrics(summary):
+    """마지막 작업의 단계별 처리 시간, 실시간 배율(RTF), 메모리, LLM 요청 통계 표시"""
+    with st.expander("처리 통계", expanded=False):
+        rtf = f" (RTF {summary['rtf']:.3f})" if summary.get("rtf") is not None else ""
+        audio_seconds = summary.get("audio_seconds") or 0
+        st.text(f"전체 {summary['wall_seconds']:.1f}초{rtf}, 오디오 {timedelta(seconds=int(audio_seconds))}")
+        rows = []
+        for name, stage in summary["stages"].items():
+            rows.append({
+                "단계": name,
+                "시간(초)": stage["seconds"],
+                "호출": stage["calls"],
+                "RTF": stage["rtf"],
+                "최대 메모리(MB)": stage["peak_rss_mb"],
+            })
+        if rows:
+            st.table(rows)
+        llm = summary["llm"]
+        if llm:
+            st.text(f"LLM 요청 {llm['requests']}회 (오류 {llm['errors']}회), 교정 진행 {llm['active_seconds']:.1f}초")
+            latency = llm["latency_seconds"]
+            if latency["p50"] is not None:
+                st.text(f"지연 p50 {latency['p50']:.2f}초 / p90 {latency['p90']:.2f}초 / p99 {latency['p99']:.2f}초")
+            if llm["input_tokens"] or llm["output_tokens"]:
+                st.text(f"토큰: 입력 {llm['input_tokens']}, 출력 {llm['output_tokens']}")
+
+def show_queued_job():
+    """작업 큐에 제출한 작업의 진행 상황을 표시하고, 끝나면 자막을 세션에 저장
+
+    작업이 아직 끝나지 않았으면 True를 반환합니다.
+    """
+    job_id = st.session_state.get('queue_job_id')
+    if not job_id:
+        return False
+    job_queue = get_job_queue()
+    status = job_queue.status(job_id)
+    if status is None:
+        st.session_state.queue_job_id = None
+        return False
+
+    if status["state"] == "queued":
+        st.info(f"대기 중: {status['file_name']} (대기 순서 {status['position']}번째)")
+        if st.button("작업 취소", key="cancel_queued_job"):
+            job_queue.cancel(job_id)
+            st.rerun()
+        return True
+
+    if status["state"] == "running":
+        elapsed = time.time() - status["started_at"]
+        st.info(f"자막 생성 중: {status['file_name']} ({timedelta(seconds=int(elapsed))} 경과)")
+        st.text(status["message"])
+        with st.expander("처리 로그", expanded=False):
+            st.code("\n".join(status["log"]))
+        return True
+
+    st.session_state.queue_job_id = None
+    if status["state"] == "done":
+        srt_content = job_queue.result(job_id)
+        # 이전 자막을 히스토리에 저장 (기존 자막이 있는 경우)
+        if st.session_state.last_srt_content is not None and st.session_state.last_filename is not None:
+            save_to_subtitle_history(
+                st.session_state.last_filename,
+                st.session_state.last_srt_content,
+                st.session_state.get('last_vtt_content'),
+                st.session_state.get('correction_logs', [])
+            )
+        st.session_state.correction_logs = status["correction_logs"]
+        st.session_state.last_metrics = status["metrics"]
+        st.session_state.last_srt_content = srt_content
+        st.session_state.last_filename = status["file_name"]
+        st.session_state.last_vtt_content = srt_to_vtt(srt_content)
+        st.session_state.current_subtitle_id = save_to_subtitle_history(
+            status["file_name"], srt_content, st.session_state.last_vtt_content, status["correction_logs"]
+        )
+        st.session_state.show_last_preview = True
+        st.rerun()
+    elif status["state"] == "failed":
+        st.error(f"자막 생성 중 오류 발생: {status['error']}")
+        if status["checkpoint_id"]:
+            st.info(f"진행 상황이 작업 ID {status['checkpoint_id']}로 저장되었습니다. "
+                    "같은 파일을 같은 설정으로 다시 실행하면 이어서 처리합니다.")
+    else:
+        st.info("작업이 취소되었습니다.")
+    return False
+
 def main():
     st.set_page_config(
         page_title="자동 자막 생성기",
@@ -991,6 +887,8 @@ def main():
         with st.expander("GPU 정보", expanded=False):
             display_gpu_info()
 
+        model_device = None
+        model_dtype = None
         if torch.cuda.is_available():
             with st.expander("GPU 최적화 옵션", expanded=False):
                 st.info("최신 GPU는 Whisper 모델에는 높은 사용률이 필요하지 않을 수 있습니다.")
@@ -1004,6 +902,18 @@ def main():
                 
                 if use_half_precision:
                     os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "max_split_size_mb:128"
+
+                model_device = f"cuda:{device_id}"
+                model_dtype = "float16" if use_half_precision else "float32"
+        else:
+            with st.expander("CPU 최적화 옵션", expanded=False):
+                use_int8 = st.checkbox(
+                    "int8 양자화 사용 (CPU 추론 가속, 메모리 절약)", value=False,
+                    help="Whisper의 선형 계층을 int8로 양자화합니다. medium/large 모델을 CPU에서 사용할 때 "
+                         "특히 빨라지며, 인식 결과가 FP32와 조금 다를 수 있습니다."
+                )
+                if use_int8:
+                    model_dtype = INT8
         
         # API 키 설정
         with st.expander("API 키 설정", expanded=False):
@@ -1034,6 +944,30 @@ def main():
             options=["tiny", "base", "small", "medium", "large"],
             index=2
         )
+        draft_model = st.selectbox(
+            "초안 모델 (2단계 인식)",
+            options=["사용안함", "tiny", "base"],
+            index=0,
+            help="작은 모델로 모든 구간을 먼저 인식하고, 신뢰도(평균 로그 확률)가 낮거나 같은 말이 반복되는 구간만 위의 모델로 다시 인식합니다. 큰 모델에 가까운 품질을 더 적은 계산으로 얻을 수 있습니다."
+        )
+        draft_model = None if draft_model == "사용안함" else draft_model
+        if draft_model and not is_smaller_model(draft_model, whisper_model):
+            st.warning(f"초안 모델({draft_model})은 Whisper 모델({whisper_model})보다 작아야 합니다. 초안 모델 없이 인식합니다.")
+            draft_model = None
+
+        # 모델 캐시 상태 및 해제
+        with st.expander("모델 캐시", expanded=False):
+            registry = get_registry()
+            loaded_models = registry.loaded_models()
+            if loaded_models:
+                for info in loaded_models:
+                    st.write(f"**{info['model_size']}** ({info['device']}, {info['dtype']}): {info['memory_mb']} MB")
+                st.caption(f"메모리 예산: {registry.memory_budget_mb} MB")
+                if st.button("캐시된 모델 모두 해제", use_container_width=True):
+                    registry.clear()
+                    st.rerun()
+            else:
+                st.write("로드된 모델이 없습니다.")
         
         llm_provider = st.radio(
             "LLM 교정 제공자",
@@ -1055,8 +989,35 @@ def main():
         if vad_enabled and st.session_state.vad_module_loaded:
             vad_aggressiveness = st.slider("VAD 감도", min_value=0, max_value=3, value=1, 
                                         help="높을수록 더 엄격하게 음성을 감지합니다. 0: 매우 관대, 3: 매우 엄격")
+            vad_workers = st.number_input("VAD 병렬 프로세스 수", min_value=1, max_value=os.cpu_count() or 1,
+                                          value=min(max(DEFAULT_VAD_WORKERS, 1), os.cpu_count() or 1),
+                                          help="긴 오디오(5분 이상)의 음성 구간 감지를 여러 CPU 코어에서 나누어 처리합니다. 1이면 단일 프로세스로 처리합니다.")
         else:
             vad_aggressiveness = 1
+            vad_workers = 1
+        
+        word_timestamps_enabled = st.checkbox("단어 타임스탬프로 자막 나누기", value=False,
+                                              help="음성 인식할 때 단어별 시각을 함께 구해, 최대 글자 수/시간으로 자막을 나눌 때 글자 수 비례 대신 실제 단어 시각에 경계를 맞춥니다. 인식 시간이 조금 늘어납니다.")
+        
+        vad_available = vad_enabled and st.session_state.vad_module_loaded
+        vad_trusted_enabled = st.checkbox("빠른 디코딩 (VAD 구간 신뢰)", value=False, disabled=not vad_available,
+                                          help="VAD가 찾은 음성 구간을 믿고 Whisper의 온도 폴백 단계와 최대 토큰 수를 줄여 인식 속도를 높입니다. 같은 말이 반복되는 환각 결과는 LLM 교정에 보내지 않고 버립니다. 인식 결과가 조금 달라질 수 있습니다. VAD를 사용할 때만 선택할 수 있습니다.")
+        vad_trusted_enabled = vad_trusted_enabled and vad_available
+        
+        streaming_enabled = st.checkbox("스트리밍 처리 (긴 파일 메모리 절약)", value=False,
+                                        help="파일 전체를 메모리에 올리지 않고 30초씩 디코딩하면서 음성 구간 감지와 인식을 진행합니다. 몇 시간 길이의 녹음도 메모리 사용량이 거의 일정합니다.")
+        
+        use_job_queue = st.checkbox("백그라운드 작업 큐 사용", value=True,
+                                    help="별도의 작업자 프로세스에서 자막을 생성합니다. 처리 중에 화면을 조작해도 작업이 중단되지 않으며, 여러 사용자가 동시에 요청하면 차례로 처리합니다.")
+        
+        transcription_cache_enabled = st.checkbox("음성 인식 결과 캐시 사용", value=True,
+                                                  help="같은 파일을 같은 모델/언어/VAD 설정으로 다시 처리하면 저장된 인식 결과를 사용합니다. 자막 길이나 LLM 설정만 바꿀 때 빠르게 다시 생성할 수 있습니다.")
+        if st.button("음성 인식 캐시 비우기", use_container_width=True):
+            TranscriptionCache().clear()
+            st.success("음성 인식 캐시를 비웠습니다.")
+        
+        batch_size = st.number_input("Whisper 배치 크기", min_value=1, max_value=32, value=8,
+                                     help="여러 음성 구간을 한 번에 인식합니다. 클수록 빠르지만 메모리를 더 사용합니다.")
         
         # 자막 설정
         language = st.selectbox(
@@ -1087,6 +1048,23 @@ def main():
         if max_duration <= 0:
             max_duration = None
         
+        if llm_provider:
+            llm_max_workers = st.number_input("LLM 동시 요청 수", min_value=1, max_value=64, value=DEFAULT_MAX_WORKERS,
+                                              help="여러 자막을 동시에 교정합니다. API 속도 제한에 걸리면 줄이세요.")
+            llm_requests_per_minute = st.number_input("LLM 분당 최대 요청 수", min_value=1, value=DEFAULT_REQUESTS_PER_MINUTE)
+            llm_cache_enabled = st.checkbox("LLM 교정 결과 캐시 사용", value=True,
+                                            help="같은 자막을 다시 교정할 때 저장된 결과를 사용하여 API 비용 없이 바로 처리합니다.")
+            if st.button("교정 캐시 비우기", use_container_width=True):
+                CorrectionCache().clear()
+                st.success("교정 캐시를 비웠습니다.")
+            llm_batch_size = st.number_input("LLM 요청당 자막 수", min_value=1, max_value=50, value=DEFAULT_BATCH_SIZE,
+                                             help="연속된 자막 여러 개를 한 번에 교정하여 요청 수와 토큰 비용을 줄입니다. 1이면 자막마다 따로 요청합니다.")
+        else:
+            llm_max_workers = DEFAULT_MAX_WORKERS
+            llm_requests_per_minute = DEFAULT_REQUESTS_PER_MINUTE
+            llm_batch_size = DEFAULT_BATCH_SIZE
+            llm_cache_enabled = True
+        
         context = st.text_area("영상 컨텍스트 (영상의 주제, 목적, 대상 청중 등)", height=100)
         if not context:
             context = None
@@ -1194,13 +1172,7 @@ def main():
             with col3:
                 # SRT를 VTT로 변환
                 if 'last_vtt_content' not in st.session_state or not st.session_state.last_vtt_content:
-                    # SubtitleGenerator 객체가 있으면 그것을 사용, 없으면 임시로 생성
-                    if 'subtitle_generator' in st.session_state and st.session_state.subtitle_generator:
-                        generator = st.session_state.subtitle_generator
-                    else:
-                        generator = SubtitleGenerator(model_size="small")
-                    
-                    st.session_state.last_vtt_content = generator.convert_srt_to_vtt(st.session_state.last_srt_content)
+                    st.session_state.last_vtt_content = srt_to_vtt(st.session_state.last_srt_content)
                 
                 st.download_button(
                     label="VTT 다운로드",
@@ -1214,6 +1186,10 @@ def main():
             with col4:
                 show_preview = st.button("미리보기", key="show_preview_button", use_container_width=True)
             
+            # 마지막 작업의 처리 통계
+            if st.session_state.get('last_metrics'):
+                show_job_metrics(st.session_state.last_metrics)
+            
             # 미리보기 버튼이 클릭되면 자막 내용과 테이블 표시
             if show_preview:
                 st.session_state.show_last_preview = True
@@ -1331,7 +1307,37 @@ def main():
     if uploaded_file is not None:
         st.audio(uploaded_file, format="audio/wav")
         
-        if st.button("자막 생성 시작", type="primary"):
+        start_clicked = st.button("자막 생성 시작", type="primary", disabled=bool(st.session_state.get('queue_job_id')))
+        if start_clicked and use_job_queue:
+            # 작업자 프로세스에 맡기고 진행 상황은 다시 실행될 때마다 확인
+            try:
+                st.session_state.queue_job_id = get_job_queue().submit(uploaded_file, uploaded_file.name, {
+                    "model_size": whisper_model,
+                    "llm_provider": llm_provider,
+                    "device": model_device,
+                    "dtype": model_dtype,
+                    "llm_max_workers": llm_max_workers,
+                    "llm_requests_per_minute": llm_requests_per_minute,
+                    "llm_batch_size": llm_batch_size,
+                    "llm_cache_enabled": llm_cache_enabled,
+                    "transcription_cache_enabled": transcription_cache_enabled,
+                    "vad_workers": int(vad_workers),
+                    "draft_model_size": draft_model,
+                    "language": lang_code,
+                    "max_chars": max_chars,
+                    "min_chars": min_chars,
+                    "max_duration": max_duration,
+                    "context": context,
+                    "vad_enabled": bool(vad_enabled and st.session_state.vad_module_loaded),
+                    "vad_aggressiveness": vad_aggressiveness,
+                    "batch_size": batch_size,
+                    "streaming": streaming_enabled,
+                    "word_timestamps": word_timestamps_enabled,
+                    "vad_trusted": vad_trusted_enabled,
+                })
+            except QueueFullError as e:
+                st.warning(str(e))
+        elif start_clicked:
             # 로그 초기화
             st.session_state.correction_logs = []
 
@@ -1344,7 +1350,16 @@ def main():
             # 자막 생성기 초기화
             generator = SubtitleGenerator(
                 model_size=whisper_model,
-                llm_provider=llm_provider
+                llm_provider=llm_provider,
+                device=model_device,
+                dtype=model_dtype,
+                llm_max_workers=llm_max_workers,
+                llm_requests_per_minute=llm_requests_per_minute,
+                llm_batch_size=llm_batch_size,
+                llm_cache_enabled=llm_cache_enabled,
+                transcription_cache_enabled=transcription_cache_enabled,
+                vad_workers=int(vad_workers),
+                draft_model_size=draft_model
             )
             
             progress_bar.progress(10)
@@ -1361,7 +1376,11 @@ def main():
                 max_duration=max_duration,
                 context=context,
                 vad_enabled=vad_enabled,
-                vad_aggressiveness=vad_aggressiveness
+                vad_aggressiveness=vad_aggressiveness,
+                batch_size=batch_size,
+                streaming=streaming_enabled,
+                word_timestamps=word_timestamps_enabled,
+                vad_trusted=vad_trusted_enabled
             )
 
             if srt_content:
@@ -1457,6 +1476,8 @@ def main():
                 if preview_data:
                     st.dataframe(preview_data, use_container_width=True)
 
+    job_pending = show_queued_job()
+
     # 푸터 구분선
     st.markdown("---")
 
@@ -1478,5 +1499,10 @@ def main():
                 unsafe_allow_html=True
             )
 
+    # 백그라운드 작업이 끝날 때까지 주기적으로 다시 실행하여 상태 갱신
+    if job_pending:
+        time.sleep(QUEUE_POLL_SECONDS)
+        st.rerun()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
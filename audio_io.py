@@ -0,0 +1,233 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import subprocess
+import numpy as np
+
+# Whisper와 VAD가 사용하는 샘플링 레이트
+SAMPLE_RATE = 16000
+
+# Windows에서 chocolatey로 설치한 FFmpeg 기본 경로
+WINDOWS_FFMPEG_PATH = r"C:\ProgramData\chocolatey\bin\ffmpeg.exe"
+
+# stdin으로 전달할 때 한 번에 쓰는 크기
+PIPE_CHUNK_SIZE = 1024 * 1024
+
+# moov 정보가 파일 끝에 있을 수 있어 파이프로 디코딩하지 못할 수 있는 형식
+SEEKABLE_FORMATS = (".mp4", ".mov", ".m4a", ".3gp")
+
+
+def find_ffmpeg():
+    """FFmpeg 실행 파일 경로 (FFMPEG_PATH 환경 변수 > PATH > chocolatey 기본 경로)"""
+    path = os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg")
+    if path:
+        return path
+    if os.path.exists(WINDOWS_FFMPEG_PATH):
+        return WINDOWS_FFMPEG_PATH
+    return "ffmpeg"
+
+
+def _ffmpeg_command(ffmpeg_path, input_spec, sample_rate):
+    return [
+        ffmpeg_path, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", input_spec,
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1"
+    ]
+
+
+def _iter_chunks(source):
+    """bytes/메모리뷰/파일 객체를 일정 크기 조각으로 나누어 반환"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for offset in range(0, len(view), PIPE_CHUNK_SIZE):
+            yield view[offset:offset + PIPE_CHUNK_SIZE]
+        return
+
+    if hasattr(source, "getbuffer"):
+        # Streamlit UploadedFile, BytesIO는 내부 버퍼를 복사 없이 사용
+        yield from _iter_chunks(source.getbuffer())
+        return
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    for chunk in iter(lambda: source.read(PIPE_CHUNK_SIZE), b""):
+        yield chunk
+
+
+def _start_ffmpeg(command, source=None):
+    """FFmpeg 프로세스 시작. source가 있으면 stdin으로 전달하는 스레드와 stderr 수집 스레드 실행"""
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if source is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    def feed():
+        try:
+            for chunk in _iter_chunks(source):
+                process.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            # FFmpeg가 입력을 다 읽기 전에 종료한 경우 (오류는 반환 코드로 확인)
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    stderr_chunks = []
+    threads = [threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)]
+    if source is not None:
+        threads.append(threading.Thread(target=feed, daemon=True))
+    for thread in threads:
+        thread.start()
+    return process, threads, stderr_chunks
+
+
+def _finish_ffmpeg(process, threads, stderr_chunks):
+    """FFmpeg 종료를 기다리고 실패하면 RuntimeError 발생"""
+    process.wait()
+    for thread in threads:
+        thread.join()
+    if process.returncode != 0:
+        stderr = b"".join(stderr_chunks).decode("utf-8", errors="replace")
+        raise RuntimeError(f"FFmpeg 디코딩 실패 (코드 {process.returncode}): {stderr.strip()}")
+
+
+def _run_ffmpeg(command, source=None):
+    """FFmpeg를 실행하여 stdout의 PCM 데이터를 읽음. source가 있으면 stdin으로 전달"""
+    process, threads, stderr_chunks = _start_ffmpeg(command, source)
+    pcm_data = process.stdout.read()
+    _finish_ffmpeg(process, threads, stderr_chunks)
+    return pcm_data
+
+
+def decode_audio(source, sample_rate=SAMPLE_RATE, ffmpeg_path=None, filename=None):
+    """오디오/비디오를 16비트 모노 PCM(int16 배열)으로 메모리에 디코딩
+
+    source가 파일 경로이면 FFmpeg가 직접 읽고, 업로드 파일/파일 객체/bytes이면
+    임시 파일 없이 stdin으로 전달합니다. MP4/MOV처럼 파이프 입력으로 디코딩할 수
+    없는 파일은 그때만 임시 파일을 사용합니다.
+    """
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+
+    if isinstance(source, (str, os.PathLike)):
+        pcm_data = _run_ffmpeg(_ffmpeg_command(ffmpeg_path, os.fspath(source), sample_rate))
+        return np.frombuffer(pcm_data, dtype=np.int16)
+
+    filename = filename or getattr(source, "name", "") or ""
+    try:
+        pcm_data = _run_ffmpeg(_ffmpeg_command(ffmpeg_path, "pipe:0", sample_rate), source)
+    except RuntimeError:
+        if not filename.lower().endswith(SEEKABLE_FORMATS):
+            raise
+        pcm_data = _decode_via_temp_file(source, sample_rate, ffmpeg_path, filename)
+    return np.frombuffer(pcm_data, dtype=np.int16)
+
+
+def _decode_via_temp_file(source, sample_rate, ffmpeg_path, filename):
+    """임의 접근이 필요한 컨테이너를 임시 파일로 저장한 뒤 디코딩"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_input:
+        for chunk in _iter_chunks(source):
+            temp_input.write(chunk)
+        temp_input_path = temp_input.name
+    try:
+        return _run_ffmpeg(_ffmpeg_command(ffmpeg_path, temp_input_path, sample_rate))
+    finally:
+        os.unlink(temp_input_path)
+
+
+def _stream_ffmpeg(command, source, chunk_bytes):
+    process, threads, stderr_chunks = _start_ffmpeg(command, source)
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16)
+        _finish_ffmpeg(process, threads, stderr_chunks)
+    finally:
+        # 소비자가 중간에 멈춘 경우 FFmpeg 종료
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def stream_audio(source, sample_rate=SAMPLE_RATE, chunk_seconds=30, ffmpeg_path=None, filename=None):
+    """오디오/비디오를 chunk_seconds 길이의 int16 PCM 조각으로 나누어 차례로 반환
+
+    decode_audio()와 달리 파일 전체를 메모리에 올리지 않으므로 입력 길이와 관계없이
+    메모리 사용량이 일정합니다. 파이프로 읽을 수 없는 MP4/MOV 업로드는 임시 파일에
+    저장한 뒤 같은 방식으로 읽습니다.
+    """
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    chunk_bytes = int(chunk_seconds * sample_rate) * 2
+
+    if isinstance(source, (str, os.PathLike)):
+        yield from _stream_ffmpeg(_ffmpeg_command(ffmpeg_path, os.fspath(source), sample_rate), None, chunk_bytes)
+        return
+
+    filename = filename or getattr(source, "name", "") or ""
+    started = False
+    try:
+        for chunk in _stream_ffmpeg(_ffmpeg_command(ffmpeg_path, "pipe:0", sample_rate), source, chunk_bytes):
+            started = True
+            yield chunk
+        return
+    except RuntimeError:
+        if started or not filename.lower().endswith(SEEKABLE_FORMATS):
+            raise
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_input:
+        for chunk in _iter_chunks(source):
+            temp_input.write(chunk)
+        temp_input_path = temp_input.name
+    try:
+        yield from _stream_ffmpeg(_ffmpeg_command(ffmpeg_path, temp_input_path, sample_rate), None, chunk_bytes)
+    finally:
+        os.unlink(temp_input_path)
+
+
+def probe_duration(source, ffmpeg_path=None):
+    """FFmpeg가 읽은 컨테이너 정보의 재생 시간(초). 알 수 없으면 None
+
+    ffprobe 없이 FFmpeg 출력의 "Duration:" 항목을 사용하며, 파일 경로 또는 메모리 데이터를
+    받습니다. 메모리 데이터는 앞부분만 전달하고 전체 크기와 비트레이트로 추정합니다.
+    """
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    if isinstance(source, (str, os.PathLike)):
+        command, data, size = [ffmpeg_path, "-nostdin", "-hide_banner", "-i", os.fspath(source)], None, None
+    else:
+        if hasattr(source, "getbuffer"):
+            source = source.getbuffer()
+        view = memoryview(source)
+        command, data, size = [ffmpeg_path, "-hide_banner", "-i", "pipe:0"], bytes(view[:PIPE_CHUNK_SIZE]), view.nbytes
+    try:
+        # 출력 파일을 지정하지 않으므로 FFmpeg는 입력 정보만 출력하고 오류 코드로 종료
+        completed = subprocess.run(command, input=data, stdin=None if data is not None else subprocess.DEVNULL,
+                                   capture_output=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(rb"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", completed.stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    # 파이프 입력은 재생 시간이 N/A로 나오므로 전체 크기와 비트레이트로 추정
+    match = re.search(rb"Duration: N/A.*?bitrate: (\d+) kb/s", completed.stderr)
+    if match and size:
+        return size * 8 / (int(match.group(1)) * 1000)
+    return None
+
+
+def pcm_to_float32(pcm):
+    """int16 PCM을 Whisper 입력 형식(-1~1 float32)으로 변환"""
+    return pcm.astype(np.float32) / 32768.0
+
+
+def pcm_duration(pcm, sample_rate=SAMPLE_RATE):
+    """PCM 배열의 길이(초)"""
+    return len(pcm) / float(sample_rate)
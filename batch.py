@@ -0,0 +1,308 @@
+"""여러 영상/음성 파일의 자막을 한 번에 생성하는 비대화형 배치 실행기
+
+폴더나 목록 파일(manifest)을 받아 Whisper 모델을 한 번만 로드한 뒤 순서대로
+처리합니다. 다음 파일의 FFmpeg 디코딩은 현재 파일을 인식하는 동안 미리 수행하며,
+원본보다 새 SRT가 이미 있는 파일은 건너뜁니다. 파일별 처리 시간과 처리량은
+JSON 요약 파일로 저장합니다.
+
+사용 예:
+    python batch.py lectures/ --llm openai --language ko --max-chars 40
+    python batch.py manifest.json --output-dir subtitles/ --summary summary.json
+
+목록 파일 형식:
+    .txt   한 줄에 파일 경로 하나 (#으로 시작하는 줄은 무시)
+    .json  경로 문자열 또는 {"input": ..., "output": ..., "language": ..., "context": ...} 객체의 배열
+    .jsonl 한 줄에 위 객체 하나
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from audio_io import decode_audio, pcm_duration, SAMPLE_RATE
+from llm_correction import DEFAULT_MAX_WORKERS, DEFAULT_BATCH_SIZE
+from vad import DEFAULT_VAD_WORKERS
+from cpu_threads import DEFAULT_INTRA_OP_THREADS, DEFAULT_INTER_OP_THREADS
+
+# 폴더에서 찾을 영상/음성 파일 확장자
+MEDIA_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".mp3", ".wav", ".m4a", ".flac", ".webm")
+
+# 목록 파일에서 파일별로 지정할 수 있는 자막 옵션
+JOB_OPTIONS = ("language", "context", "max_chars", "min_chars", "max_duration")
+
+
+def _output_path(input_path, output_dir=None, base_dir=None):
+    """자막 파일 경로. output_dir이 있으면 base_dir 기준 상대 경로를 유지"""
+    stem = os.path.splitext(input_path)[0]
+    if output_dir is None:
+        return f"{stem}.srt"
+    relative = os.path.relpath(stem, base_dir) if base_dir else os.path.basename(stem)
+    return os.path.join(output_dir, f"{relative}.srt")
+
+
+def _read_manifest(manifest_path):
+    """목록 파일에서 항목(경로 문자열 또는 딕셔너리) 목록을 읽음"""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        if manifest_path.endswith(".json"):
+            return json.load(f)
+        if manifest_path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return [line.strip().strip('"') for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def load_jobs(source, output_dir=None):
+    """폴더 또는 목록 파일에서 작업 목록 생성
+
+    각 작업은 {"input", "output", 파일별 옵션...} 딕셔너리입니다.
+    """
+    jobs = []
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(MEDIA_EXTENSIONS):
+                    input_path = os.path.join(root, name)
+                    jobs.append({"input": input_path, "output": _output_path(input_path, output_dir, source)})
+        return jobs
+
+    manifest_dir = os.path.dirname(os.path.abspath(source))
+    for entry in _read_manifest(source):
+        if isinstance(entry, str):
+            entry = {"input": entry}
+        job = {key: entry[key] for key in JOB_OPTIONS if entry.get(key) is not None}
+        # 목록 파일 안의 상대 경로는 목록 파일 위치 기준
+        job["input"] = os.path.join(manifest_dir, entry["input"])
+        if entry.get("output"):
+            job["output"] = os.path.join(manifest_dir, entry["output"])
+        else:
+            job["output"] = _output_path(job["input"], output_dir)
+        jobs.append(job)
+    return jobs
+
+
+def is_up_to_date(input_path, output_path):
+    """원본보다 나중에 만들어진 자막 파일이 있는지 확인"""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+
+def _timed_decode(input_path, ffmpeg_path):
+    start = time.perf_counter()
+    audio = decode_audio(input_path, SAMPLE_RATE, ffmpeg_path=ffmpeg_path)
+    return audio, time.perf_counter() - start
+
+
+def run_batch(generator, jobs, options=None, force=False, ffmpeg_path=None, streaming=False):
+    """작업 목록을 순서대로 처리하고 파일별 결과 목록을 반환
+
+    options는 generate_subtitles()에 넘길 공통 옵션이며, 작업에 같은 이름의 값이
+    있으면 작업의 값을 사용합니다. 다음 파일의 디코딩은 백그라운드 스레드에서 미리
+    시작하므로 FFmpeg 디코딩과 Whisper 인식이 겹쳐 실행됩니다. streaming이면 파일을
+    미리 디코딩하지 않고 스트리밍 모드로 처리합니다. ffmpeg_path를 주지 않으면 생성기의
+    FFmpeg(generator.ffmpeg_path)를 사용합니다.
+    """
+    options = options or {}
+    ffmpeg_path = ffmpeg_path or generator.ffmpeg_path
+    results = []
+
+    pending = []
+    for job in jobs:
+        if not os.path.exists(job["input"]):
+            results.append({"input": job["input"], "output": job["output"], "status": "failed",
+                            "error": "파일을 찾을 수 없습니다"})
+        elif not force and is_up_to_date(job["input"], job["output"]):
+            results.append({"input": job["input"], "output": job["output"], "status": "skipped"})
+        else:
+            pending.append(job)
+
+    def submit_decode(index):
+        if streaming or index >= len(pending):
+            return None
+        return decoder.submit(_timed_decode, pending[index]["input"], ffmpeg_path)
+
+    with ThreadPoolExecutor(max_workers=1) as decoder:
+        next_decode = submit_decode(0)
+        for i, job in enumerate(pending):
+            print(f"\n[{i + 1}/{len(pending)}] {job['input']}")
+            record = {"input": job["input"], "output": job["output"]}
+            start = time.perf_counter()
+            decode = next_decode
+            generator.last_job_id = None
+            generator.last_audio_seconds = None
+            generator.last_metrics = None
+            generator.last_escalation = None
+            next_decode = submit_decode(i + 1)
+            try:
+                audio = None
+                if decode is not None:
+                    audio, decode_seconds = decode.result()
+                    record["decode_seconds"] = round(decode_seconds, 3)
+                    record["decode_wait_seconds"] = round(time.perf_counter() - start, 3)
+                    record["audio_seconds"] = round(pcm_duration(audio), 3)
+
+                job_options = dict(options)
+                job_options.update({key: job[key] for key in JOB_OPTIONS if key in job})
+                os.makedirs(os.path.dirname(os.path.abspath(job["output"])), exist_ok=True)
+                generator.generate_subtitles(job["input"], output_path=job["output"], audio=audio,
+                                             streaming=streaming, **job_options)
+                del audio
+
+                if decode is None and generator.last_audio_seconds:
+                    # 스트리밍 모드는 인식하면서 읽은 오디오 길이를 사용
+                    record["audio_seconds"] = round(generator.last_audio_seconds, 3)
+                record["status"] = "done"
+            except Exception as e:
+                record["status"] = "failed"
+                record["error"] = str(e)
+                print(f"오류가 발생했습니다: {str(e)}")
+            # 실패한 파일은 같은 작업 ID로 다시 실행하면 이어서 처리됨
+            record["job_id"] = getattr(generator, "last_job_id", None)
+            if generator.last_metrics is not None:
+                # 단계별 처리 시간, 메모리, LLM 요청 통계 (metrics.JobMetrics.summary)
+                record["metrics"] = generator.last_metrics.summary()
+            if getattr(generator, "last_escalation", None):
+                # 초안 모델로 인식한 창 중 검증 모델로 다시 인식한 창 수와 비율
+                record["escalation"] = generator.last_escalation
+
+            elapsed = time.perf_counter() - start
+            record["total_seconds"] = round(elapsed, 3)
+            if record.get("audio_seconds"):
+                # 실시간 대비 처리 시간 비율(작을수록 빠름)과 초당 처리한 오디오 길이
+                record["real_time_factor"] = round(elapsed / record["audio_seconds"], 4)
+                record["throughput"] = round(record["audio_seconds"] / elapsed, 2) if elapsed else None
+            results.append(record)
+
+    # 건너뛴 파일을 포함하여 원래 작업 순서로 정렬
+    order = {job["input"]: i for i, job in enumerate(jobs)}
+    results.sort(key=lambda record: order[record["input"]])
+    return results
+
+
+def summarize(results, wall_seconds, settings=None):
+    """파일별 결과와 전체 처리량을 요약 딕셔너리로 정리"""
+    done = [r for r in results if r["status"] == "done"]
+    audio_seconds = sum(r.get("audio_seconds", 0) for r in done)
+    totals = {
+        "files": len(results),
+        "done": len(done),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput": round(audio_seconds / wall_seconds, 2) if wall_seconds else None,
+    }
+    escalations = [r["escalation"] for r in done if r.get("escalation")]
+    if escalations:
+        windows = sum(e["windows"] for e in escalations)
+        escalated = sum(e["escalated"] for e in escalations)
+        totals["escalation"] = {
+            "windows": windows,
+            "escalated": escalated,
+            "escalated_seconds": round(sum(e["escalated_seconds"] for e in escalations), 3),
+            "escalated_ratio": round(escalated / windows, 4) if windows else 0.0,
+        }
+    return {
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "settings": settings or {},
+        "totals": totals,
+        "files": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="폴더 또는 목록 파일의 영상/음성 자막을 일괄 생성합니다.")
+    parser.add_argument("source", help="영상/음성 파일이 있는 폴더 또는 목록 파일(.txt/.json/.jsonl)")
+    parser.add_argument("--output-dir", help="자막 저장 폴더 (기본값: 원본 파일 옆)")
+    parser.add_argument("--summary", default="batch_summary.json", help="JSON 요약 파일 경로")
+    parser.add_argument("--force", action="store_true", help="최신 자막이 있어도 다시 생성")
+    parser.add_argument("--model", default="small", help="Whisper 모델 크기")
+    parser.add_argument("--draft-model", help="초안 모델 크기 (예: tiny). 모든 구간을 먼저 인식하고 "
+                                              "신뢰도가 낮은 구간만 --model로 다시 인식")
+    parser.add_argument("--device", help="모델 장치 (cuda/cpu, 기본값: 자동)")
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"],
+                        help="연산 정밀도 (기본값: GPU는 float16, CPU는 float32. int8은 CPU 전용 양자화)")
+    parser.add_argument("--llm", choices=["openai", "anthropic", "none"], default="none", help="LLM 교정 제공자")
+    parser.add_argument("--llm-workers", type=int, default=DEFAULT_MAX_WORKERS, help="LLM 동시 요청 수")
+    parser.add_argument("--llm-batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="LLM 요청당 자막 수")
+    parser.add_argument("--language", help="자막 언어 (기본값: 자동 감지)")
+    parser.add_argument("--context", help="영상의 컨텍스트 (LLM 교정에 사용)")
+    parser.add_argument("--max-chars", type=int, help="한 자막당 최대 글자 수")
+    parser.add_argument("--min-chars", type=int, help="한 자막당 최소 글자 수")
+    parser.add_argument("--max-duration", type=float, help="한 자막당 최대 시간(초)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Whisper 배치 크기")
+    parser.add_argument("--vad-aggressiveness", type=int, default=1, choices=range(4), help="VAD 감도 (0~3)")
+    parser.add_argument("--vad-workers", type=int, default=DEFAULT_VAD_WORKERS, help="VAD 병렬 프로세스 수")
+    parser.add_argument("--threads", type=int, default=DEFAULT_INTRA_OP_THREADS,
+                        help="음성 인식 PyTorch 연산 스레드 수 (0이면 사용 가능한 모든 코어, 기본값: WHISPER_THREADS)")
+    parser.add_argument("--interop-threads", type=int, default=DEFAULT_INTER_OP_THREADS,
+                        help="PyTorch inter-op 스레드 수 (0이면 PyTorch 기본값, 기본값: WHISPER_INTEROP_THREADS)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="파일 전체를 메모리에 올리지 않고 일정 길이씩 처리 (매우 긴 파일용)")
+    parser.add_argument("--word-timestamps", action="store_true",
+                        help="단어 타임스탬프를 함께 인식하여 자막 분할 경계를 단어 시각에 맞춤")
+    parser.add_argument("--vad-trusted", action="store_true",
+                        help="VAD 구간을 믿고 온도 폴백과 최대 토큰 수를 줄인 빠른 디코딩 사용")
+    parser.add_argument("--ffmpeg", help="FFmpeg 실행 파일 경로 (기본값: FFMPEG_PATH 또는 PATH)")
+    args = parser.parse_args(argv)
+
+    from model_cache import is_smaller_model
+    if args.draft_model and not is_smaller_model(args.draft_model, args.model):
+        parser.error(f"--draft-model({args.draft_model})은 --model({args.model})보다 작은 모델이어야 합니다.")
+
+    jobs = load_jobs(args.source, args.output_dir)
+    if not jobs:
+        print(f"처리할 파일이 없습니다: {args.source}")
+        return 1
+
+    from script import SubtitleGenerator
+
+    start = time.perf_counter()
+    generator = SubtitleGenerator(
+        model_size=args.model,
+        llm_provider=None if args.llm == "none" else args.llm,
+        device=args.device,
+        dtype=args.dtype,
+        llm_max_workers=args.llm_workers,
+        llm_batch_size=args.llm_batch_size,
+        vad_workers=args.vad_workers,
+        intra_op_threads=args.threads,
+        inter_op_threads=args.interop_threads,
+        draft_model_size=args.draft_model,
+        ffmpeg_path=args.ffmpeg
+    )
+    options = {
+        "language": args.language,
+        "context": args.context,
+        "max_chars": args.max_chars,
+        "min_chars": args.min_chars,
+        "max_duration": args.max_duration,
+        "batch_size": args.batch_size,
+        "vad_aggressiveness": args.vad_aggressiveness,
+        "word_timestamps": args.word_timestamps,
+        "vad_trusted": args.vad_trusted,
+    }
+    results = run_batch(generator, jobs, options, force=args.force, streaming=args.streaming)
+
+    settings = {"source": args.source, "model": args.model, "draft_model": args.draft_model, "llm": args.llm,
+                **options}
+    summary = summarize(results, time.perf_counter() - start, settings)
+    with open(args.summary, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    totals = summary["totals"]
+    print(f"\n완료 {totals['done']}개, 건너뜀 {totals['skipped']}개, 실패 {totals['failed']}개 "
+          f"(오디오 {totals['audio_seconds']:.0f}초, 처리량 {totals['throughput'] or 0:.1f}배속)")
+    if totals.get("escalation"):
+        escalation = totals["escalation"]
+        print(f"초안 모델 인식 창 {escalation['windows']}개 중 {escalation['escalated']}개"
+              f"({escalation['escalated_ratio'] * 100:.1f}%)를 {args.model} 모델로 다시 인식")
+    print(f"요약 파일: {args.summary}")
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""CPU 음성 인식의 PyTorch 스레드 수 설정과 동시 작업 간 코어 분배
+
+PyTorch는 기본적으로 모든 코어를 연산(intra-op) 스레드로 사용하므로, 여러 세션이나
+작업자가 동시에 음성 인식을 하면 스레드가 코어 수의 몇 배가 되어 서로 느려집니다.
+
+- configure_threads(): intra-op/inter-op 스레드 수 설정
+- CoreScheduler: 한 프로세스 안에서 동시에 실행되는 작업(Streamlit 세션 등)에 코어를
+  나누어 줌. 작업이 시작되거나 끝나면 다음 배치부터 몫이 다시 계산됨
+- partition_cores(), pin_to_cores(): 작업자 프로세스마다 겹치지 않는 코어 묶음을 지정
+
+OpenMP 백엔드(리눅스/윈도우 기본 빌드)에서 intra-op 스레드 수는 호출한 스레드에만
+적용되므로, 같은 프로세스의 세션마다 다른 스레드 수를 사용할 수 있습니다.
+"""
+import os
+import threading
+
+# 기본 intra-op/inter-op 스레드 수 (0이면 동시 작업 수에 맞게 자동). 환경 변수로 변경 가능
+DEFAULT_INTRA_OP_THREADS = int(os.getenv("WHISPER_THREADS", "0"))
+DEFAULT_INTER_OP_THREADS = int(os.getenv("WHISPER_INTEROP_THREADS", "0"))
+
+
+def available_cores():
+    """이 프로세스가 사용할 수 있는 CPU 코어 번호 목록"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def configure_threads(intra_op=None, inter_op=None):
+    """PyTorch 스레드 수를 설정하고 적용된 (intra-op, inter-op) 스레드 수 반환
+
+    값이 없거나 0이면 바꾸지 않습니다. inter-op 스레드 수는 프로세스에서 병렬 연산이
+    시작되기 전에만 바꿀 수 있으므로, 이미 시작된 뒤에는 무시됩니다.
+    """
+    import torch
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op and torch.get_num_interop_threads() != inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            pass
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def partition_cores(cores, count):
+    """코어 목록을 count개의 연속된 묶음으로 고르게 나눔 (코어보다 많으면 코어를 함께 사용)"""
+    count = max(1, count)
+    base, extra = divmod(len(cores), count)
+    groups = []
+    position = 0
+    for i in range(count):
+        size = base + (1 if i < extra else 0)
+        groups.append(cores[position:position + size] or [cores[i % len(cores)]])
+        position += size
+    return groups
+
+
+def pin_to_cores(cores):
+    """현재 프로세스를 지정한 코어에서만 실행 (지원하지 않는 플랫폼이면 False)
+
+    PyTorch 스레드 풀이 만들어지기 전에 호출해야 연산 스레드도 같은 코어를 사용합니다.
+    """
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(0, cores)
+        return True
+    except OSError:
+        return False
+
+
+class ThreadLease:
+    """CoreScheduler에서 받은 작업 하나의 스레드 몫
+
+    threads를 지정하면 그 값을 그대로 사용하고, 아니면 스케줄러가 나눈 몫을 사용합니다.
+    음성 인식 스레드에서 배치마다 apply()를 호출하면 다른 작업이 시작되거나 끝난 만큼
+    스레드 수가 조정됩니다.
+    """
+
+    def __init__(self, scheduler, threads=None):
+        self.scheduler = scheduler
+        self.fixed = threads or None
+        self._applied = None
+
+    @property
+    def threads(self):
+        return self.fixed or self.scheduler.share(self)
+
+    def apply(self):
+        """호출한 스레드의 intra-op 스레드 수를 현재 몫으로 맞추고 반환"""
+        threads = self.threads
+        if threads != self._applied:
+            configure_threads(threads)
+            self._applied = threads
+        return threads
+
+    def release(self):
+        self.scheduler.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CoreScheduler:
+    """한 프로세스 안의 동시 작업들에 CPU 코어를 나누어 주는 스케줄러
+
+    스레드 수를 지정한 작업은 그만큼 코어를 먼저 차지하고, 나머지 코어를 자동 작업들이
+    고르게 나눕니다 (나누어 떨어지지 않는 코어는 먼저 시작한 작업에). 코어가 모자라도
+    작업마다 최소 1개의 스레드는 사용합니다.
+    """
+
+    def __init__(self, cores=None):
+        self.cores = list(cores) if cores else available_cores()
+        self._lock = threading.Lock()
+        self._leases = []
+
+    def acquire(self, threads=None):
+        """작업 시작 시 호출. with 문으로 사용하면 끝날 때 자동으로 반납됨"""
+        lease = ThreadLease(self, threads)
+        with self._lock:
+            self._leases.append(lease)
+        return lease
+
+    def release(self, lease):
+        with self._lock:
+            if lease in self._leases:
+                self._leases.remove(lease)
+
+    def share(self, lease):
+        """자동 작업 하나가 현재 사용할 스레드 수"""
+        with self._lock:
+            auto = [item for item in self._leases if item.fixed is None]
+            if lease not in auto:
+                return len(self.cores)
+            reserved = sum(item.fixed for item in self._leases if item.fixed is not None)
+            base, extra = divmod(max(len(self.cores) - reserved, 0), len(auto))
+            return max(1, base + (1 if auto.index(lease) < extra else 0))
+
+    def active(self):
+        """실행 중인 작업별 스레드 수"""
+        with self._lock:
+            leases = list(self._leases)
+        return [lease.threads for lease in leases]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """프로세스 전역 코어 스케줄러 반환"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = CoreScheduler()
+        return _scheduler
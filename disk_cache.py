@@ -0,0 +1,130 @@
+import os
+import json
+import hashlib
+import threading
+
+# 캐시 기본 경로. 환경 변수 SUBTITLE_CACHE_DIR로 변경 가능
+DEFAULT_CACHE_DIR = os.getenv(
+    "SUBTITLE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+
+def hash_key(*parts):
+    """여러 값을 JSON으로 직렬화하여 SHA-256 키 생성"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """내용 주소 기반 디스크 캐시
+
+    값은 키(해시)별 JSON 파일로 저장하며, 전체 크기가 max_bytes를 넘으면
+    가장 오래 사용하지 않은 항목부터 삭제합니다.
+    """
+
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self):
+        """(경로, 마지막 사용 시각, 크기) 목록"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def get(self, key, default=None):
+        """값 조회. 없으면 default 반환"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return default
+
+        with self._lock:
+            self.hits += 1
+        try:
+            # LRU 정리를 위해 사용 시각 갱신
+            os.utime(path, None)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        """값 저장 후 필요하면 오래된 항목 정리"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            self._total_bytes += len(data) - old_size
+            if self.max_bytes and self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key):
+        """항목 삭제"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    def _evict(self):
+        # 전체 크기가 예산의 90% 이하가 될 때까지 오래된 항목 삭제
+        target = self.max_bytes * 0.9
+        for path, _, size in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """모든 항목 삭제"""
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+    def stats(self):
+        """적중/미적중 횟수와 사용 용량"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size_mb": round(self._total_bytes / (1024 ** 2), 2),
+                "max_mb": round(self.max_bytes / (1024 ** 2), 2) if self.max_bytes else None,
+            }
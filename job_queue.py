@@ -0,0 +1,393 @@
+"""자막 생성 요청을 고정된 수의 작업자 프로세스에서 처리하는 로컬 작업 큐
+
+Streamlit 버튼 핸들러 안에서 음성 인식과 교정을 직접 실행하면 작업이 끝날 때까지
+스크립트 스레드가 멈추고, 위젯을 조작하여 다시 실행(rerun)되면 작업이 중단됩니다.
+JobQueue는 Whisper 모델을 가진 작업자 프로세스를 미리 띄워 두고 submit()으로 받은
+작업을 차례로 나누어 주며, UI는 status()/result()로 진행 상황을 확인합니다.
+작업자 수보다 많은 요청은 대기열에 쌓이고, 대기열이 가득 차면 새 요청을 거절합니다.
+"""
+import os
+import sys
+import time
+import uuid
+import queue
+import atexit
+import shutil
+import threading
+import traceback
+import collections
+import multiprocessing
+from disk_cache import DEFAULT_CACHE_DIR
+from cpu_threads import available_cores, partition_cores, DEFAULT_INTRA_OP_THREADS, DEFAULT_INTER_OP_THREADS
+
+# 작업자 프로세스 수와 대기열 크기. 환경 변수로 변경 가능
+DEFAULT_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "1"))
+DEFAULT_MAX_QUEUED = int(os.getenv("JOB_QUEUE_MAX_QUEUED", "8"))
+
+# 업로드 파일을 작업자 프로세스에 넘기기 위해 저장하는 경로
+UPLOADS_DIR = os.path.join(DEFAULT_CACHE_DIR, "uploads")
+
+# 끝난 작업의 결과를 보관하는 시간(초)
+RESULT_TTL_SECONDS = 3600
+
+# 상태에 보관하는 최근 로그 줄 수
+LOG_TAIL_LINES = 50
+
+# 작업자의 SubtitleGenerator 생성자에 넘기는 옵션 (나머지는 generate_subtitles()에 전달)
+GENERATOR_OPTIONS = (
+    "model_size", "llm_provider", "device", "dtype", "llm_max_workers", "llm_requests_per_minute",
+    "llm_batch_size", "llm_cache_enabled", "transcription_cache_enabled", "vad_workers", "draft_model_size",
+)
+
+# 작업을 제출할 때의 값을 작업자 프로세스에 전달하는 환경 변수
+FORWARDED_ENV = ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "PYTORCH_CUDA_ALLOC_CONF")
+
+# 교정 로그로 모으는 출력 줄 (script.SubtitleGenerator._print_correction 형식)
+CORRECTION_LOG_PREFIXES = ("원본 자막:", "교정된 자막:", "자막 교정 중 오류 발생:")
+
+
+class QueueFullError(RuntimeError):
+    """대기 중인 작업이 너무 많아 새 작업을 받을 수 없음"""
+
+
+class _EventWriter:
+    """작업자 프로세스의 print 출력을 줄 단위로 부모 프로세스에 전달"""
+
+    def __init__(self, events, job_id):
+        self.events = events
+        self.job_id = job_id
+        self._buffer = ""
+
+    def write(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                self.events.put(("log", self.job_id, line))
+        return len(text)
+
+    def flush(self):
+        if self._buffer.strip():
+            self.events.put(("log", self.job_id, self._buffer))
+        self._buffer = ""
+
+
+def _metrics_summary(generator):
+    """작업자에서 끝난 작업의 처리 통계 (metrics.JobMetrics.summary, 없으면 None)"""
+    metrics = getattr(generator, "last_metrics", None)
+    return metrics.summary() if metrics is not None else None
+
+def _worker_main(index, tasks, events, num_threads, cores=None, interop_threads=None):
+    """작업자 프로세스: 작업을 하나씩 받아 자막을 생성하고 결과를 이벤트로 보고"""
+    from cpu_threads import pin_to_cores, configure_threads
+    # PyTorch 스레드 풀이 만들어지기 전에 작업자의 코어 묶음에 고정하여 작업자끼리 코어를 나누어 사용
+    pin_to_cores(cores)
+    configure_threads(num_threads, interop_threads)
+    from script import SubtitleGenerator
+
+    generator = None
+    generator_key = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            job_id = task["job_id"]
+            events.put(("started", job_id, index))
+
+            stdout = sys.stdout
+            sys.stdout = _EventWriter(events, job_id)
+            try:
+                # 이전 작업의 API 키가 남아 이 작업에 쓰이지 않도록 전달하지 않은 키는 지움
+                for name in FORWARDED_ENV:
+                    if name not in task["env"]:
+                        os.environ.pop(name, None)
+                os.environ.update(task["env"])
+                # 같은 설정이면 생성기(와 모델)를 재사용
+                key = repr((sorted(task["generator_options"].items()), sorted(task["env"].items())))
+                if key != generator_key:
+                    generator = None
+                    generator = SubtitleGenerator(**task["generator_options"], intra_op_threads=num_threads)
+                    generator_key = key
+                generator.last_job_id = None
+                generator.last_metrics = None
+                output_path = generator.generate_subtitles(
+                    task["input_path"], output_path=task["output_path"], **task["subtitle_options"]
+                )
+                with open(output_path, "r", encoding="utf-8") as f:
+                    srt_content = f.read()
+                events.put(("done", job_id, srt_content, generator.last_job_id, _metrics_summary(generator)))
+            except Exception as e:
+                print(traceback.format_exc())
+                events.put(("failed", job_id, str(e), getattr(generator, "last_job_id", None),
+                            _metrics_summary(generator)))
+            finally:
+                sys.stdout.flush()
+                sys.stdout = stdout
+                try:
+                    os.remove(task["output_path"])
+                except OSError:
+                    pass
+    except KeyboardInterrupt:
+        pass
+
+
+class JobQueue:
+    """작업자 프로세스 풀과 대기열
+
+    submit()은 작업 ID를 바로 반환하고, 작업은 쉬고 있는 작업자가 생기면 제출 순서대로
+    시작됩니다. 작업자 프로세스는 작업 사이에 Whisper 모델을 유지하며, 비정상 종료되면
+    실행 중이던 작업을 실패로 기록하고 새로 시작합니다.
+    """
+
+    def __init__(self, num_workers=DEFAULT_QUEUE_WORKERS, max_queued=DEFAULT_MAX_QUEUED, upload_dir=UPLOADS_DIR,
+                 threads_per_worker=DEFAULT_INTRA_OP_THREADS, interop_threads=DEFAULT_INTER_OP_THREADS, pin_cores=True):
+        self.num_workers = max(1, num_workers)
+        self.max_queued = max_queued
+        self.upload_dir = upload_dir
+        # 작업자마다 겹치지 않는 코어 묶음을 주고, 스레드 수를 지정하지 않으면 묶음의 코어 수만큼 사용
+        self.core_groups = partition_cores(available_cores(), self.num_workers)
+        self.threads_per_worker = [threads_per_worker or len(cores) for cores in self.core_groups]
+        self.interop_threads = interop_threads
+        self.pin_cores = pin_cores
+        os.makedirs(upload_dir, exist_ok=True)
+
+        # CUDA와 Streamlit 서버 스레드가 있는 프로세스를 fork하지 않도록 spawn 사용
+        self._context = multiprocessing.get_context("spawn")
+        self._events = self._context.Queue()
+        self._lock = threading.Lock()
+        self._jobs = {}  # 작업 ID -> 상태 딕셔너리
+        self._waiting = collections.deque()  # 대기 중인 작업 ID
+        self._tasks = {}  # 대기 중인 작업 ID -> 작업자에게 보낼 내용
+        self._workers = [None] * self.num_workers
+        self._task_queues = [None] * self.num_workers
+        self._assigned = [None] * self.num_workers  # 작업자별 실행 중인 작업 ID
+        self._closed = False
+
+        for i in range(self.num_workers):
+            self._start_worker(i)
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+        atexit.register(self.shutdown)
+
+    def _start_worker(self, index):
+        # 작업자도 VAD용 프로세스 풀을 만들 수 있도록 데몬 프로세스로 만들지 않음
+        self._task_queues[index] = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self._task_queues[index], self._events, self.threads_per_worker[index],
+                  self.core_groups[index] if self.pin_cores else None, self.interop_threads),
+            name=f"subtitle-worker-{index}"
+        )
+        process.start()
+        self._workers[index] = process
+
+    def _save_upload(self, source, file_name):
+        """업로드 파일을 작업자가 읽을 수 있도록 저장하고 경로를 반환"""
+        path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex}{os.path.splitext(file_name)[1]}")
+        with open(path, "wb") as f:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                f.write(source)
+            elif hasattr(source, "getbuffer"):
+                f.write(source.getbuffer())
+            else:
+                if hasattr(source, "seek"):
+                    source.seek(0)
+                shutil.copyfileobj(source, f)
+        return path
+
+    def submit(self, source, file_name=None, options=None):
+        """자막 생성 작업을 대기열에 추가하고 작업 ID를 반환
+
+        source는 파일 경로 또는 업로드 파일/파일 객체/bytes이며, options에는
+        SubtitleGenerator 생성자 옵션(GENERATOR_OPTIONS)과 generate_subtitles() 옵션을
+        함께 넣습니다. 대기 중인 작업이 max_queued개 이상이면 QueueFullError가 발생합니다.
+        """
+        if self._closed:
+            raise RuntimeError("작업 큐가 종료되었습니다")
+        options = dict(options or {})
+        file_name = file_name or getattr(source, "name", None) or os.path.basename(str(source))
+
+        with self._lock:
+            self._prune()
+            if len(self._waiting) >= self.max_queued:
+                raise QueueFullError(
+                    f"대기 중인 작업이 {len(self._waiting)}개로 가득 찼습니다. 잠시 후 다시 시도하세요."
+                )
+
+        owns_input = not isinstance(source, (str, os.PathLike))
+        input_path = self._save_upload(source, file_name) if owns_input else os.fspath(source)
+        job_id = uuid.uuid4().hex[:12]
+        task = {
+            "job_id": job_id,
+            "input_path": input_path,
+            "output_path": os.path.join(self.upload_dir, f"{job_id}.srt"),
+            "generator_options": {key: options.pop(key) for key in GENERATOR_OPTIONS if key in options},
+            "subtitle_options": options,
+            "env": {key: os.environ[key] for key in FORWARDED_ENV if os.environ.get(key)},
+        }
+
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id,
+                "file_name": file_name,
+                "state": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "message": "대기 중",
+                "log": collections.deque(maxlen=LOG_TAIL_LINES),
+                "correction_logs": [],
+                "error": None,
+                "checkpoint_id": None,
+                "metrics": None,
+                "result": None,
+                "input_path": input_path if owns_input else None,
+            }
+            self._tasks[job_id] = task
+            self._waiting.append(job_id)
+            self._dispatch()
+        return job_id
+
+    def status(self, job_id):
+        """작업 상태 딕셔너리 (없으면 None)
+
+        state는 queued/running/done/failed/cancelled 중 하나이며, 대기 중이면 position에
+        대기 순서(1부터)가 들어갑니다.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            status = {key: value for key, value in job.items() if key not in ("result", "input_path")}
+            status["log"] = list(job["log"])
+            status["correction_logs"] = list(job["correction_logs"])
+            status["position"] = self._waiting.index(job_id) + 1 if job["state"] == "queued" else None
+            return status
+
+    def result(self, job_id):
+        """완료된 작업의 SRT 내용 (완료되지 않았으면 None)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job["result"] if job is not None else None
+
+    def cancel(self, job_id):
+        """아직 시작하지 않은 작업 취소 (취소했으면 True)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] != "queued":
+                return False
+            self._waiting.remove(job_id)
+            del self._tasks[job_id]
+            self._finish(job, "cancelled", "취소됨")
+            return True
+
+    def stats(self):
+        """대기/실행 중인 작업 수"""
+        with self._lock:
+            return {
+                "workers": self.num_workers,
+                "running": sum(1 for job_id in self._assigned if job_id is not None),
+                "queued": len(self._waiting),
+            }
+
+    def shutdown(self, timeout=5):
+        """작업자 프로세스 종료 (실행 중인 작업은 중단됨)"""
+        if self._closed:
+            return
+        self._closed = True
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    def _dispatch(self):
+        """쉬고 있는 작업자에게 대기 중인 작업 전달 (잠금을 가진 상태에서 호출)"""
+        for index, assigned in enumerate(self._assigned):
+            if not self._waiting:
+                break
+            if assigned is None:
+                job_id = self._waiting.popleft()
+                self._assigned[index] = job_id
+                job = self._jobs[job_id]
+                job["state"] = "running"
+                job["started_at"] = time.time()
+                job["message"] = "작업자에게 전달됨"
+                self._task_queues[index].put(self._tasks.pop(job_id))
+
+    def _finish(self, job, state, message):
+        job["state"] = state
+        job["message"] = message
+        job["finished_at"] = time.time()
+        if job["input_path"]:
+            try:
+                os.remove(job["input_path"])
+            except OSError:
+                pass
+            job["input_path"] = None
+
+    def _release(self, job_id):
+        for index, assigned in enumerate(self._assigned):
+            if assigned == job_id:
+                self._assigned[index] = None
+        self._dispatch()
+
+    def _prune(self):
+        """보관 시간이 지난 완료 작업 삭제"""
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job["finished_at"] and now - job["finished_at"] > RESULT_TTL_SECONDS]:
+            del self._jobs[job_id]
+
+    def _listen(self):
+        """작업자 이벤트를 받아 작업 상태를 갱신하고, 종료된 작업자를 다시 시작"""
+        while not self._closed:
+            try:
+                event = self._events.get(timeout=1.0)
+            except queue.Empty:
+                event = None
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                if event is not None:
+                    self._handle_event(*event)
+                if not self._closed:
+                    self._check_workers()
+
+    def _handle_event(self, kind, job_id, *args):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        if kind == "started":
+            job["message"] = "처리 시작"
+        elif kind == "log":
+            line = args[0]
+            job["log"].append(line)
+            job["message"] = line.strip()
+            if line.startswith(CORRECTION_LOG_PREFIXES):
+                job["correction_logs"].append(line)
+        elif kind == "done":
+            job["result"], job["checkpoint_id"], job["metrics"] = args
+            self._finish(job, "done", "완료")
+            self._release(job_id)
+        elif kind == "failed":
+            job["error"], job["checkpoint_id"], job["metrics"] = args
+            self._finish(job, "failed", f"오류: {job['error']}")
+            self._release(job_id)
+
+    def _check_workers(self):
+        for index, process in enumerate(self._workers):
+            if process.is_alive():
+                continue
+            job_id = self._assigned[index]
+            if job_id is not None and job_id in self._jobs:
+                job = self._jobs[job_id]
+                job["error"] = f"작업자 프로세스가 비정상 종료되었습니다 (코드 {process.exitcode})"
+                self._finish(job, "failed", f"오류: {job['error']}")
+            self._assigned[index] = None
+            self._start_worker(index)
+        self._dispatch()
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import shutil
+import threading
+from disk_cache import DEFAULT_CACHE_DIR, hash_key
+
+# 작업 체크포인트 저장 경로
+JOBS_DIR = os.path.join(DEFAULT_CACHE_DIR, "jobs")
+
+
+def make_job_id(audio_hash, model_size, dtype, language, vad_setting, word_timestamps=False, vad_trusted=False,
+                draft_model=None):
+    """파일 내용과 인식 설정으로 작업 ID 생성
+
+    같은 파일을 같은 설정으로 다시 실행하면 같은 ID가 되어 중단된 작업을 이어서 진행합니다.
+    """
+    parts = ["job", audio_hash, model_size, dtype, language, vad_setting]
+    if word_timestamps:
+        # 단어 타임스탬프 없이 저장된 구간 결과를 이어서 사용하지 않도록 구분
+        parts.append("words")
+    if vad_trusted:
+        parts.append("trusted")
+    if draft_model:
+        parts.append(f"draft:{draft_model}")
+    return hash_key(*parts)[:16]
+
+
+class JobCheckpoint:
+    """자막 생성 작업의 진행 상황을 작업 폴더에 저장하고 복원
+
+    VAD 구간별 음성 인식 결과와 자막별 LLM 교정 결과를 완료되는 즉시 JSON Lines
+    파일에 한 줄씩 추가하므로, 세션이 끊기거나 API 오류로 중단되어도 다시 실행하면
+    마지막으로 완료된 구간부터 이어서 처리합니다. 작업이 끝나면 finish()로 폴더를
+    삭제합니다.
+    """
+
+    def __init__(self, job_id, directory=JOBS_DIR, info=None):
+        self.job_id = job_id
+        self.directory = os.path.join(directory, job_id)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.meta = self._read_json("meta.json") or {"job_id": job_id, "created_at": time.time()}
+        self.resumed = any(os.path.exists(self._path(name)) for name in ("segments.jsonl", "corrections.jsonl"))
+        if info:
+            self.meta.update(info)
+        self._write_meta()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_json(self, name):
+        try:
+            with open(self._path(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self):
+        self.meta["updated_at"] = time.time()
+        temp_path = self._path("meta.json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(temp_path, self._path("meta.json"))
+
+    def _read_records(self, name):
+        """JSON Lines 파일 읽기 (중단으로 잘린 마지막 줄은 무시)"""
+        records = []
+        try:
+            with open(self._path(name), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+        except OSError:
+            pass
+        return records
+
+    def _append(self, name, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self._path(name), "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    # 음성 인식
+
+    @property
+    def language(self):
+        """저장된 인식 언어와 확률 (없으면 (None, None))"""
+        return self.meta.get("language"), self.meta.get("language_probability")
+
+    def save_language(self, language, probability):
+        with self._lock:
+            self.meta["language"] = language
+            self.meta["language_probability"] = probability
+            self._write_meta()
+
+    def voice_segments(self):
+        """저장된 VAD 구간 목록 (없으면 None)"""
+        segments = self._read_json("voice_segments.json")
+        return [tuple(segment) for segment in segments] if segments is not None else None
+
+    def save_voice_segments(self, voice_segments):
+        with open(self._path("voice_segments.json"), "w", encoding="utf-8") as f:
+            json.dump([list(segment) for segment in voice_segments], f)
+
+    def completed_segments(self):
+        """VAD 구간 인덱스별로 완료된 인식 결과"""
+        return {record["index"]: record["segments"] for record in self._read_records("segments.jsonl")}
+
+    def save_segment(self, index, segments):
+        self._append("segments.jsonl", {"index": index, "segments": segments})
+
+    def transcription_result(self):
+        """모든 구간의 인식이 끝났으면 transcribe_segments()와 같은 형태의 결과, 아니면 None"""
+        voice_segments = self.voice_segments()
+        language, probability = self.language
+        if voice_segments is None or language is None:
+            return None
+        completed = self.completed_segments()
+        if len(completed) < len(voice_segments):
+            return None
+        all_segments = []
+        for index in range(len(voice_segments)):
+            all_segments.extend(completed.get(index) or [])
+        return {"segments": all_segments, "language": language, "language_probability": probability}
+
+    # LLM 교정
+
+    def completed_corrections(self, fingerprint):
+        """자막 인덱스별로 완료된 교정 결과
+
+        LLM 설정(fingerprint)이 저장된 작업과 다르면 이전 교정 결과를 버립니다.
+        """
+        if self.meta.get("correction_fingerprint") != fingerprint:
+            with self._lock:
+                try:
+                    os.remove(self._path("corrections.jsonl"))
+                except OSError:
+                    pass
+                self.meta["correction_fingerprint"] = fingerprint
+                self._write_meta()
+            return {}
+        return {record["index"]: record["text"] for record in self._read_records("corrections.jsonl")}
+
+    def save_correction(self, index, text):
+        self._append("corrections.jsonl", {"index": index, "text": text})
+
+    def finish(self):
+        """작업 완료 후 체크포인트 삭제 (결과는 음성 인식/교정 캐시에 남음)"""
+        shutil.rmtree(self.directory, ignore_errors=True)
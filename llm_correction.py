@@ -0,0 +1,431 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from openai import OpenAI
+import openai
+import anthropic
+from disk_cache import DiskCache, DEFAULT_CACHE_DIR, hash_key
+
+# 제공자별 기본 모델
+DEFAULT_MODELS = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-5-haiku-20241022",
+}
+
+# 기본 동시 요청 수와 분당 요청/토큰 한도
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200000
+
+# 한 요청에 묶어 교정할 자막 수 (1이면 자막마다 개별 요청)
+DEFAULT_BATCH_SIZE = 1
+# 배치 응답에 허용할 최대 출력 토큰 수
+MAX_BATCH_OUTPUT_TOKENS = 8000
+
+# 교정 프롬프트에 넣는 다음 자막 수. 이만큼 인식되어야 앞 자막의 교정을 시작할 수 있음
+LOOKAHEAD_SUBS = 2
+
+# 교정 결과 캐시 경로와 최대 용량(MB)
+CORRECTION_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "llm_corrections")
+CORRECTION_CACHE_MAX_MB = int(os.getenv("LLM_CORRECTION_CACHE_MB", "100"))
+
+# 재시도 설정 (429, 5xx, 연결 오류)
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+
+def create_llm_client(provider, api_key, base_url=None):
+    """LLM 제공자 클라이언트 생성
+
+    재시도는 LLMCorrector가 직접 처리하므로 SDK 자체 재시도는 끕니다.
+    base_url을 지정하지 않으면 OPENAI_BASE_URL/ANTHROPIC_BASE_URL 환경 변수를 따릅니다.
+    """
+    if provider == "openai":
+        return OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+    if provider == "anthropic":
+        return anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+    return None
+
+
+def estimate_tokens(text):
+    """요청 토큰 수 대략 추정 (한글 기준 약 2자당 1토큰)"""
+    return len(text) // 2 + 1
+
+
+def is_retryable_error(error):
+    """재시도할 오류인지 확인 (429, 5xx, 연결/시간 초과)"""
+    if isinstance(error, (openai.APIConnectionError, anthropic.APIConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code == 429 or (status_code is not None and status_code >= 500)
+
+
+def retry_after_seconds(error):
+    """응답의 Retry-After 헤더 값(초)"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_batch_response(response_text, expected_count):
+    """배치 교정 응답(JSON 문자열 배열)을 파싱
+
+    형식이 잘못되었거나 개수가 맞지 않으면 None을 반환합니다.
+    """
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", response_text.strip())
+    start = text.find("[")
+    end = text.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    try:
+        items = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(items, list) or len(items) != expected_count:
+        return None
+    if not all(isinstance(item, str) for item in items):
+        return None
+    return [item.strip() for item in items]
+
+
+class CorrectionCache(DiskCache):
+    """LLM 교정 응답 디스크 캐시
+
+    제공자, 모델, 온도, 시스템 프롬프트, 완성된 사용자 프롬프트가 모두 같으면 같은
+    키가 되므로 같은 파일을 다시 처리할 때 API를 호출하지 않습니다.
+    """
+
+    FINGERPRINT_FILE = "prompts.sha256"
+
+    def __init__(self, directory=CORRECTION_CACHE_DIR, max_bytes=CORRECTION_CACHE_MAX_MB * 1024 * 1024,
+                 prompt_manager=None):
+        super().__init__(directory, max_bytes)
+        if prompt_manager is not None:
+            self.invalidate_if_prompts_changed(prompt_manager)
+
+    def key(self, provider, model, temperature, max_tokens, system_prompt, user_prompt):
+        return hash_key(provider, model, temperature, max_tokens, system_prompt, user_prompt)
+
+    def invalidate_if_prompts_changed(self, prompt_manager):
+        """prompts/*.md 내용이 바뀌었으면 캐시를 비우고 True 반환"""
+        fingerprint = hash_key(
+            prompt_manager.system_prompt,
+            prompt_manager.user_prompt_template,
+            getattr(prompt_manager, "batch_user_prompt_template", "")
+        )
+        fingerprint_path = os.path.join(self.directory, self.FINGERPRINT_FILE)
+        try:
+            with open(fingerprint_path, "r", encoding="utf-8") as f:
+                previous = f.read().strip()
+        except OSError:
+            previous = None
+
+        if previous == fingerprint:
+            return False
+        if previous is not None:
+            self.clear()
+        with open(fingerprint_path, "w", encoding="utf-8") as f:
+            f.write(fingerprint)
+        return previous is not None
+
+
+class RateLimiter:
+    """분당 요청 수와 토큰 수를 제한하는 슬라이딩 윈도우 리미터"""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, window=60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._events = collections.deque()  # (시각, 토큰 수)
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=0):
+        """한도 내에서 요청을 보낼 수 있을 때까지 대기"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= self.window:
+                    _, old_tokens = self._events.popleft()
+                    self._tokens -= old_tokens
+
+                requests_ok = (not self.requests_per_minute
+                               or len(self._events) < self.requests_per_minute)
+                # 요청 하나가 한도보다 크더라도 창이 비어 있으면 보냄
+                tokens_ok = (not self.tokens_per_minute or not self._events
+                             or self._tokens + tokens <= self.tokens_per_minute)
+                if requests_ok and tokens_ok:
+                    self._events.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                wait = self._events[0][0] + self.window - now
+            time.sleep(max(wait, 0.01))
+
+
+class LLMCorrector:
+    """LLM 자막 교정기
+
+    자막마다 원본 이전/다음 자막을 문맥으로 삼으므로 요청끼리 의존성이 없어,
+    스레드 풀로 동시에 보내고 결과는 원래 순서대로 모읍니다. batch_size가 1보다
+    크면 연속된 자막을 묶어 한 요청으로 보내 시스템 프롬프트와 문맥 자막의
+    중복 전송을 줄입니다.
+    """
+
+    def __init__(self, provider, client, prompt_manager, model=None, temperature=0.3, max_tokens=1000,
+                 max_workers=DEFAULT_MAX_WORKERS, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE, max_retries=MAX_RETRIES,
+                 batch_size=DEFAULT_BATCH_SIZE, cache=None):
+        self.provider = provider
+        self.client = client
+        self.prompt_manager = prompt_manager
+        self.model = model or DEFAULT_MODELS.get(provider)
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_workers = max(1, int(max_workers))
+        self.max_retries = max_retries
+        self.batch_size = max(1, int(batch_size))
+        self.cache = cache
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        # 요청별 지연 시간과 토큰 수를 기록할 metrics.JobMetrics (작업마다 설정)
+        self.metrics = None
+
+    def _request(self, system_prompt, user_prompt, max_tokens):
+        """제공자 API 호출 1회"""
+        start = time.perf_counter()
+        if self.provider == "openai":
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=self.temperature
+            )
+            usage = getattr(response, "usage", None)
+            self._record_request(start, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+            return response.choices[0].message.content.strip()
+
+        if self.provider == "anthropic":
+            response = self.client.messages.create(
+                model=self.model,
+                max_tokens=max_tokens,
+                temperature=self.temperature,
+                system=system_prompt,
+                messages=[{"role": "user", "content": user_prompt}]
+            )
+            usage = getattr(response, "usage", None)
+            self._record_request(start, getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None))
+            return response.content[0].text.strip()
+
+        raise ValueError(f"지원하지 않는 LLM 제공자입니다: {self.provider}")
+
+    def _record_request(self, start, input_tokens=None, output_tokens=None, ok=True):
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.record_llm_request(time.perf_counter() - start, input_tokens, output_tokens, ok)
+
+    def complete(self, system_prompt, user_prompt, max_tokens=None):
+        """속도 제한과 재시도를 적용하여 요청하고 응답 텍스트를 반환"""
+        max_tokens = max_tokens or self.max_tokens
+        tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + max_tokens // 4
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(tokens)
+            start = time.perf_counter()
+            try:
+                return self._request(system_prompt, user_prompt, max_tokens)
+            except Exception as e:
+                self._record_request(start, ok=False)
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                time.sleep(delay)
+                attempt += 1
+
+    def _cached_complete(self, user_prompt, max_tokens=None, validate=None):
+        """캐시를 먼저 확인하고 없으면 요청. validate를 통과한 응답만 캐시에 저장"""
+        max_tokens = max_tokens or self.max_tokens
+        system_prompt = self.prompt_manager.system_prompt
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.provider, self.model, self.temperature, max_tokens, system_prompt, user_prompt)
+            cached = self.cache.get(key)
+            if cached is not None and (validate is None or validate(cached)):
+                return cached
+
+        response_text = self.complete(system_prompt, user_prompt, max_tokens)
+        if key is not None and (validate is None or validate(response_text)):
+            self.cache.set(key, response_text)
+        return response_text
+
+    def fingerprint(self, context=None):
+        """교정 결과에 영향을 주는 설정(제공자, 모델, 프롬프트, 배치 크기, 컨텍스트)의 해시"""
+        prompt_manager = self.prompt_manager
+        return hash_key(
+            self.provider, self.model, self.temperature, self.max_tokens, self.batch_size, context,
+            prompt_manager.system_prompt, prompt_manager.user_prompt_template,
+            getattr(prompt_manager, "batch_user_prompt_template", "")
+        )
+
+    def correct(self, subtitle_text, context=None, previous_subs=None, next_subs=None):
+        """자막 하나 교정"""
+        user_prompt = self.prompt_manager.get_user_prompt(context, subtitle_text, previous_subs, next_subs)
+        return self._cached_complete(user_prompt)
+
+    def _correct_at(self, texts, index, context):
+        previous_texts = texts[max(0, index - 2):index]
+        next_texts = texts[index + 1:index + 3]
+        try:
+            return self.correct(texts[index], context, previous_texts, next_texts), None
+        except Exception as e:
+            return texts[index], e
+
+    def correct_batch(self, subtitle_texts, context=None, previous_subs=None, next_subs=None):
+        """연속된 자막 여러 개를 한 번의 요청으로 교정
+
+        응답 형식이 잘못되었거나 개수가 맞지 않으면 ValueError를 발생시킵니다.
+        """
+        user_prompt = self.prompt_manager.get_batch_user_prompt(context, subtitle_texts, previous_subs, next_subs)
+        max_tokens = min(MAX_BATCH_OUTPUT_TOKENS, self.max_tokens * len(subtitle_texts))
+        response_text = self._cached_complete(
+            user_prompt, max_tokens,
+            validate=lambda text: parse_batch_response(text, len(subtitle_texts)) is not None
+        )
+        corrected_texts = parse_batch_response(response_text, len(subtitle_texts))
+        if corrected_texts is None:
+            raise ValueError("배치 교정 응답의 형식 또는 자막 개수가 올바르지 않습니다.")
+        return corrected_texts
+
+    def _correct_range(self, texts, start, end, context):
+        """texts[start:end] 구간을 배치로 교정, 실패하면 자막별 개별 교정으로 대체"""
+        if end - start == 1:
+            return [self._correct_at(texts, start, context)]
+
+        previous_texts = texts[max(0, start - 2):start]
+        next_texts = texts[end:end + 2]
+        try:
+            corrected_texts = self.correct_batch(texts[start:end], context, previous_texts, next_texts)
+            return [(corrected_text, None) for corrected_text in corrected_texts]
+        except Exception:
+            return [self._correct_at(texts, i, context) for i in range(start, end)]
+
+    def correct_all(self, texts, context=None, on_result=None):
+        """자막 목록 전체를 동시에 교정하여 원래 순서의 목록으로 반환
+
+        batch_size가 1보다 크면 연속된 자막을 batch_size개씩 묶어 한 요청으로 교정합니다.
+        on_result(인덱스, 원본, 교정 결과, 오류)는 호출한 스레드에서 완료 순서대로 호출됩니다.
+        교정에 실패한 자막은 원본을 그대로 사용합니다.
+        """
+        with CorrectionPipeline(self, context, on_result) as pipeline:
+            pipeline.feed(texts)
+            return pipeline.finish()
+
+
+class CorrectionPipeline:
+    """음성 인식 결과가 나오는 대로 LLM 교정을 시작하는 파이프라인
+
+    인식 단계가 feed()로 자막을 순서대로 넘기면, 프롬프트에 필요한 다음 자막
+    LOOKAHEAD_SUBS개가 모인 자막부터 스레드 풀에 교정 요청을 넣습니다. 대기 중인
+    요청이 max_pending개에 이르면 feed()가 하나가 끝날 때까지 기다리므로 두 단계
+    사이의 대기열 크기가 제한됩니다. on_result는 feed()/finish()를 호출한 스레드에서
+    실행되므로 Streamlit 화면을 갱신해도 안전합니다. completed(인덱스별 교정 결과)가
+    주어지면 묶음 전체가 교정된 자막은 요청 없이 저장된 결과를 사용하며, 그 인덱스는
+    on_result를 호출하기 전에 reused에 추가됩니다 (일부만 저장된 묶음은 다시 요청).
+
+    사용 예:
+        with CorrectionPipeline(corrector, context, on_result) as pipeline:
+            for segments in ...:
+                pipeline.feed(texts)
+            corrected_texts = pipeline.finish()
+    """
+
+    def __init__(self, corrector, context=None, on_result=None, max_pending=None, completed=None):
+        self.corrector = corrector
+        self.context = context
+        self.on_result = on_result
+        self.completed = completed or {}
+        # 요청 없이 completed의 결과를 사용한 자막 인덱스
+        self.reused = set()
+        self.max_pending = max_pending or corrector.max_workers * 2
+        self.texts = []
+        self.results = []
+        self._next_start = 0
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=corrector.max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 오류로 빠져나가면 아직 시작하지 않은 요청은 취소
+        self.close(cancel=exc_type is not None)
+        return False
+
+    def close(self, cancel=False):
+        """스레드 풀 종료. cancel이면 아직 시작하지 않은 요청은 취소
+
+        이미 보낸 요청의 결과는 버리지 않고 on_result로 전달하여 저장할 수 있게 합니다.
+        """
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+        self._dispatch([future for future in self._pending if not future.cancelled()])
+
+    def _dispatch(self, futures):
+        for future in futures:
+            start = self._pending.pop(future)
+            for i, (corrected_text, error) in enumerate(future.result(), start):
+                self.results[i] = corrected_text
+                if self.on_result:
+                    self.on_result(i, self.texts[i], corrected_text, error)
+
+    def _wait(self):
+        """대기 중인 요청이 하나 이상 끝날 때까지 기다린 뒤 결과 처리"""
+        done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+        self._dispatch(done)
+
+    def _submit_ready(self, finished=False):
+        batch_size = self.corrector.batch_size
+        while self._next_start < len(self.texts):
+            end = min(self._next_start + batch_size, len(self.texts))
+            if not finished and (end - self._next_start < batch_size or len(self.texts) < end + LOOKAHEAD_SUBS):
+                break
+            if all(i in self.completed for i in range(self._next_start, end)):
+                # 중단된 작업에서 이미 교정한 자막
+                for i in range(self._next_start, end):
+                    self.results[i] = self.completed[i]
+                    self.reused.add(i)
+                    if self.on_result:
+                        self.on_result(i, self.texts[i], self.completed[i], None)
+                self._next_start = end
+                continue
+            if len(self._pending) >= self.max_pending:
+                self._wait()
+                continue
+            future = self._executor.submit(self.corrector._correct_range, self.texts, self._next_start, end, self.context)
+            self._pending[future] = self._next_start
+            self._next_start = end
+
+    def feed(self, texts):
+        """인식이 끝난 자막을 순서대로 추가하고, 교정할 수 있는 자막의 요청을 시작"""
+        self.texts.extend(texts)
+        self.results.extend(texts)
+        self._submit_ready()
+        self._dispatch([future for future in self._pending if future.done()])
+
+    def finish(self):
+        """남은 자막을 모두 교정하고 원래 순서의 교정 결과 목록을 반환"""
+        self._submit_ready(finished=True)
+        while self._pending:
+            self._wait()
+        return self.results
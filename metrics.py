@@ -0,0 +1,297 @@
+"""자막 생성 작업의 단계별 처리 시간과 자원 사용량 측정
+
+JobMetrics는 단계(span)별 처리 시간, 처리한 오디오 길이와 실시간 대비 처리 비율(RTF),
+LLM 요청 지연 시간 분포와 토큰 수, 단계별 최대 메모리(RSS)를 기록하고 JSON Lines와
+Prometheus 텍스트 형식으로 내보냅니다.
+
+환경 변수 SUBTITLE_METRICS_LOG에 파일 경로를 지정하면 작업이 끝날 때마다 JSON 한 줄을
+추가하고, SUBTITLE_METRICS_PROM에 경로를 지정하면 마지막 작업의 측정값을 Prometheus
+텍스트 형식으로 덮어씁니다 (node_exporter textfile collector용).
+"""
+import os
+import sys
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+METRICS_LOG_PATH = os.getenv("SUBTITLE_METRICS_LOG")
+METRICS_PROM_PATH = os.getenv("SUBTITLE_METRICS_PROM")
+
+# 단계 실행 중 메모리 사용량을 확인하는 간격(초)
+RSS_SAMPLE_INTERVAL = 0.05
+
+# 보고하는 LLM 요청 지연 시간 분위수
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def current_rss_mb():
+    """현재 프로세스의 RSS(MB). 확인할 수 없으면 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def reset_peak_rss():
+    """리눅스에서 프로세스 최대 RSS(VmHWM)를 현재 값으로 초기화 (성공하면 True)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """프로세스 최대 RSS(MB). 초기화할 수 없는 환경에서는 프로세스 시작 이후 최대값"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, q):
+    """정렬된 값 목록의 q 분위수 (nearest-rank)"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+class JobMetrics:
+    """작업 하나의 단계별 측정값
+
+    with metrics.span("asr"): 처럼 단계를 감싸면 처리 시간이 누적되고, 단계가 실행되는
+    동안 백그라운드 스레드가 RSS를 확인하여 단계별 최대 메모리를 기록합니다. 같은
+    이름의 단계가 여러 번 실행되면 시간과 호출 횟수를 합칩니다.
+    """
+
+    def __init__(self, job_id=None, labels=None):
+        self.job_id = job_id
+        self.labels = dict(labels or {})
+        self.started_at = time.time()
+        self.audio_seconds = None
+        self.wall_seconds = None
+        self.stages = {}  # 단계 이름 -> {"seconds", "calls", "peak_rss_mb"}
+        self.llm_requests = []  # (시작 시각, 지연 시간, 입력 토큰, 출력 토큰, 성공 여부)
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._active = {}  # 실행 중인 단계 -> 지금까지의 최대 RSS
+        self._sampler = None
+
+    def begin(self, name):
+        """단계 측정 시작. 반환값을 end()에 넘기면 측정이 끝남 (with로 감싸기 어려운 코드용)"""
+        token = (name, time.perf_counter())
+        with self._lock:
+            self._active[token] = current_rss_mb()
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+                self._sampler.start()
+        return token
+
+    def end(self, token):
+        """begin()으로 시작한 단계 측정 종료"""
+        name, start = token
+        elapsed = time.perf_counter() - start
+        rss = current_rss_mb()
+        with self._lock:
+            peak = self._active.pop(token, None)
+            if rss is not None:
+                peak = max(peak or 0.0, rss)
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "peak_rss_mb": None})
+            stage["seconds"] += elapsed
+            stage["calls"] += 1
+            if peak is not None:
+                stage["peak_rss_mb"] = max(stage["peak_rss_mb"] or 0.0, peak)
+
+    @contextmanager
+    def span(self, name):
+        """with 블록의 단계 처리 시간과 최대 메모리 측정"""
+        token = self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(token)
+
+    def _sample_rss(self):
+        while True:
+            time.sleep(RSS_SAMPLE_INTERVAL)
+            rss = current_rss_mb()
+            with self._lock:
+                if not self._active:
+                    # 실행 중인 단계가 없으면 종료 (다음 단계에서 다시 시작)
+                    self._sampler = None
+                    return
+                if rss is not None:
+                    for token, peak in self._active.items():
+                        self._active[token] = max(peak or 0.0, rss)
+
+    def record_llm_request(self, latency, input_tokens=None, output_tokens=None, ok=True):
+        """LLM API 요청 1회의 지연 시간(초)과 토큰 수 기록 (여러 스레드에서 호출 가능)"""
+        with self._lock:
+            self.llm_requests.append((time.perf_counter() - latency, latency, input_tokens, output_tokens, ok))
+
+    def finish(self):
+        """작업 전체 시간 확정 (끝나지 않은 단계가 있으면 메모리 측정 중단, 여러 번 호출해도 됨)"""
+        with self._lock:
+            self._active.clear()
+        if self.wall_seconds is None:
+            self.wall_seconds = time.perf_counter() - self._start
+
+    def _rtf(self, seconds):
+        return round(seconds / self.audio_seconds, 4) if self.audio_seconds else None
+
+    def summary(self):
+        """측정값을 JSON으로 저장할 수 있는 딕셔너리로 정리"""
+        wall_seconds = self.wall_seconds if self.wall_seconds is not None else time.perf_counter() - self._start
+        with self._lock:
+            stages = {}
+            for name, stage in self.stages.items():
+                stages[name] = {
+                    "seconds": round(stage["seconds"], 4),
+                    "calls": stage["calls"],
+                    "rtf": self._rtf(stage["seconds"]),
+                    "peak_rss_mb": round(stage["peak_rss_mb"], 1) if stage["peak_rss_mb"] is not None else None,
+                }
+            requests = list(self.llm_requests)
+
+        llm = None
+        if requests:
+            latencies = sorted(latency for _, latency, _, _, ok in requests if ok)
+            # 교정 단계 시간은 첫 요청 시작부터 마지막 응답까지 (음성 인식과 겹칠 수 있음)
+            active_seconds = max(start + latency for start, latency, _, _, _ in requests) - min(
+                start for start, _, _, _, _ in requests)
+            llm = {
+                "requests": len(requests),
+                "errors": sum(1 for request in requests if not request[4]),
+                "active_seconds": round(active_seconds, 4),
+                "latency_seconds": {
+                    f"p{int(q * 100)}": round(percentile(latencies, q), 4) if latencies else None
+                    for q in LATENCY_QUANTILES
+                },
+                "latency_mean_seconds": round(sum(latencies) / len(latencies), 4) if latencies else None,
+                "latency_total_seconds": round(sum(latencies), 4),
+                "input_tokens": sum(request[2] or 0 for request in requests),
+                "output_tokens": sum(request[3] or 0 for request in requests),
+            }
+
+        peaks = [stage["peak_rss_mb"] for stage in stages.values() if stage["peak_rss_mb"] is not None]
+        return {
+            "job_id": self.job_id,
+            "labels": self.labels,
+            "started_at": round(self.started_at, 3),
+            "audio_seconds": round(self.audio_seconds, 3) if self.audio_seconds else None,
+            "wall_seconds": round(wall_seconds, 4),
+            "rtf": self._rtf(wall_seconds),
+            "peak_rss_mb": max(peaks) if peaks else None,
+            "stages": stages,
+            "llm": llm,
+        }
+
+    def to_json_line(self):
+        return json.dumps(self.summary(), ensure_ascii=False)
+
+    def to_prometheus(self):
+        """Prometheus 텍스트 형식 (작업 ID와 라벨을 붙인 gauge/summary)"""
+        return format_prometheus(self.summary())
+
+    def export(self, log_path=METRICS_LOG_PATH, prom_path=METRICS_PROM_PATH):
+        """환경 변수로 지정된 파일에 측정값 저장 (지정하지 않았으면 아무것도 하지 않음)"""
+        if log_path:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(self.to_json_line() + "\n")
+        if prom_path:
+            temp_path = prom_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(temp_path, prom_path)
+
+
+def format_summary(summary):
+    """JobMetrics.summary() 결과를 사람이 읽기 쉬운 여러 줄 텍스트로 변환"""
+    lines = [f"처리 시간: {summary['wall_seconds']:.1f}초"
+             + (f" (오디오 {summary['audio_seconds']:.0f}초, RTF {summary['rtf']:.3f})" if summary["rtf"] else "")]
+    for name, stage in summary["stages"].items():
+        line = f"  {name:<13} {stage['seconds']:8.2f}초"
+        if stage["rtf"] is not None:
+            line += f"  RTF {stage['rtf']:.3f}"
+        if stage["peak_rss_mb"] is not None:
+            line += f"  최대 메모리 {stage['peak_rss_mb']:.0f}MB"
+        lines.append(line)
+    llm = summary["llm"]
+    if llm:
+        latency = llm["latency_seconds"]
+        lines.append(f"  LLM 요청 {llm['requests']}회 (오류 {llm['errors']}회), 교정 진행 {llm['active_seconds']:.1f}초")
+        if latency["p50"] is not None:
+            lines.append(f"  LLM 지연 p50 {latency['p50']:.2f}초 / p90 {latency['p90']:.2f}초 / p99 {latency['p99']:.2f}초")
+        lines.append(f"  LLM 토큰 입력 {llm['input_tokens']:,} / 출력 {llm['output_tokens']:,}")
+    return "\n".join(lines)
+
+
+def _label_text(labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items() if value is not None) + "}"
+
+
+def format_prometheus(summary):
+    """JobMetrics.summary() 결과를 Prometheus 텍스트 형식으로 변환"""
+    base = {"job_id": summary["job_id"], **summary["labels"]}
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            lines.append(f"{name}{_label_text({**base, **labels})} {value}")
+
+    stages = summary["stages"]
+    metric("subtitle_job_audio_seconds", "gauge", "처리한 오디오 길이(초)", [({}, summary["audio_seconds"])])
+    metric("subtitle_job_wall_seconds", "gauge", "작업 전체 처리 시간(초)", [({}, summary["wall_seconds"])])
+    metric("subtitle_job_rtf", "gauge", "작업 전체 실시간 대비 처리 비율", [({}, summary["rtf"])])
+    metric("subtitle_job_peak_rss_bytes", "gauge", "작업 중 최대 메모리(바이트)",
+           [({}, int(summary["peak_rss_mb"] * 1024 * 1024) if summary["peak_rss_mb"] else None)])
+    metric("subtitle_stage_seconds", "gauge", "단계별 처리 시간(초)",
+           [({"stage": name}, stage["seconds"]) for name, stage in stages.items()])
+    metric("subtitle_stage_calls", "gauge", "단계별 실행 횟수",
+           [({"stage": name}, stage["calls"]) for name, stage in stages.items()])
+    metric("subtitle_stage_rtf", "gauge", "단계별 실시간 대비 처리 비율",
+           [({"stage": name}, stage["rtf"]) for name, stage in stages.items()])
+    metric("subtitle_stage_peak_rss_bytes", "gauge", "단계 실행 중 최대 메모리(바이트)",
+           [({"stage": name}, int(stage["peak_rss_mb"] * 1024 * 1024) if stage["peak_rss_mb"] else None)
+            for name, stage in stages.items()])
+
+    llm = summary["llm"]
+    if llm:
+        metric("subtitle_llm_requests", "gauge", "LLM 요청 수",
+               [({"status": "ok"}, llm["requests"] - llm["errors"]), ({"status": "error"}, llm["errors"])])
+        metric("subtitle_llm_latency_seconds", "summary", "LLM 요청 지연 시간(초)",
+               [({"quantile": str(q)}, llm["latency_seconds"][f"p{int(q * 100)}"]) for q in LATENCY_QUANTILES])
+        if llm["latency_seconds"]["p50"] is not None:
+            lines.append(f"subtitle_llm_latency_seconds_sum{_label_text(base)} {llm['latency_total_seconds']}")
+            lines.append(f"subtitle_llm_latency_seconds_count{_label_text(base)} {llm['requests'] - llm['errors']}")
+        metric("subtitle_llm_tokens", "gauge", "LLM 토큰 수",
+               [({"direction": "input"}, llm["input_tokens"]), ({"direction": "output"}, llm["output_tokens"])])
+        metric("subtitle_llm_active_seconds", "gauge", "첫 LLM 요청부터 마지막 응답까지의 시간(초)",
+               [({}, llm["active_seconds"])])
+    return "\n".join(lines) + "\n"
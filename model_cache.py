@@ -0,0 +1,205 @@
+import os
+import gc
+import threading
+import collections
+import torch
+import whisper
+
+# 기본 메모리 예산 (MB). 환경 변수 WHISPER_MODEL_CACHE_MB로 변경 가능
+DEFAULT_MEMORY_BUDGET_MB = int(os.getenv("WHISPER_MODEL_CACHE_MB", "4096"))
+
+
+# Whisper 모델 크기 (작은 모델부터)
+MODEL_SIZES = ("tiny", "base", "small", "medium", "large")
+
+
+def model_rank(model_size):
+    """모델 크기 순서 (tiny.en, large-v3 같은 변형은 기본 크기로 취급, 알 수 없으면 None)"""
+    name = str(model_size).split(".")[0].split("-")[0]
+    if name == "turbo":
+        name = "large"
+    return MODEL_SIZES.index(name) if name in MODEL_SIZES else None
+
+
+def is_smaller_model(draft_model_size, model_size):
+    """draft_model_size가 model_size보다 확실히 작은 모델인지 여부 (초안 모델로 쓸 수 있는지)"""
+    draft_rank, rank = model_rank(draft_model_size), model_rank(model_size)
+    return draft_rank is not None and rank is not None and draft_rank < rank
+
+
+def default_device():
+    """사용 가능한 기본 장치 반환"""
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+# 선형 계층을 int8로 동적 양자화한 CPU 전용 정밀도
+INT8 = "int8"
+
+# 선택할 수 있는 연산 정밀도
+SUPPORTED_DTYPES = ("float32", "float16", INT8)
+
+
+def default_dtype(device):
+    """장치에 맞는 기본 연산 정밀도 반환"""
+    return "float16" if str(device).startswith("cuda") else "float32"
+
+
+def resolve_dtype(device, dtype=None):
+    """실제로 사용할 연산 정밀도 반환 (CPU에서는 float16을 지원하지 않으므로 float32로 취급)"""
+    dtype = dtype or default_dtype(device)
+    if dtype == "float16" and not str(device).startswith("cuda"):
+        return "float32"
+    return dtype
+
+
+def quantize_int8(model):
+    """Whisper 모델의 선형 계층을 int8로 동적 양자화 (CPU 전용, 모델을 제자리에서 변경)
+
+    어텐션과 MLP의 가중치를 int8로 저장하고 활성값은 실행 중에 양자화하므로 메모리가
+    줄고 CPU 추론이 빨라집니다. 합성곱, 임베딩, LayerNorm은 float32로 남습니다.
+    """
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            # whisper.model.Linear는 가중치를 입력 정밀도로 바꾸는 forward만 다르고,
+            # 양자화 변환은 정확히 nn.Linear인 모듈만 바꾸므로 기본 Linear로 취급
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def estimate_model_bytes(model):
+    """모델 파라미터와 버퍼가 차지하는 메모리(바이트) 추정"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    for module in model.modules():
+        # 양자화된 선형 계층의 가중치는 파라미터가 아닌 압축된 형태로 보관됨
+        if hasattr(module, "_weight_bias"):
+            tensors.extend(tensor for tensor in module._weight_bias() if tensor is not None)
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+class ModelRegistry:
+    """프로세스 전체에서 공유하는 Whisper 모델 캐시
+
+    (모델 크기, 장치, 정밀도)를 키로 모델을 보관하고, 메모리 예산을 넘으면
+    가장 오래 사용하지 않은 모델부터 해제합니다.
+    """
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.memory_budget_mb = memory_budget_mb
+        self._models = collections.OrderedDict()  # key -> (model, size_bytes)
+        self._lock = threading.RLock()
+        self._load_locks = {}
+
+    def _key(self, model_size, device, dtype):
+        device = device or default_device()
+        # CPU의 float16은 float32로 로드되므로 같은 캐시 항목을 사용
+        dtype = resolve_dtype(device, dtype)
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"지원하지 않는 정밀도입니다: {dtype}")
+        if dtype == INT8 and not str(device).startswith("cpu"):
+            raise ValueError("int8 양자화 모델은 CPU에서만 사용할 수 있습니다.")
+        return (model_size, str(device), dtype)
+
+    def _load(self, model_size, device, dtype):
+        """실제 모델 로드"""
+        if dtype == INT8:
+            return quantize_int8(whisper.load_model(model_size, device="cpu"))
+        return whisper.load_model(model_size, device=device)
+
+    def get(self, model_size="small", device=None, dtype=None):
+        """캐시된 모델을 반환하고, 없으면 로드하여 캐시에 추가"""
+        key = self._key(model_size, device, dtype)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # 같은 모델을 여러 세션이 동시에 로드하지 않도록 키별로 잠금
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+
+            model = self._load(*key)
+            size_bytes = estimate_model_bytes(model)
+
+            with self._lock:
+                self._models[key] = (model, size_bytes)
+                self._evict(keep=key)
+            return model
+
+    def _evict(self, keep=None):
+        """메모리 예산을 초과하면 LRU 순서로 모델 해제"""
+        if not self.memory_budget_mb:
+            return
+        budget = self.memory_budget_mb * 1024 * 1024
+        for key in list(self._models.keys()):
+            if self.memory_bytes() <= budget:
+                break
+            if key == keep:
+                continue
+            del self._models[key]
+        self._release_memory()
+
+    def _release_memory(self):
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def unload(self, model_size=None, device=None, dtype=None):
+        """조건에 맞는 모델을 캐시에서 해제하고 해제된 개수를 반환"""
+        with self._lock:
+            targets = [
+                key for key in self._models
+                if (model_size is None or key[0] == model_size)
+                and (device is None or key[1] == str(device))
+                and (dtype is None or key[2] == dtype)
+            ]
+            for key in targets:
+                del self._models[key]
+        if targets:
+            self._release_memory()
+        return len(targets)
+
+    def clear(self):
+        """모든 모델 해제"""
+        return self.unload()
+
+    def memory_bytes(self):
+        """캐시된 모델 전체의 메모리 사용량(바이트)"""
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def loaded_models(self):
+        """캐시된 모델 목록 (오래된 순)"""
+        with self._lock:
+            return [
+                {"model_size": key[0], "device": key[1], "dtype": key[2],
+                 "memory_mb": round(size / (1024 ** 2), 1)}
+                for key, (_, size) in self._models.items()
+            ]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """프로세스 전역 모델 레지스트리 반환"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def get_model(model_size="small", device=None, dtype=None):
+    """전역 레지스트리에서 모델 가져오기"""
+    return get_registry().get(model_size, device=device, dtype=dtype)
+
+
+def unload_model(model_size=None, device=None, dtype=None):
+    """전역 레지스트리에서 모델 해제"""
+    return get_registry().unload(model_size, device=device, dtype=dtype)
@@ -0,0 +1,154 @@
+"""처리 속도(실시간 배율, RTF)로 진행률과 남은 시간 추정
+
+음성 인식(ASR)과 LLM 교정은 각각 처리한 오디오 길이(초)로 진행을 기록하고, 단계마다
+"처리 시간 ÷ 처리한 오디오 길이"(RTF)를 계속 갱신하여 남은 오디오 길이에 곱한 값을 남은
+시간으로 사용합니다. 구간 수 대신 오디오 길이를 세므로 VAD 구간 길이가 제각각이어도
+진행률이 실제 처리량을 따라갑니다. 두 단계는 겹쳐 실행되므로 전체 남은 시간은 늦게
+끝나는 단계를 기준으로 합니다.
+"""
+import time
+from datetime import timedelta
+
+# 새로 측정한 RTF를 반영하는 비율 (지수 이동 평균, 클수록 최근 속도를 빨리 따라감)
+RTF_SMOOTHING = 0.3
+
+# 이보다 짧은 간격은 측정 오차가 커서 RTF 갱신에 사용하지 않음 (초)
+MIN_SAMPLE_SECONDS = 0.5
+
+
+class StageRate:
+    """한 단계의 처리량(오디오 초)과 RTF 측정
+
+    rtf를 주면(이전 작업의 측정값 등) 첫 측정 전까지 남은 시간 추정에 사용합니다.
+    처리할 일이 없는 동안은 측정을 멈추므로 앞 단계를 기다린 시간은 RTF에 포함되지 않습니다.
+    """
+
+    def __init__(self, rtf=None):
+        self.total = 0.0
+        self.done = 0.0
+        self.rtf = rtf
+        self.measured = False
+        self._mark = None  # RTF 측정 기준점 (시각, 그때까지 처리한 양)
+
+    def add(self, seconds, now=None):
+        """처리할 오디오 길이 추가"""
+        if self._mark is None or self.done >= self.total:
+            # 처리할 일이 없어 기다리던 시간은 빼고 지금부터 다시 측정
+            self._mark = (time.perf_counter() if now is None else now, self.done)
+        self.total += seconds
+
+    def skip(self, seconds):
+        """이전 작업에서 이미 처리한 양 (RTF 계산에서 제외)"""
+        self.done += seconds
+        if self._mark is not None:
+            self._mark = (self._mark[0], self._mark[1] + seconds)
+
+    def update(self, done, now=None):
+        """지금까지 처리한 오디오 길이를 기록하고 RTF 갱신"""
+        now = time.perf_counter() if now is None else now
+        self.done = done
+        if self._mark is None:
+            self._mark = (now, done)
+            return
+        mark_time, mark_done = self._mark
+        elapsed = now - mark_time
+        processed = done - mark_done
+        if processed > 0 and elapsed >= MIN_SAMPLE_SECONDS:
+            sample = elapsed / processed
+            if not self.measured or self.rtf is None:
+                self.rtf = sample
+            else:
+                self.rtf += RTF_SMOOTHING * (sample - self.rtf)
+            self.measured = True
+            self._mark = (now, done)
+
+    def advance(self, seconds, now=None):
+        """처리한 오디오 길이를 더하고 RTF 갱신"""
+        self.update(self.done + seconds, now)
+
+    @property
+    def remaining(self):
+        """남은 오디오 길이(초)"""
+        return max(self.total - self.done, 0.0)
+
+    def fraction(self):
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+
+class ProgressEstimator:
+    """음성 인식과 LLM 교정 단계의 RTF로 전체 진행률과 남은 시간 추정
+
+    사용 예:
+        estimator = ProgressEstimator(llm=True)
+        estimator.asr.add(전체 음성 길이)
+        estimator.asr.update(인식한 음성 길이)      # 배치가 끝날 때마다
+        estimator.llm.add(자막 길이)                # 인식된 자막마다
+        estimator.llm.advance(교정한 자막 길이)     # 교정이 끝날 때마다
+        estimator.fraction(), estimator.describe()
+    """
+
+    def __init__(self, llm=False, asr_rtf=None, llm_rtf=None):
+        self.asr = StageRate(asr_rtf)
+        self.llm = StageRate(llm_rtf) if llm else None
+        self._start = time.perf_counter()
+        self._fraction = 0.0
+
+    def start(self):
+        """경과 시간 측정 시작 (디코딩, VAD처럼 추정에 포함하지 않는 준비 단계가 끝난 뒤 호출)"""
+        self._start = time.perf_counter()
+
+    def remaining_seconds(self):
+        """예상 남은 시간(초). 아직 속도나 전체 길이를 모르면 None"""
+        if self.asr.done > self.asr.total:
+            # 전체 길이를 모르는 스트리밍 입력
+            return None
+        asr_left = self.asr.remaining * self.asr.rtf if self.asr.rtf is not None else None
+        if self.llm is None:
+            return asr_left
+        if self.llm.rtf is None:
+            return asr_left
+        # 아직 인식하지 않은 음성도 교정할 자막이 됨
+        llm_left = (self.llm.remaining + self.asr.remaining) * self.llm.rtf
+        return max(asr_left or 0.0, llm_left)
+
+    def fraction(self):
+        """전체 진행률 (0~1, 줄어들지 않음)
+
+        남은 시간을 추정할 수 있으면 경과 시간 ÷ (경과 시간 + 남은 시간), 아니면 처리한
+        오디오 비율을 사용합니다.
+        """
+        remaining = self.remaining_seconds()
+        if remaining is not None:
+            elapsed = time.perf_counter() - self._start
+            value = elapsed / (elapsed + remaining) if elapsed + remaining > 0 else 1.0
+        else:
+            value = self.asr.fraction()
+        self._fraction = max(self._fraction, min(value, 1.0))
+        return self._fraction
+
+    def rates(self):
+        """측정한 단계별 RTF (다음 작업의 초기값으로 사용)"""
+        return {
+            "asr": self.asr.rtf if self.asr.measured else None,
+            "llm": self.llm.rtf if self.llm is not None and self.llm.measured else None,
+        }
+
+    def describe(self):
+        """남은 시간과 단계별 RTF 안내 문구"""
+        parts = []
+        remaining = self.remaining_seconds()
+        if remaining is not None:
+            parts.append(f"남은 시간 약 {format_eta(remaining)}")
+        rates = []
+        if self.asr.rtf is not None:
+            rates.append(f"인식 RTF {self.asr.rtf:.2f}")
+        if self.llm is not None and self.llm.rtf is not None:
+            rates.append(f"교정 RTF {self.llm.rtf:.2f}")
+        if rates:
+            parts.append(f"({', '.join(rates)})")
+        return " ".join(parts)
+
+
+def format_eta(seconds):
+    """남은 시간을 h:mm:ss 형식으로 표시"""
+    return str(timedelta(seconds=int(round(seconds))))
@@ -1,21 +1,20 @@
 import os
-import subprocess
-import whisper
-import pysrt
-import webrtcvad
-import collections
+import sys
 import contextlib
-import wave
-import numpy as np
-import soundfile as sf
 import warnings
-from tqdm import tqdm
 from datetime import timedelta
-import time
-import re
 from dotenv import load_dotenv
-from openai import OpenAI
-import anthropic
+from model_cache import get_registry, default_device, resolve_dtype, is_smaller_model
+from vad import detect_voice_segments, pack_segments, StreamingVAD, DEFAULT_VAD_WORKERS
+from audio_io import decode_audio, stream_audio, probe_duration, find_ffmpeg, pcm_duration, SAMPLE_RATE
+from transcription import BatchTranscriber, TranscriptionCache, hash_file, MAX_STREAM_SEGMENT_SECONDS
+from jobs import JobCheckpoint, make_job_id
+from metrics import JobMetrics, format_summary
+from progress import ProgressEstimator
+from cpu_threads import get_scheduler, configure_threads, DEFAULT_INTRA_OP_THREADS, DEFAULT_INTER_OP_THREADS
+from segmentation import build_cues, to_subrip
+from llm_correction import (LLMCorrector, CorrectionPipeline, create_llm_client, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_MINUTE,
+                            DEFAULT_BATCH_SIZE, CorrectionCache)
 
 # .env 파일 로드
 load_dotenv()
@@ -23,84 +22,19 @@ load_dotenv()
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-class Frame(object):
-    """VAD를 위한 프레임 클래스"""
-    def __init__(self, bytes, timestamp, duration):
-        self.bytes = bytes
-        self.timestamp = timestamp
-        self.duration = duration
+def process_with_vad(pcm, sample_rate=SAMPLE_RATE, aggressiveness=1, workers=1):
+    """VAD를 사용하여 음성 구간 처리 (pcm: 16비트 모노 PCM 배열 또는 bytes)
 
-def frame_generator(frame_duration_ms, audio, sample_rate):
-    """오디오를 프레임으로 분할"""
-    n = int(sample_rate * (frame_duration_ms / 1000.0) * 2)
-    offset = 0
-    timestamp = 0.0
-    duration = (float(n) / sample_rate) / 2.0
-    while offset + n < len(audio):
-        yield Frame(audio[offset:offset + n], timestamp, duration)
-        timestamp += duration
-        offset += n
-
-def vad_collector(sample_rate, frame_duration_ms, padding_duration_ms, vad, frames):
-    """VAD를 사용하여 음성 구간 감지"""
-    num_padding_frames = int(padding_duration_ms / frame_duration_ms)
-    ring_buffer = collections.deque(maxlen=num_padding_frames)
-    triggered = False
-    voiced_frames = []
-    
-    for frame in frames:
-        is_speech = vad.is_speech(frame.bytes, sample_rate)
-        
-        if not triggered:
-            ring_buffer.append((frame, is_speech))
-            num_voiced = len([f for f, speech in ring_buffer if speech])
-            
-            if num_voiced > 0.9 * ring_buffer.maxlen:
-                triggered = True
-                for f, s in ring_buffer:
-                    voiced_frames.append(f)
-                ring_buffer.clear()
-        else:
-            voiced_frames.append(frame)
-            ring_buffer.append((frame, is_speech))
-            num_unvoiced = len([f for f, speech in ring_buffer if not speech])
-            
-            if num_unvoiced > 0.9 * ring_buffer.maxlen:
-                triggered = False
-                yield (voiced_frames[0].timestamp,
-                      voiced_frames[-1].timestamp + voiced_frames[-1].duration,
-                      b''.join([f.bytes for f in voiced_frames]))
-                ring_buffer.clear()
-                voiced_frames = []
-    
-    if voiced_frames:
-        yield (voiced_frames[0].timestamp,
-               voiced_frames[-1].timestamp + voiced_frames[-1].duration,
-               b''.join([f.bytes for f in voiced_frames]))
-
-def process_with_vad(audio_path, aggressiveness=1):
-    """VAD를 사용하여 음성 구간 처리"""
-    with contextlib.closing(wave.open(audio_path, 'rb')) as wf:
-        pcm_data = wf.readframes(wf.getnframes())
-        sample_rate = wf.getframerate()
-        sample_width = wf.getsampwidth()
-    
-    vad = webrtcvad.Vad(aggressiveness)
-    frames = frame_generator(30, pcm_data, sample_rate)
-    frames = list(frames)
-    segments = vad_collector(sample_rate, 30, 2000, vad, frames)
-    
-    voice_segments = []
-    for start, end, _ in segments:
-        voice_segments.append((start, end))
-    
-    return voice_segments
+    workers가 2 이상이면 긴 오디오를 겹치는 청크로 나누어 여러 프로세스에서 VAD를 수행합니다.
+    """
+    return detect_voice_segments(pcm, sample_rate, aggressiveness, workers)
 
 class PromptManager:
     def __init__(self, prompts_dir="prompts"):
         self.prompts_dir = prompts_dir
         self.system_prompt = self._load_prompt("system_prompt.md")
         self.user_prompt_template = self._load_prompt("user_prompt.md")
+        self.batch_user_prompt_template = self._load_prompt("batch_user_prompt.md")
     
     def _load_prompt(self, filename):
         """마크다운 파일에서 프롬프트 로드"""
@@ -120,335 +54,409 @@ class PromptManager:
             current_sub=current_sub,
             next_subs='\n'.join(next_subs) if next_subs else '없음'
         )
+    
+    def get_batch_user_prompt(self, context, current_subs, previous_subs, next_subs):
+        """여러 자막을 한 번에 교정하는 사용자 프롬프트 생성"""
+        return self.batch_user_prompt_template.format(
+            context=context or '없음',
+            previous_subs='\n'.join(previous_subs) if previous_subs else '없음',
+            current_subs='\n'.join(f"{i}. {sub}" for i, sub in enumerate(current_subs, 1)),
+            next_subs='\n'.join(next_subs) if next_subs else '없음',
+            count=len(current_subs)
+        )
 
 class SubtitleGenerator:
-    def __init__(self, model_size="small", llm_provider="openai", prompts_dir="prompts"):
+    def __init__(self, model_size="small", llm_provider="openai", prompts_dir="prompts", device=None, dtype=None,
+                 llm_max_workers=DEFAULT_MAX_WORKERS, llm_requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 llm_batch_size=DEFAULT_BATCH_SIZE, llm_cache_enabled=True, transcription_cache_enabled=True,
+                 vad_workers=DEFAULT_VAD_WORKERS, intra_op_threads=DEFAULT_INTRA_OP_THREADS,
+                 inter_op_threads=DEFAULT_INTER_OP_THREADS, draft_model_size=None, ffmpeg_path=None):
         print("Whisper 모델 로딩 중...")
-        self.model = whisper.load_model(model_size)
+        self.model_size = model_size
+        # 초안 모델: 모든 구간을 먼저 인식하고 신뢰도가 낮은 구간만 model_size 모델로 다시 인식
+        if draft_model_size and not is_smaller_model(draft_model_size, model_size):
+            print(f"WARNING: 초안 모델({draft_model_size})이 {model_size} 모델보다 작지 않아 사용하지 않습니다.")
+            draft_model_size = None
+        self.draft_model_size = draft_model_size
+        self.device = device or default_device()
+        self.dtype = resolve_dtype(self.device, dtype)
+        self.vad_workers = vad_workers
+        # 디코딩, 스트리밍, 길이 확인에 사용할 FFmpeg 실행 파일
+        self.ffmpeg_path = ffmpeg_path or find_ffmpeg()
+        # 음성 인식 CPU 스레드 수 (0이면 동시에 실행 중인 작업 수로 코어를 나눔, cpu_threads 참고)
+        self.intra_op_threads = intra_op_threads
+        configure_threads(inter_op=inter_op_threads)
+        self.last_job_id = None
+        self.last_audio_seconds = None
+        # 마지막 작업에서 초안 모델 결과를 다시 인식한 통계 (초안 모델을 사용하지 않았으면 None)
+        self.last_escalation = None
+        # 현재 작업과 마지막 작업의 단계별 측정값 (metrics.JobMetrics)
+        self.metrics = None
+        self.last_metrics = None
+        # 현재 작업의 진행률/남은 시간 추정과, 다음 작업의 첫 추정에 사용할 처리 속도(RTF)
+        self.progress = None
+        self.measured_rtf = {"asr": None, "llm": None}
+        self.model = get_registry().get(model_size, device=self.device, dtype=self.dtype)
+        self.draft_model = None
+        if self.draft_model_size:
+            self.draft_model = get_registry().get(self.draft_model_size, device=self.device, dtype=self.dtype)
         print("모델 로딩 완료!")
         
+        self.transcription_cache = TranscriptionCache() if transcription_cache_enabled else None
+        
         self.llm_provider = llm_provider
         self.prompt_manager = PromptManager(prompts_dir)
         
         if llm_provider == "openai":
             openai_api_key = os.getenv("OPENAI_API_KEY")
             if openai_api_key:
-                self.llm_client = OpenAI(api_key=openai_api_key)
+                self.llm_client = create_llm_client("openai", openai_api_key)
             else:
                 print("WARNING: OPENAI_API_KEY가 .env 파일에 설정되지 않았습니다.")
                 self.llm_client = None
         elif llm_provider == "anthropic":
             anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
             if anthropic_api_key:
-                self.llm_client = anthropic.Anthropic(api_key=anthropic_api_key)
+                self.llm_client = create_llm_client("anthropic", anthropic_api_key)
             else:
                 print("WARNING: ANTHROPIC_API_KEY가 .env 파일에 설정되지 않았습니다.")
                 self.llm_client = None
         else:
             self.llm_client = None
 
-    def get_duration(self, input_path):
-        """파일의 재생 시간을 가져옴"""
-        ffmpeg_path = r"C:\ProgramData\chocolatey\bin\ffmpeg.exe"
-        probe_cmd = [ffmpeg_path, '-i', input_path]
-        try:
-            probe_result = subprocess.run(probe_cmd, capture_output=True, text=True, encoding='utf-8')
-            for line in probe_result.stderr.split('\n'):
-                if "Duration:" in line:
-                    duration_str = line.split("Duration:")[1].split(",")[0].strip()
-                    h, m, s = map(float, duration_str.split(':'))
-                    total_seconds = h * 3600 + m * 60 + s
-                    return total_seconds, duration_str
-        except Exception as e:
-            print(f"Duration 확인 중 오류: {str(e)}")
-        return None, None
-    
-    def convert_to_wav(self, input_path, output_path):
-        """영상/음성 파일을 WAV 형식으로 변환"""
-        total_seconds, duration_str = self.get_duration(input_path)
-        if duration_str:
-            print(f"파일 길이: {duration_str}")
-        
-        ffmpeg_path = r"C:\ProgramData\chocolatey\bin\ffmpeg.exe"
-        command = [
-            ffmpeg_path,
-            '-i', input_path,
-            '-ar', '16000',
-            '-ac', '1',
-            '-c:a', 'pcm_s16le',
-            output_path
-        ]
-        print("\n오디오 변환 중...")
-        print(f"실행할 명령어: {' '.join(command)}")
-        
-        result = subprocess.run(command, check=True, encoding='utf-8')
-        return output_path, total_seconds
+        self.llm_corrector = None
+        if self.llm_client:
+            self.llm_corrector = LLMCorrector(
+                llm_provider, self.llm_client, self.prompt_manager,
+                max_tokens=8000,
+                max_workers=llm_max_workers,
+                requests_per_minute=llm_requests_per_minute,
+                batch_size=llm_batch_size,
+                cache=CorrectionCache(prompt_manager=self.prompt_manager) if llm_cache_enabled else None
+            )
 
-    def merge_short_subtitles(self, subtitles, min_chars):
-        """짧은 자막들을 병합"""
-        if not subtitles:
-            return subtitles
-        
-        merged = []
-        current = subtitles[0]
-        
-        for next_sub in subtitles[1:]:
-            # 현재 자막이 최소 글자 수보다 적고, 다음 자막과의 시간 간격이 2초 이내인 경우
-            if (len(current.text) < min_chars and 
-                (next_sub.start.hours * 3600 + next_sub.start.minutes * 60 + next_sub.start.seconds) - 
-                (current.end.hours * 3600 + current.end.minutes * 60 + current.end.seconds) <= 2):
-                
-                # 병합된 텍스트가 최대 글자 수를 초과하지 않는 경우에만 병합
-                if not hasattr(self, '_max_chars') or len(current.text + " " + next_sub.text) <= self._max_chars:
-                    current.text += " " + next_sub.text
-                    current.end = next_sub.end
-                else:
-                    merged.append(current)
-                    current = next_sub
-            else:
-                merged.append(current)
-                current = next_sub
-        
-        merged.append(current)
-        
-        # 인덱스 재정렬
-        for i, sub in enumerate(merged, 1):
-            sub.index = i
-        
-        return merged
+    def load_audio(self, input_path):
+        """영상/음성 파일을 임시 파일 없이 16kHz 모노 PCM으로 메모리에 디코딩"""
+        print("\n오디오 디코딩 중...")
+        audio = decode_audio(input_path, SAMPLE_RATE, ffmpeg_path=self.ffmpeg_path)
+        total_seconds = pcm_duration(audio)
+        print(f"파일 길이: {timedelta(seconds=int(total_seconds))}")
+        return audio
 
     def correct_subtitle_with_llm(self, subtitle_text, context=None, previous_subs=None, next_subs=None):
         """LLM을 사용하여 자막 텍스트를 교정"""
-        if not self.llm_client:
+        if not self.llm_corrector:
             return subtitle_text
         
         try:
-            print("\n" + "="*50)
-            print(f"원본 자막: {subtitle_text}")
-            
-            if self.llm_provider == "openai":
-                response = self.llm_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": self.prompt_manager.system_prompt},
-                        {"role": "user", "content": self.prompt_manager.get_user_prompt(
-                            context, subtitle_text, previous_subs, next_subs
-                        )}
-                    ],
-                    temperature=0.3
-                )
-                corrected_text = response.choices[0].message.content.strip()
-                
-            elif self.llm_provider == "anthropic":
-                response = self.llm_client.messages.create(
-                    model="claude-3-5-haiku-20241022",
-                    max_tokens=8000,
-                    temperature=0.3,
-                    system=self.prompt_manager.system_prompt,
-                    messages=[{
-                        "role": "user", 
-                        "content": self.prompt_manager.get_user_prompt(
-                            context, subtitle_text, previous_subs, next_subs
-                        )
-                    }]
-                )
-                corrected_text = response.content[0].text.strip()
-            
-            print(f"교정된 자막: {corrected_text}")
-            print("="*50)
-            
+            corrected_text = self.llm_corrector.correct(subtitle_text, context, previous_subs, next_subs)
+            self._print_correction(subtitle_text, corrected_text)
             return corrected_text
                 
         except Exception as e:
             print(f"자막 교정 중 오류 발생: {str(e)}")
             return subtitle_text
 
-    def generate_subtitles(self, audio_path, output_path=None, language=None, max_chars=None, min_chars=None, max_duration=None, context=None):
-        """자막 생성 함수"""
+    def _print_correction(self, original_text, corrected_text, error=None):
+        """교정 결과 출력"""
+        print("\n" + "="*50)
+        print(f"원본 자막: {original_text}")
+        if error is not None:
+            print(f"자막 교정 중 오류 발생: {str(error)}")
+        else:
+            print(f"교정된 자막: {corrected_text}")
+        print("="*50)
+
+    def build_subtitles(self, segments, texts, max_chars=None, min_chars=None, max_duration=None):
+        """인식된 구간과 (교정된) 텍스트로 자막 목록 생성
+
+        최대 시간과 최대 글자 수를 넘는 자막은 나누고, 최소 글자 수보다 짧은 자막은 병합합니다.
+        세그먼트에 단어 타임스탬프("words")가 있으면 나눈 자막의 시각을 단어 시각에 맞춥니다.
+        (segmentation.build_cues 참고)
+        """
+        return to_subrip(build_cues(segments, texts, max_chars, min_chars, max_duration))
+
+    def _finish_metrics(self):
+        """현재 작업의 측정을 마치고 last_metrics로 옮김"""
+        if self.metrics is not None:
+            self.metrics.finish()
+        self.last_metrics = self.metrics
+        self.metrics = None
+        if self.llm_corrector:
+            self.llm_corrector.metrics = None
+        if self.progress is not None:
+            for stage, rtf in self.progress.rates().items():
+                if rtf is not None:
+                    self.measured_rtf[stage] = rtf
+        self.progress = None
+
+    def _span(self, name):
+        """현재 작업의 단계 처리 시간 측정 (측정 중인 작업이 없으면 아무것도 하지 않음)"""
+        return self.metrics.span(name) if self.metrics is not None else contextlib.nullcontext()
+
+    def _create_transcriber(self, batch_size, word_timestamps, threads, vad_trusted):
+        """음성 인식기 생성 (초안 모델이 있으면 초안 모델 인식기가 현재 모델 인식기로 검증)"""
+        options = {"batch_size": batch_size, "fp16": self.dtype == "float16", "word_timestamps": word_timestamps,
+                   "threads": threads, "vad_trusted": vad_trusted}
+        transcriber = BatchTranscriber(self.model, **options)
+        if self.draft_model is not None:
+            transcriber = BatchTranscriber(self.draft_model, verifier=transcriber, **options)
+        return transcriber
+
+    def _print_escalation(self, result):
+        escalation = result.get("escalation")
+        if escalation:
+            print(f"초안 모델({self.draft_model_size}) 인식 창 {escalation['windows']}개 중 "
+                  f"{escalation['escalated']}개({escalation['escalated_ratio'] * 100:.1f}%, "
+                  f"{escalation['escalated_seconds']:.0f}초)를 {self.model_size} 모델로 다시 인식했습니다")
+
+    def transcribe_file(self, audio_path, language=None, batch_size=8, vad_aggressiveness=1, segment_callback=None,
+                        audio=None, checkpoint=None, word_timestamps=False, vad_trusted=False, vad_enabled=True):
+        """파일을 디코딩하고 VAD와 Whisper로 음성 인식 (vad_enabled가 False면 전체 오디오를 한 구간으로 인식)
+
+        segment_callback(세그먼트 목록)은 앞 구간부터 순서대로 인식이 끝날 때마다 호출됩니다.
+        audio에 미리 디코딩한 PCM 배열을 넘기면 디코딩을 건너뜁니다.
+        checkpoint가 주어지면 VAD 결과와 구간별 인식 결과를 저장하고, 중단된 작업은 이어서 처리합니다.
+        """
+        # FFmpeg 출력을 메모리로 받아 VAD와 Whisper가 같은 PCM 버퍼를 사용
+        if audio is None:
+            with self._span("decode"):
+                audio = self.load_audio(audio_path)
+        sample_rate = SAMPLE_RATE
+        if self.metrics is not None:
+            self.metrics.audio_seconds = pcm_duration(audio, sample_rate)
+        
+        # VAD를 사용하여 음성 구간 감지
+        voice_segments = checkpoint.voice_segments() if checkpoint is not None else None
+        if voice_segments is not None:
+            print(f"\n저장된 음성 구간 사용: {len(voice_segments)}개")
+        elif not vad_enabled:
+            voice_segments = [(0, pcm_duration(audio, sample_rate))]
+            print("\nVAD 비활성화: 전체 오디오를 한 번에 처리합니다")
+            if checkpoint is not None:
+                checkpoint.save_voice_segments(voice_segments)
+        else:
+            print("\n음성 구간 감지 중...")
+            with self._span("vad"):
+                voice_segments = process_with_vad(audio, sample_rate, vad_aggressiveness, self.vad_workers)
+                # 짧은 구간은 묶고 긴 구간은 조용한 지점에서 나누어 Whisper 창 수를 줄임
+                windows = pack_segments(voice_segments, audio, sample_rate)
+            print(f"감지된 음성 구간: {len(voice_segments)}개 (인식 창 {len(windows)}개)")
+            voice_segments = windows
+            if checkpoint is not None:
+                checkpoint.save_voice_segments(voice_segments)
+        
+        print("\n음성 인식 시작...")
+        # 구간 길이가 제각각이므로 구간 수 대신 음성 길이와 측정한 처리 속도로 남은 시간 추정
+        progress = self.progress or ProgressEstimator()
+        progress.start()
+        progress.asr.add(sum(end - start for start, end in voice_segments))
+        if checkpoint is not None:
+            progress.asr.skip(sum(voice_segments[i][1] - voice_segments[i][0]
+                                  for i in checkpoint.completed_segments() if i < len(voice_segments)))
+        
+        def print_progress(done_seconds, total_seconds):
+            progress.asr.update(done_seconds)
+            print(f"음성 인식 {timedelta(seconds=int(done_seconds))}/{timedelta(seconds=int(total_seconds))} "
+                  f"({progress.asr.fraction() * 100:.0f}%) {progress.describe()}")
+
+        # 여러 음성 구간을 배치로 묶어 Whisper로 음성 인식
+        # 동시에 실행 중인 다른 작업과 CPU 코어를 나누어 사용
+        with get_scheduler().acquire(self.intra_op_threads) as threads:
+            transcriber = self._create_transcriber(batch_size, word_timestamps, threads, vad_trusted)
+            with self._span("asr"):
+                result = transcriber.transcribe_segments(
+                    audio, voice_segments, sample_rate, language, print_progress, segment_callback, checkpoint
+                )
+        self._print_escalation(result)
+        return result
+
+    def transcribe_stream(self, audio_path, language=None, batch_size=8, vad_aggressiveness=1, segment_callback=None,
+                          word_timestamps=False, vad_trusted=False, vad_enabled=True):
+        """파일 전체를 메모리에 올리지 않고 일정 길이씩 읽으면서 VAD와 Whisper로 음성 인식
+
+        입력 길이와 관계없이 메모리 사용량이 거의 일정하며, 인식된 구간은 바로 출력합니다.
+        """
+        print("\n스트리밍 모드로 음성 인식 시작...")
+        # 전체 길이를 알 수 있으면 남은 시간도 추정
+        progress = self.progress or ProgressEstimator()
+        duration = probe_duration(audio_path, self.ffmpeg_path)
+        total_text = f"/{timedelta(seconds=int(duration))}" if duration else ""
+        progress.start()
+        if duration:
+            progress.asr.add(duration)
+        
+        def print_progress(seconds):
+            self.last_audio_seconds = seconds
+            progress.asr.update(seconds)
+            print(f"처리한 오디오: {timedelta(seconds=int(seconds))}{total_text} {progress.describe()}")
+
+        def on_segments(segments):
+            for segment in segments:
+                print(f"[{timedelta(seconds=int(segment['start']))}] {segment['text'].strip()}")
+            if segment_callback:
+                segment_callback(segments)
+
+        vad = None
+        if vad_enabled:
+            vad = StreamingVAD(SAMPLE_RATE, vad_aggressiveness, max_segment_seconds=MAX_STREAM_SEGMENT_SECONDS)
+        chunks = stream_audio(audio_path, SAMPLE_RATE, ffmpeg_path=self.ffmpeg_path)
+        with get_scheduler().acquire(self.intra_op_threads) as threads:
+            transcriber = self._create_transcriber(batch_size, word_timestamps, threads, vad_trusted)
+            # 디코딩, VAD, 음성 인식이 번갈아 실행되므로 하나의 단계로 측정
+            with self._span("stream"):
+                result = transcriber.transcribe_stream(chunks, SAMPLE_RATE, language, vad, print_progress, on_segments)
+        if self.metrics is not None:
+            self.metrics.audio_seconds = self.last_audio_seconds
+        self._print_escalation(result)
+        return result
+
+    def generate_subtitles(self, audio_path, output_path=None, language=None, max_chars=None, min_chars=None, max_duration=None, context=None, batch_size=8, vad_aggressiveness=1,
+                           audio=None, streaming=False, word_timestamps=False, vad_trusted=False, vad_enabled=True):
+        """자막 생성 함수
+
+        audio: 미리 디코딩한 PCM 배열 (없으면 파일을 디코딩)
+        streaming: 긴 파일을 일정 길이씩 읽으며 처리하여 메모리 사용량을 일정하게 유지
+        word_timestamps: 인식할 때 단어 시각을 함께 구해 자막을 나눌 때 경계를 단어 시각에 맞춤
+        vad_trusted: VAD 구간을 믿고 온도 폴백과 토큰 수를 제한한 빠른 디코딩 사용 (transcription.BatchTranscriber 참고,
+                     vad_enabled가 False면 무시)
+        vad_enabled: False면 VAD 없이 전체 오디오를 인식 (작업 ID와 캐시 키에서 VAD 감도 대신 None 사용)
+        """
         if output_path is None:
             base_path = os.path.splitext(audio_path)[0]
             output_path = f"{base_path}.srt"
         
-        wav_path = os.path.splitext(audio_path)[0] + '_temp.wav'
-        try:
-            # WAV 파일 생성
-            wav_path, total_seconds = self.convert_to_wav(audio_path, wav_path)
-            print(f"\nWAV 파일 생성됨: {wav_path}")
-            
-            # VAD를 사용하여 음성 구간 감지
-            print("\n음성 구간 감지 중...")
-            voice_segments = process_with_vad(wav_path)
-            print(f"감지된 음성 구간: {len(voice_segments)}개")
-            
-            # 전체 자막 정보 저장용
-            all_segments = []
-            current_position = 0
-            
-            # 오디오 파일 로드
-            audio, sample_rate = sf.read(wav_path)
-            audio = audio.astype(np.float32)
+        # 단계별 처리 시간과 LLM 요청 측정
+        metrics = JobMetrics(labels={"model": self.model_size, "draft_model": self.draft_model_size,
+                                     "device": str(self.device), "llm": self.llm_provider or "none"})
+        self.metrics = metrics
+        if self.llm_corrector:
+            self.llm_corrector.metrics = metrics
+        if audio is not None:
+            metrics.audio_seconds = pcm_duration(audio)
+        progress = ProgressEstimator(llm=self.llm_corrector is not None,
+                                     asr_rtf=self.measured_rtf["asr"], llm_rtf=self.measured_rtf["llm"])
+        self.progress = progress
+        
+        # 같은 파일과 인식 설정이면 같은 작업 ID가 되어 중단된 작업을 이어서 진행
+        with metrics.span("hash"):
+            audio_hash = hash_file(audio_path)
+        vad_setting = vad_aggressiveness if vad_enabled else None
+        # VAD 구간이 없으면 믿을 구간도 없으므로 빠른 디코딩을 사용하지 않음
+        vad_trusted = vad_trusted and vad_setting is not None
+        job_id = make_job_id(audio_hash, self.model_size, self.dtype, language, vad_setting, word_timestamps,
+                             vad_trusted, self.draft_model_size)
+        checkpoint = JobCheckpoint(job_id, info={"file_name": os.path.basename(audio_path)})
+        self.last_job_id = job_id
+        metrics.job_id = job_id
+        print(f"\n작업 ID: {job_id}" + (" (중단된 작업을 이어서 진행합니다)" if checkpoint.resumed else ""))
+        
+        # LLM 교정은 음성 인식과 겹쳐 실행하여, 다음 자막 문맥이 준비된 자막부터 바로 교정
+        correction_pipeline = None
+        subtitle_seconds = []
+        if self.llm_corrector:
+            saved_corrections = checkpoint.completed_corrections(self.llm_corrector.fingerprint(context))
             
-            print("\n음성 인식 시작...")
-            for i, (start, end) in enumerate(voice_segments):
-                print(f"\n음성 구간 {i+1}/{len(voice_segments)} 처리 중...")
-                
-                # 현재 구간의 오디오 추출
-                start_sample = int(start * sample_rate)
-                end_sample = int(end * sample_rate)
-                segment_audio = audio[start_sample:end_sample]
-                
-                # Whisper로 음성 인식
-                result = self.model.transcribe(segment_audio, language=language if language else None)
-                
-                # 세그먼트 시간 조정
-                for segment in result["segments"]:
-                    segment["start"] = start + segment["start"]
-                    segment["end"] = start + segment["end"]
-                    all_segments.append(segment)
+            def on_corrected(i, original_text, corrected_text, error):
+                # 교정한 자막 길이로 교정 속도를 측정하여 남은 시간 갱신 (저장된 결과를 그대로 쓴 자막만 건너뜀)
+                if i in correction_pipeline.reused:
+                    progress.llm.skip(subtitle_seconds[i])
+                else:
+                    progress.llm.advance(subtitle_seconds[i])
+                print(f"\n[자막 #{i+1}/{len(correction_pipeline.texts)}] {progress.describe()}")
+                self._print_correction(original_text, corrected_text, error)
+                # 교정에 성공한 자막은 체크포인트에 저장
+                if error is None:
+                    checkpoint.save_correction(i, corrected_text)
             
-            print("\n자막 파일 생성 중...")
-            subs = pysrt.SubRipFile()
-            subtitle_index = 1
+            correction_pipeline = CorrectionPipeline(
+                self.llm_corrector, context, on_corrected, completed=saved_corrections
+            )
+        
+        def on_segments(segments):
+            if correction_pipeline is not None:
+                seconds = [segment["end"] - segment["start"] for segment in segments]
+                subtitle_seconds.extend(seconds)
+                progress.llm.add(sum(seconds))
+                correction_pipeline.feed([segment["text"].strip() for segment in segments])
+        
+        try:
+            # 같은 파일을 같은 설정으로 인식한 결과가 있으면 재사용
+            cache_key = None
+            result = None
+            if self.transcription_cache is not None:
+                cache_key = self.transcription_cache.key(
+                    audio_hash, self.model_size, self.dtype, language, vad_setting, word_timestamps, vad_trusted,
+                    self.draft_model_size
+                )
+                result = self.transcription_cache.get(cache_key)
+            if result is None:
+                # 중단된 작업에서 모든 구간의 인식이 끝나 있었으면 디코딩 없이 사용
+                result = checkpoint.transcription_result()
             
-            # 디버깅을 위한 파일 저장
-            # raw_text_path = os.path.splitext(audio_path)[0] + '_raw.txt'
-            # with open(raw_text_path, 'w', encoding='utf-8') as f:
-            #     full_text = " ".join(seg["text"].strip() for seg in all_segments)
-            #     f.write(full_text)
+            if result is not None:
+                print("\n저장된 음성 인식 결과를 사용합니다")
+                progress.start()
+                on_segments(result["segments"])
+            elif streaming:
+                result = self.transcribe_stream(audio_path, language, batch_size, vad_aggressiveness, on_segments,
+                                                word_timestamps, vad_trusted, vad_enabled)
+                if cache_key is not None:
+                    self.transcription_cache.set(cache_key, result)
+            else:
+                result = self.transcribe_file(audio_path, language, batch_size, vad_aggressiveness, on_segments, audio,
+                                              checkpoint, word_timestamps, vad_trusted, vad_enabled)
+                if cache_key is not None:
+                    self.transcription_cache.set(cache_key, result)
             
-            # segment_path = os.path.splitext(audio_path)[0] + '_segments.txt'
-            # with open(segment_path, 'w', encoding='utf-8') as f:
-            #     for segment in all_segments:
-            #         f.write(f"{segment['start']:.2f} - {segment['end']:.2f}: {segment['text']}\n")
+            all_segments = result["segments"]
+            self.last_escalation = result.get("escalation")
+            if not language:
+                print(f"감지된 언어: {result['language']} (신뢰도 {result['language_probability'] * 100:.1f}%)")
             
-            # 자막 생성
-            for i, segment in enumerate(all_segments):
-                # 이전/다음 자막 컨텍스트 수집
-                previous_subs = [seg["text"].strip() for seg in all_segments[max(0, i-2):i]]
-                next_subs = [seg["text"].strip() for seg in all_segments[i+1:i+3]]
-                
-                # LLM으로 자막 교정
-                if self.llm_client:
-                    print(f"\n[자막 #{i+1}/{len(all_segments)}] LLM 교정 중...")
-                    text = self.correct_subtitle_with_llm(
-                        segment["text"].strip(), context, previous_subs, next_subs
-                    )
-                else:
-                    text = segment["text"].strip()
-                
-                if not text:  # 빈 텍스트는 건너뛰기
-                    continue
-                
-                # 시간 정보 추출
-                start_time = segment["start"]
-                end_time = segment["end"]
-                duration = end_time - start_time
-                
-                # 최대 시간 길이 체크
-                if max_duration and duration > max_duration:                    
-                    # 시간 간격으로 분할
-                    num_splits = int(np.ceil(duration / max_duration))
-                    sub_duration = duration / num_splits
-                    
-                    # 텍스트를 단어 단위로 분할하여 시간에 맞게 재분배
-                    words = text.split()
-                    words_per_split = len(words) // num_splits
-                    splits = []
-                    
-                    for j in range(num_splits):
-                        sub_start = start_time + (j * sub_duration)
-                        sub_end = sub_start + sub_duration if j < num_splits - 1 else end_time
-                        
-                        if j == num_splits - 1:
-                            # 마지막 분할은 남은 모든 단어 사용
-                            sub_words = words[j * words_per_split:]
-                        else:
-                            # 단어 단위로 분할
-                            start_idx = j * words_per_split
-                            end_idx = (j + 1) * words_per_split
-                            sub_words = words[start_idx:end_idx]
-                        
-                        sub_text = ' '.join(sub_words).strip()
-                        if sub_text:  # 빈 텍스트가 아닌 경우만 추가
-                            splits.append((sub_start, sub_end, sub_text))
-                else:
-                    splits = [(start_time, end_time, text)]
+            # 인식 중에 시작한 교정을 포함하여 모든 자막의 교정이 끝날 때까지 대기
+            texts = [segment["text"].strip() for segment in all_segments]
+            if correction_pipeline is not None:
+                print(f"\nLLM 교정 마무리 중... (자막 {len(texts)}개, 동시 요청 {self.llm_corrector.max_workers}개)")
+                with metrics.span("llm_finish"):
+                    texts = correction_pipeline.finish()
                 
-                # 최대 글자 수 제한 처리
-                final_splits = []
-                for sub_start, sub_end, sub_text in splits:
-                    if max_chars and len(sub_text) > max_chars:
-                        # 텍스트를 최대 글자 수로 분할
-                        words = sub_text.split()
-                        current_text = ""
-                        sub_splits = []
-                        
-                        for word in words:
-                            if len(current_text) + len(word) + 1 <= max_chars:
-                                current_text += (" " + word if current_text else word)
-                            else:
-                                if current_text:
-                                    sub_splits.append(current_text)
-                                current_text = word
-                        
-                        if current_text:  # 마지막 부분 추가
-                            sub_splits.append(current_text)
-                        
-                        # 시간을 텍스트 길이에 비례하여 분배
-                        sub_duration = sub_end - sub_start
-                        total_chars = sum(len(s) for s in sub_splits)
-                        current_time = sub_start
-                        
-                        for sub_text in sub_splits:
-                            ratio = len(sub_text) / total_chars
-                            split_duration = sub_duration * ratio
-                            split_end = current_time + split_duration
-                            
-                            final_splits.append((current_time, split_end, sub_text))
-                            current_time = split_end
-                    else:
-                        final_splits.append((sub_start, sub_end, sub_text))
-                
-                # 자막 생성
-                for start, end, text in final_splits:
-                    if text.strip():
-                        hours = int(start) // 3600
-                        minutes = (int(start) % 3600) // 60
-                        seconds = int(start) % 60
-                        milliseconds = int((start % 1) * 1000)
-                        start_time = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                    seconds=seconds, milliseconds=milliseconds)
-                        
-                        hours = int(end) // 3600
-                        minutes = (int(end) % 3600) // 60
-                        seconds = int(end) % 60
-                        milliseconds = int((end % 1) * 1000)
-                        end_time = pysrt.SubRipTime(hours=hours, minutes=minutes, 
-                                                seconds=seconds, milliseconds=milliseconds)
-                        
-                        sub = pysrt.SubRipItem(
-                            index=subtitle_index,
-                            start=start_time,
-                            end=end_time,
-                            text=text
-                        )
-                        subs.append(sub)
-                        subtitle_index += 1
-            
-            # 최소 글자 수 제한이 설정된 경우 짧은 자막 병합
-            if min_chars:
-                merged_subs = self.merge_short_subtitles(subs, min_chars)
-                subs = pysrt.SubRipFile()
-                for sub in merged_subs:
-                    subs.append(sub)
-            
-            subs.save(output_path, encoding='utf-8')
-            print(f"자막 파일이 생성되었습니다: {output_path}")
-            
+                if self.llm_corrector.cache is not None:
+                    cache_stats = self.llm_corrector.cache.stats()
+                    print(f"교정 캐시: 적중 {cache_stats['hits']}회, 미적중 {cache_stats['misses']}회")
+        except Exception:
+            print(f"\n진행 상황이 작업 ID {job_id}로 저장되었습니다. 같은 파일을 같은 설정으로 다시 실행하면 이어서 처리합니다.")
+            self._finish_metrics()
+            raise
         finally:
-            if os.path.exists(wav_path):
-                os.remove(wav_path)
-                print("임시 파일 정리 완료")
+            if correction_pipeline is not None:
+                correction_pipeline.close(cancel=True)
+        
+        print("\n자막 파일 생성 중...")
+        
+        # 디버깅을 위한 파일 저장
+        # raw_text_path = os.path.splitext(audio_path)[0] + '_raw.txt'
+        # with open(raw_text_path, 'w', encoding='utf-8') as f:
+        #     full_text = " ".join(seg["text"].strip() for seg in all_segments)
+        #     f.write(full_text)
+        
+        # segment_path = os.path.splitext(audio_path)[0] + '_segments.txt'
+        # with open(segment_path, 'w', encoding='utf-8') as f:
+        #     for segment in all_segments:
+        #         f.write(f"{segment['start']:.2f} - {segment['end']:.2f}: {segment['text']}\n")
+        
+        with metrics.span("segmentation"):
+            subs = self.build_subtitles(all_segments, texts, max_chars, min_chars, max_duration)
+        with metrics.span("write"):
+            subs.save(output_path, encoding='utf-8')
+        
+        # 작업이 끝났으므로 체크포인트 삭제
+        checkpoint.finish()
+        print(f"자막 파일이 생성되었습니다: {output_path}")
+        
+        self._finish_metrics()
+        print("\n" + format_summary(metrics.summary()))
+        metrics.export()
         
         return output_path
 
@@ -515,4 +523,8 @@ def main():
         print(f"파일을 찾을 수 없습니다: {file_path}")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # 인자가 있으면 비대화형 배치 모드로 실행 (python script.py <폴더|목록 파일> [옵션])
+        import batch
+        sys.exit(batch.main())
     main()
\ No newline at end of file
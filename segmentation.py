@@ -0,0 +1,204 @@
+"""인식 결과를 자막 단위로 나누고 합치는 분할 엔진
+
+app.py와 script.py가 함께 사용합니다. 세그먼트(start/end 초, 선택적으로 단어 타임스탬프
+"words")와 (교정된) 텍스트를 받아 (시작, 끝, 텍스트) 튜플 목록을 만들며, 모든 단계가
+단어를 한 번씩만 훑으므로 입력 길이에 비례하는 시간에 끝납니다.
+
+- max_chars: 자막 한 개의 최대 글자 수 (공백 포함). 이보다 긴 단어는 글자 단위로 자름
+- max_duration: 자막 한 개의 최대 시간(초). 넘는 세그먼트는 공백을 뺀 글자 수로 시간을
+  나누므로, 조각마다 글자 수 한도를 두어 각 조각의 시간이 max_duration을 넘지 않게 함
+- min_chars: 이보다 짧은 자막은 MERGE_MAX_GAP_SECONDS 이내의 다음 자막과 합침
+  (합친 결과가 글자 수/시간 한도를 넘지 않는 경우만. max_chars가 없으면 MERGE_MAX_CHARS까지)
+
+max_chars나 max_duration으로 나눌 때는 문장 끝 단어에서 한도의 절반 이상 채웠으면 그
+자리에서 끊습니다. 한도를 지정하지 않으면 세그먼트를 나누지 않습니다.
+
+단어 타임스탬프가 있으면 글자 수 비례 대신 실제 단어 시각에 경계를 맞추며, 이때는 실제
+발화 시각을 우선하므로 max_duration을 조금 넘을 수 있습니다.
+"""
+import pysrt
+
+# 짧은 자막을 다음 자막과 합칠 수 있는 최대 간격(초)
+MERGE_MAX_GAP_SECONDS = 2.0
+
+# max_chars를 지정하지 않았을 때 합친 자막의 최대 글자 수
+MERGE_MAX_CHARS = 100
+
+# 이 문자로 끝나는 단어에서 한도의 절반 이상 채웠으면 자연스럽게 끊음
+SENTENCE_ENDINGS = (".", "!", "?", "。", "！", "？")
+
+
+def _char_count(text):
+    """공백을 뺀 글자 수 (교정으로 띄어쓰기가 바뀌어도 비율이 유지되도록)"""
+    return sum(1 for char in text if not char.isspace())
+
+
+def align_to_words(texts, words, start, end):
+    """한 세그먼트를 나눈 텍스트 조각들의 시작/끝 시각을 단어 타임스탬프로 결정
+
+    texts는 세그먼트 텍스트를 순서대로 나눈 조각이고(LLM 교정으로 글자가 바뀌었어도 됨),
+    words는 같은 세그먼트의 단어 목록({"word", "start", "end"})입니다. 조각의 누적 글자 수
+    비율에 가장 가까운 단어 경계를 조각 경계로 사용하여, 앞 조각은 경계 단어의 끝에서 끝나고
+    다음 조각은 다음 단어의 시작에서 시작합니다. 단어 배열은 한 번만 훑으므로 O(단어 수 + 조각 수)
+    입니다. [(시작, 끝, 텍스트)]를 반환하며, 단어가 조각보다 적으면 None을 반환합니다.
+    """
+    if len(texts) <= 1:
+        return [(start, end, text) for text in texts]
+    if not words or len(words) < len(texts):
+        return None
+
+    # 단어별 누적 글자 수
+    word_ends = []
+    total = 0
+    for word in words:
+        total += _char_count(word["word"])
+        word_ends.append(total)
+    piece_total = sum(_char_count(text) for text in texts)
+    if not total or not piece_total:
+        return None
+
+    aligned = []
+    piece_start = start
+    consumed = 0
+    last = -1  # 앞 조각까지 배정한 마지막 단어
+    for k, text in enumerate(texts[:-1]):
+        consumed += _char_count(text)
+        target = consumed / piece_total * total
+        # 조각마다 단어를 하나 이상 배정하고, 남은 조각에도 하나씩 남김
+        index = last + 1
+        limit = len(words) - (len(texts) - k)
+        while index < limit and abs(word_ends[index + 1] - target) <= abs(word_ends[index] - target):
+            index += 1
+        piece_end = min(max(words[index]["end"], piece_start), end)
+        aligned.append((piece_start, piece_end, text))
+        piece_start = min(max(words[index + 1]["start"], piece_end), end)
+        last = index
+    aligned.append((piece_start, end, texts[-1]))
+    return aligned
+
+
+def _chunks(word, limit):
+    """한도보다 긴 단어를 limit 글자씩 자름 (띄어쓰기 없이 이어진 문장 등)"""
+    return [word[i:i + limit] for i in range(0, len(word), limit)]
+
+
+def split_text(text, max_chars=None, max_weight=None):
+    """텍스트를 단어 경계에서 나눈 조각 목록 (단어를 한 번만 훑음)
+
+    조각마다 공백 포함 글자 수는 max_chars 이하, 공백을 뺀 글자 수는 max_weight 이하가
+    되도록 앞에서부터 단어를 채웁니다. 문장 끝 단어에서 한도의 절반 이상 채웠으면 그
+    자리에서 끊어 문장 중간에서 나뉘는 것을 줄입니다.
+    """
+    limits = [limit for limit in (max_chars, max_weight) if limit]
+    if not limits:
+        return [text]
+    word_limit = max(1, min(limits))
+
+    pieces = []
+    current = []
+    length = 0  # 공백 포함 글자 수
+    weight = 0  # 공백을 뺀 글자 수
+    for word in text.split():
+        for chunk in (_chunks(word, word_limit) if len(word) > word_limit else (word,)):
+            size = len(chunk)
+            if current and ((max_chars and length + 1 + size > max_chars)
+                            or (max_weight and weight + size > max_weight)):
+                pieces.append(" ".join(current))
+                current, length, weight = [], 0, 0
+            current.append(chunk)
+            length += size + (1 if length else 0)
+            weight += size
+            if chunk.endswith(SENTENCE_ENDINGS) and (
+                    (max_chars and length * 2 >= max_chars) or (max_weight and weight * 2 >= max_weight)):
+                pieces.append(" ".join(current))
+                current, length, weight = [], 0, 0
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_segment(text, start, end, max_chars=None, max_duration=None, words=None):
+    """세그먼트 하나를 글자 수/시간 한도에 맞게 나눈 [(시작, 끝, 텍스트)]
+
+    나누지 않아도 되면 텍스트를 그대로 돌려줍니다. 시간은 words가 있으면 단어 시각에
+    맞추고, 없으면 공백을 뺀 글자 수에 비례하여 누적합으로 나눕니다.
+    """
+    duration = end - start
+    max_weight = None
+    if max_duration and duration > max_duration:
+        # 조각의 시간 = 전체 시간 × 조각 글자 수 / 전체 글자 수 이므로 글자 수 한도로 바꿈
+        max_weight = max(1, int(_char_count(text) * max_duration / duration))
+    if not max_weight and (not max_chars or len(text) <= max_chars):
+        return [(start, end, text)]
+
+    pieces = split_text(text, max_chars, max_weight)
+    if len(pieces) <= 1:
+        return [(start, end, pieces[0] if pieces else text)]
+    if words:
+        aligned = align_to_words(pieces, words, start, end)
+        if aligned:
+            return aligned
+
+    total = sum(_char_count(piece) for piece in pieces)
+    cues = []
+    piece_start = start
+    consumed = 0
+    for index, piece in enumerate(pieces):
+        consumed += _char_count(piece)
+        piece_end = end if index == len(pieces) - 1 else start + duration * consumed / total
+        cues.append((piece_start, piece_end, piece))
+        piece_start = piece_end
+    return cues
+
+
+def merge_short(cues, min_chars, max_chars=None, max_duration=None, max_gap=MERGE_MAX_GAP_SECONDS):
+    """min_chars보다 짧은 자막을 가까운 다음 자막과 합침 (한 번 훑음)
+
+    합친 자막이 max_chars(없으면 MERGE_MAX_CHARS)와 max_duration을 넘으면 합치지 않습니다.
+    """
+    max_chars = max_chars or MERGE_MAX_CHARS
+    merged = []
+    current = None
+    for cue in cues:
+        if current is not None:
+            start, end, text = current
+            if (len(text) < min_chars and cue[0] - end <= max_gap
+                    and len(text) + 1 + len(cue[2]) <= max_chars
+                    and (not max_duration or cue[1] - start <= max_duration)):
+                current = (start, cue[1], text + " " + cue[2])
+                continue
+            merged.append(current)
+        current = cue
+    if current is not None:
+        merged.append(current)
+    return merged
+
+
+def build_cues(segments, texts=None, max_chars=None, min_chars=None, max_duration=None):
+    """인식된 세그먼트와 (교정된) 텍스트로 자막 [(시작, 끝, 텍스트)] 목록 생성
+
+    texts를 주지 않으면 세그먼트의 "text"를 사용하며, 빈 텍스트는 건너뜁니다.
+    """
+    if texts is None:
+        texts = [segment["text"] for segment in segments]
+    cues = []
+    for segment, text in zip(segments, texts):
+        if not text or not text.strip():
+            continue
+        cues.extend(split_segment(text, segment["start"], segment["end"], max_chars, max_duration,
+                                  segment.get("words")))
+    if min_chars:
+        cues = merge_short(cues, min_chars, max_chars, max_duration)
+    return cues
+
+
+def _subrip_time(seconds):
+    return pysrt.SubRipTime.from_ordinal(int(round(seconds * 1000)))
+
+
+def to_subrip(cues):
+    """자막 목록을 pysrt.SubRipFile로 변환 (번호는 1부터)"""
+    subs = pysrt.SubRipFile()
+    for index, (start, end, text) in enumerate(cues, 1):
+        subs.append(pysrt.SubRipItem(index=index, start=_subrip_time(start), end=_subrip_time(end), text=text))
+    return subs
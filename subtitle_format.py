@@ -0,0 +1,26 @@
+def srt_to_vtt(srt_content):
+    """SRT 형식의 자막을 VTT 형식으로 변환합니다."""
+    # VTT 헤더 추가
+    vtt_content = "WEBVTT\n\n"
+    
+    # SRT 블록 단위로 분할
+    srt_blocks = srt_content.strip().split('\n\n')
+    
+    for block in srt_blocks:
+        lines = block.split('\n')
+        
+        # 각 블록은 최소 3줄 이상이어야 함 (인덱스, 시간, 텍스트)
+        if len(lines) >= 3:
+            # 인덱스 라인은 건너뛰기
+            
+            # 시간 포맷 변환 (00:00:00,000 --> 00:00:00.000)
+            time_line = lines[1].replace(',', '.')
+            
+            # 텍스트 라인 유지
+            text_lines = lines[2:]
+            
+            # VTT 블록 생성
+            vtt_block = time_line + '\n' + '\n'.join(text_lines)
+            vtt_content += vtt_block + '\n\n'
+    
+    return vtt_content
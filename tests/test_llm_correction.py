@@ -0,0 +1,37 @@
+"""교정 파이프라인이 저장된 교정 결과를 재사용하는 방식 검사 (LLM 요청 없음)
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_correction import CorrectionPipeline
+
+
+class UpperCorrector:
+    """요청한 자막을 대문자로 바꾸는 교정기"""
+    max_workers = 2
+    batch_size = 3
+
+    def __init__(self):
+        self.requested = []
+
+    def _correct_range(self, texts, start, end, context):
+        self.requested.extend(range(start, end))
+        return [(texts[i].upper(), None) for i in range(start, end)]
+
+
+def test_only_fully_saved_batches_are_reused():
+    corrector = UpperCorrector()
+    results = {}
+    pipeline = CorrectionPipeline(corrector, on_result=lambda i, original, corrected, error: results.update(
+        {i: i in pipeline.reused}), completed={0: "A", 1: "B", 2: "C", 3: "D"})
+    with pipeline:
+        pipeline.feed(list("abcdefg"))
+        assert pipeline.finish() == list("ABCDEFG")
+    # 첫 묶음(0~2)만 저장된 결과를 쓰고, 일부만 저장된 묶음(3~5)은 다시 요청
+    assert pipeline.reused == {0, 1, 2}
+    assert sorted(corrector.requested) == [3, 4, 5, 6]
+    assert results == {i: i < 3 for i in range(7)}
@@ -0,0 +1,38 @@
+"""모델 캐시 키와 정밀도 처리 검사 (모델은 로드하지 않음)
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_cache import ModelRegistry, resolve_dtype, is_smaller_model, INT8
+
+
+def test_cpu_float16_shares_float32_key():
+    registry = ModelRegistry()
+    assert registry._key("small", "cpu", "float16") == registry._key("small", "cpu", "float32")
+    assert registry._key("small", "cpu", None) == ("small", "cpu", "float32")
+
+
+def test_cuda_keeps_float16():
+    assert resolve_dtype("cuda:0") == "float16"
+    assert resolve_dtype("cuda:0", "float32") == "float32"
+    assert ModelRegistry()._key("small", "cuda:0", "float16") == ("small", "cuda:0", "float16")
+
+
+@pytest.mark.parametrize("device, dtype", [("cpu", "bfloat16"), ("cuda:0", INT8)])
+def test_invalid_dtype(device, dtype):
+    with pytest.raises(ValueError):
+        ModelRegistry()._key("small", device, dtype)
+
+
+@pytest.mark.parametrize("draft, model, expected", [
+    ("tiny", "small", True), ("base", "large-v3", True), ("tiny.en", "base.en", True),
+    ("base", "tiny", False), ("small", "small", False), ("unknown", "large", False),
+])
+def test_draft_model_must_be_smaller(draft, model, expected):
+    assert is_smaller_model(draft, model) is expected
@@ -0,0 +1,65 @@
+"""자막 분할 엔진(segmentation.build_cues)이 한도를 지키는지 확인하는 빠른 검사
+
+tools/segmentation_benchmark.py의 합성 세그먼트와 검사 함수를 1천 개 규모로 사용합니다.
+한도를 지정하지 않은 경우는 분할 엔진 도입 전 app.py 동작(세그먼트를 그대로 사용하고, 짧은
+자막은 합친 결과가 100자를 넘지 않을 때만 합침)과 결과가 같은지 비교합니다.
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "tools"))
+
+from segmentation import build_cues, MERGE_MAX_GAP_SECONDS
+from segmentation_benchmark import synthetic_segments, check_cues, CONFIGS
+
+SEGMENTS = 1000
+
+
+def _baseline_cues(segments, min_chars=None):
+    """한도가 없을 때의 이전 동작: 세그먼트마다 자막 하나, 짧은 자막은 100자 이내로 다음 자막과 합침"""
+    cues = [(segment["start"], segment["end"], segment["text"]) for segment in segments if segment["text"].strip()]
+    if not min_chars:
+        return cues
+    merged = [cues[0]]
+    for start, end, text in cues[1:]:
+        last_start, last_end, last_text = merged[-1]
+        if (len(last_text) < min_chars and start - last_end <= MERGE_MAX_GAP_SECONDS
+                and len(last_text) + 1 + len(text) <= 100):
+            merged[-1] = (last_start, end, last_text + " " + text)
+        else:
+            merged.append((start, end, text))
+    return merged
+
+
+@pytest.mark.parametrize("with_words", [False, True])
+@pytest.mark.parametrize("name", sorted(CONFIGS))
+def test_constraints(name, with_words):
+    segments = synthetic_segments(SEGMENTS, seed=1, with_words=with_words)
+    config = CONFIGS[name]
+    cues = build_cues(segments, None, *config)
+    assert check_cues(segments, cues, *config, with_words) == []
+
+
+@pytest.mark.parametrize("max_chars", [None, 0])
+@pytest.mark.parametrize("min_chars", [None, 8, 40, 200])
+def test_no_limits_matches_baseline(min_chars, max_chars):
+    segments = synthetic_segments(SEGMENTS, seed=2)
+    cues = build_cues(segments, None, max_chars, min_chars, None)
+    assert cues == _baseline_cues(segments, min_chars)
+    # 최대 글자 수를 지정하지 않아도 100자를 넘는 자막은 합치지 않은 원래 세그먼트뿐
+    texts = {segment["text"] for segment in segments}
+    assert all(text in texts for _, _, text in cues if len(text) > 100)
+
+
+def test_corrected_texts_replace_segment_text():
+    segments = synthetic_segments(50, seed=3)
+    texts = [segment["text"].upper() for segment in segments]
+    texts[0] = "   "
+    cues = build_cues(segments, texts)
+    assert [text for _, _, text in cues] == texts[1:]
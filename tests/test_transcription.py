@@ -0,0 +1,47 @@
+"""디코딩한 토큰을 세부 구간으로 나누는 처리 검사 (모델은 로드하지 않음)
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+import whisper
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcription import BatchTranscriber, TIME_PRECISION
+
+DURATION = 30.0
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    return whisper.tokenizer.get_tokenizer(False, language="en", task="transcribe")
+
+
+def _parse(tokenizer, *parts):
+    """초(float)는 타임스탬프 토큰, 문자열은 텍스트 토큰으로 바꾸어 _parse_tokens 실행"""
+    tokens = []
+    for part in parts:
+        if isinstance(part, str):
+            tokens.extend(tokenizer.encode(part))
+        else:
+            tokens.append(tokenizer.timestamp_begin + round(part / TIME_PRECISION))
+    transcriber = BatchTranscriber.__new__(BatchTranscriber)
+    return [(start, end, text) for start, end, text, _ in transcriber._parse_tokens(tokenizer, tokens, DURATION)]
+
+
+def test_single_timestamp_ending_uses_last_timestamp(tokenizer):
+    pieces = _parse(tokenizer, 0.0, " one", 1.0, 1.0, " two", 2.5)
+    assert pieces == [(0.0, 1.0, "one"), (1.0, 2.5, "two")]
+
+
+def test_missing_ending_timestamp_runs_to_window_end(tokenizer):
+    pieces = _parse(tokenizer, 0.0, " one", 1.0, 1.0, " two")
+    assert pieces == [(0.0, 1.0, "one"), (1.0, DURATION, "two")]
+
+
+def test_without_consecutive_timestamps(tokenizer):
+    assert _parse(tokenizer, 0.0, " one", 1.5) == [(0.0, 1.5, "one")]
+    assert _parse(tokenizer, " one") == [(0.0, DURATION, "one")]
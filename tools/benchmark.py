@@ -0,0 +1,351 @@
+"""자막 생성 파이프라인 단계별 벤치마크
+
+재현 가능한 합성 오디오(음성과 비슷한 발화 구간과 무음 구간)를 만들어 디코딩, VAD,
+음성 인식(tiny 모델), 자막 분할, SRT/VTT 변환, LLM 교정(로컬 가짜 서버) 단계를
+차례로 실행하고, 단계별 처리 시간과 처리량(초당 처리한 오디오 길이), 최대 메모리를
+JSON으로 저장합니다. --compare로 이전 결과를 주면 느려진 단계를 표시합니다.
+
+자막 분할과 LLM 교정 단계는 음성 인식 결과 대신 VAD 구간으로 만든 합성 텍스트를
+사용하므로, 모델 출력과 관계없이 같은 입력으로 비교할 수 있습니다.
+
+사용 예:
+    python tools/benchmark.py --duration 600 --output bench.json
+    python tools/benchmark.py --duration 600 --compare bench.json --threshold 0.1
+    python tools/benchmark.py --duration 3600 --skip asr,llm
+"""
+import io
+import os
+import sys
+import json
+import wave
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+import numpy as np
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from audio_io import decode_audio, find_ffmpeg, pcm_duration, SAMPLE_RATE
+from vad import detect_voice_segments, pack_segments
+from transcription import BatchTranscriber
+from subtitle_format import srt_to_vtt
+from segmentation import build_cues, to_subrip
+from llm_correction import LLMCorrector, create_llm_client
+from metrics import reset_peak_rss, peak_rss_mb
+from fake_llm_server import start_fake_server
+
+# 실행 순서대로 나열한 단계 이름
+STAGES = ("decode", "vad", "model_load", "asr", "segmentation", "serialization", "llm_correction")
+
+# --skip으로 건너뛸 수 있는 단계 묶음
+SKIPPABLE = {"asr": ("model_load", "asr"), "llm": ("llm_correction",)}
+
+# 이보다 작은 시간 차이는 측정 오차로 보고 비교에서 무시(초)
+MIN_COMPARE_DELTA_SECONDS = 0.005
+
+# 합성 자막에 사용하는 음절
+SYLLABLES = list("가나다라마바사아자차카타파하음성자막인식교정영상강의오늘우리는것이있습니다")
+
+
+def synthesize_audio(duration, sample_rate=SAMPLE_RATE, seed=0):
+    """발화 구간과 무음 구간이 번갈아 나오는 int16 PCM 생성 (같은 seed면 같은 결과)
+
+    발화는 억양이 있는 기본 주파수의 배음에 포먼트 강조와 음절 단위 진폭 변화를 준
+    소리이며, 무음 구간에는 약한 배경 잡음만 있습니다. 가끔 긴 무음도 넣습니다.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(duration * sample_rate)
+    audio = rng.normal(0.0, 30.0, total)
+
+    position = int(rng.uniform(0.5, 2.0) * sample_rate)
+    while position < total:
+        end = min(total, position + int(rng.uniform(1.0, 8.0) * sample_rate))
+        audio[position:end] += _speech_burst(end - position, sample_rate, rng)
+        pause = rng.uniform(5.0, 20.0) if rng.random() < 0.1 else rng.uniform(0.3, 2.5)
+        position = end + int(pause * sample_rate)
+
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def _speech_burst(num_samples, sample_rate, rng):
+    t = np.arange(num_samples) / sample_rate
+    mean_f0 = rng.uniform(100.0, 220.0)
+    f0 = mean_f0 * (1.0 + 0.05 * np.sin(2 * np.pi * rng.uniform(2.0, 5.0) * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    formants = rng.uniform([500.0, 1200.0, 2400.0], [900.0, 2000.0, 3000.0])
+
+    signal = np.zeros(num_samples)
+    for k in range(1, 20):
+        gain = sum(np.exp(-((k * mean_f0 - f) / 150.0) ** 2) for f in formants) + 0.1 / k
+        signal += gain * np.sin(k * phase)
+
+    # 초당 4~6음절의 진폭 변화
+    envelope = np.abs(np.sin(np.pi * rng.uniform(4.0, 6.0) * t)) ** 0.5
+    signal *= envelope
+    peak = np.max(np.abs(signal)) or 1.0
+    return signal / peak * rng.uniform(3000.0, 8000.0)
+
+
+def write_audio_file(pcm, path, sample_rate=SAMPLE_RATE, ffmpeg_path=None):
+    """PCM을 WAV로 저장하고, 확장자가 .wav가 아니면 FFmpeg로 변환"""
+    wav_path = path if path.endswith(".wav") else path + ".wav"
+    with wave.open(wav_path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    if wav_path != path:
+        subprocess.run(
+            [ffmpeg_path or find_ffmpeg(), "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+             "-i", wav_path, path],
+            check=True
+        )
+        os.remove(wav_path)
+    return path
+
+
+def synthetic_transcript(voice_segments, seed=0, chars_per_second=6.0, max_piece_seconds=8.0):
+    """VAD 구간을 max_piece_seconds 이하로 나누고 길이에 비례하는 합성 텍스트를 붙인 세그먼트 목록"""
+    rng = np.random.default_rng(seed)
+    segments = []
+    for start, end in voice_segments:
+        pieces = max(1, int(np.ceil((end - start) / max_piece_seconds)))
+        step = (end - start) / pieces
+        for i in range(pieces):
+            target = max(1, int(round(step * chars_per_second)))
+            words = []
+            count = 0
+            while count < target:
+                word = "".join(rng.choice(SYLLABLES, size=int(rng.integers(1, 5))))
+                words.append(word)
+                count += len(word)
+            segments.append({"start": start + i * step, "end": start + (i + 1) * step, "text": " ".join(words)})
+    return segments
+
+
+def run_stage(name, func, audio_seconds, repeat=1):
+    """단계를 repeat번 실행하여 (결과 기록, 마지막 반환값) 반환. 시간은 가장 빠른 실행 기준"""
+    times = []
+    peaks = []
+    value = None
+    scope = "stage"
+    for _ in range(repeat):
+        if not reset_peak_rss():
+            scope = "process"
+        start = time.perf_counter()
+        value = func()
+        times.append(time.perf_counter() - start)
+        peaks.append(peak_rss_mb())
+
+    seconds = min(times)
+    record = {
+        "seconds": round(seconds, 4),
+        "median_seconds": round(statistics.median(times), 4),
+        "runs": repeat,
+        "throughput": round(audio_seconds / seconds, 2) if seconds else None,
+        "peak_rss_mb": round(max(peaks), 1) if peaks[0] is not None else None,
+        "peak_rss_scope": scope,
+    }
+    print(f"  {name:<15} {seconds:9.3f}초  {record['throughput'] or 0:10.1f}배속  "
+          f"최대 메모리 {record['peak_rss_mb'] or 0:.0f}MB")
+    return record, value
+
+
+def _environment():
+    import torch
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "cuda": torch.cuda.is_available(),
+    }
+
+
+def run_benchmark(args):
+    """모든 단계를 실행하고 결과 딕셔너리 반환"""
+    skipped = set()
+    for name in args.skip:
+        skipped.update(SKIPPABLE[name])
+
+    print(f"합성 오디오 생성 중... ({args.duration:.0f}초, seed {args.seed})")
+    pcm = synthesize_audio(args.duration, seed=args.seed)
+    stages = {}
+    audio_seconds = pcm_duration(pcm)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = write_audio_file(pcm, os.path.join(temp_dir, f"benchmark.{args.format}"))
+        input_bytes = os.path.getsize(input_path)
+        del pcm
+
+        print("단계별 실행:")
+        stages["decode"], pcm = run_stage(
+            "decode", lambda: decode_audio(input_path, SAMPLE_RATE), audio_seconds, args.repeat
+        )
+
+    stages["vad"], voice_segments = run_stage(
+        "vad", lambda: detect_voice_segments(pcm, SAMPLE_RATE, args.vad_aggressiveness, args.vad_workers),
+        audio_seconds, args.repeat
+    )
+    stages["vad"]["segments"] = len(voice_segments)
+    # 음성 인식은 파이프라인처럼 인식 창 단위로 묶은 구간 사용
+    windows = voice_segments if args.no_pack else pack_segments(voice_segments, pcm, SAMPLE_RATE)
+    stages["vad"]["windows"] = len(windows)
+
+    if "asr" not in skipped:
+        from model_cache import get_registry
+        stages["model_load"], model = run_stage(
+            "model_load", lambda: get_registry().get(args.model, dtype=args.dtype), audio_seconds
+        )
+        transcriber = BatchTranscriber(model, batch_size=args.batch_size, fp16=args.dtype == "float16")
+        stages["asr"], result = run_stage(
+            "asr", lambda: transcriber.transcribe_segments(pcm, windows, SAMPLE_RATE, args.language),
+            audio_seconds, args.repeat
+        )
+        stages["asr"]["segments"] = len(result["segments"])
+
+    # 자막 분할 이후 단계는 모델 출력과 관계없는 합성 텍스트 사용
+    transcript = synthetic_transcript(voice_segments, seed=args.seed)
+    texts = [segment["text"] for segment in transcript]
+    stages["segmentation"], subs = run_stage(
+        "segmentation",
+        lambda: to_subrip(build_cues(transcript, texts, args.max_chars, args.min_chars, args.max_duration)),
+        audio_seconds, args.repeat
+    )
+    stages["segmentation"]["input_segments"] = len(transcript)
+    stages["segmentation"]["subtitles"] = len(subs)
+
+    def serialize():
+        buffer = io.StringIO()
+        subs.write_into(buffer)
+        srt_content = buffer.getvalue()
+        return srt_content, srt_to_vtt(srt_content)
+
+    stages["serialization"], (srt_content, vtt_content) = run_stage(
+        "serialization", serialize, audio_seconds, args.repeat
+    )
+    stages["serialization"]["srt_bytes"] = len(srt_content.encode("utf-8"))
+
+    if "llm_correction" not in skipped:
+        from script import PromptManager
+        server = start_fake_server(latency=args.llm_latency)
+        try:
+            client = create_llm_client("openai", "benchmark", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+            corrector = LLMCorrector(
+                "openai", client, PromptManager(os.path.join(REPO_DIR, "prompts")), max_tokens=8000,
+                max_workers=args.llm_workers, requests_per_minute=None, tokens_per_minute=None,
+                batch_size=args.llm_batch_size
+            )
+            stages["llm_correction"], _ = run_stage(
+                "llm_correction", lambda: corrector.correct_all(texts), audio_seconds, args.repeat
+            )
+            stages["llm_correction"]["subtitles"] = len(texts)
+            stages["llm_correction"]["requests"] = server.stats["requests"] // args.repeat
+        finally:
+            server.shutdown()
+
+    timed = [stages[name]["seconds"] for name in STAGES if name in stages and name != "model_load"]
+    total = sum(timed)
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "duration": args.duration, "seed": args.seed, "format": args.format, "input_bytes": input_bytes,
+            "model": args.model, "dtype": args.dtype, "language": args.language, "batch_size": args.batch_size,
+            "vad_aggressiveness": args.vad_aggressiveness, "vad_workers": args.vad_workers,
+            "max_chars": args.max_chars, "min_chars": args.min_chars, "max_duration": args.max_duration,
+            "llm_latency": args.llm_latency, "llm_workers": args.llm_workers, "llm_batch_size": args.llm_batch_size,
+            "repeat": args.repeat, "skip": sorted(args.skip), "pack": not args.no_pack,
+        },
+        "environment": _environment(),
+        "audio_seconds": round(audio_seconds, 3),
+        "stages": stages,
+        "total": {
+            "seconds": round(total, 4),
+            "throughput": round(audio_seconds / total, 2) if total else None,
+        },
+    }
+
+
+def compare(result, baseline, threshold):
+    """기준 결과와 단계별 시간을 비교하여 느려진 단계 이름 목록 반환"""
+    if baseline.get("config", {}).get("duration") != result["config"]["duration"]:
+        print("주의: 기준 결과와 오디오 길이가 다릅니다")
+    regressions = []
+    print(f"\n기준 결과와 비교 (허용 오차 {threshold * 100:.0f}%):")
+    for name in STAGES:
+        current = result["stages"].get(name)
+        base = baseline.get("stages", {}).get(name)
+        if not current or not base or not base.get("seconds"):
+            continue
+        ratio = current["seconds"] / base["seconds"]
+        mark = ""
+        if abs(current["seconds"] - base["seconds"]) < MIN_COMPARE_DELTA_SECONDS:
+            pass
+        elif ratio > 1 + threshold:
+            mark = "  <- 느려짐"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            mark = "  <- 빨라짐"
+        print(f"  {name:<15} {base['seconds']:9.3f}초 -> {current['seconds']:9.3f}초 ({ratio:5.2f}배){mark}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="자막 생성 파이프라인 단계별 벤치마크")
+    parser.add_argument("--duration", type=float, default=600, help="합성 오디오 길이(초)")
+    parser.add_argument("--seed", type=int, default=0, help="합성 오디오와 텍스트의 난수 seed")
+    parser.add_argument("--format", default="mp3", choices=["wav", "mp3", "m4a", "flac"], help="디코딩할 입력 파일 형식")
+    parser.add_argument("--model", default="tiny", help="음성 인식 단계의 Whisper 모델 크기")
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"],
+                        help="음성 인식 모델 정밀도 (기본값: 장치에 맞게 자동, int8은 CPU 전용 양자화)")
+    parser.add_argument("--language", default="ko", help="음성 인식 언어 (언어 감지 시간 제외)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Whisper 배치 크기")
+    parser.add_argument("--vad-aggressiveness", type=int, default=1, choices=range(4), help="VAD 감도 (0~3)")
+    parser.add_argument("--no-pack", action="store_true", help="VAD 구간을 인식 창 단위로 묶지 않고 그대로 인식")
+    parser.add_argument("--vad-workers", type=int, default=1, help="VAD 병렬 프로세스 수")
+    parser.add_argument("--max-chars", type=int, default=40, help="한 자막당 최대 글자 수")
+    parser.add_argument("--min-chars", type=int, default=10, help="한 자막당 최소 글자 수")
+    parser.add_argument("--max-duration", type=float, default=5.0, help="한 자막당 최대 시간(초)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="가짜 LLM 서버의 요청당 지연 시간(초)")
+    parser.add_argument("--llm-workers", type=int, default=8, help="LLM 동시 요청 수")
+    parser.add_argument("--llm-batch-size", type=int, default=1, help="LLM 요청당 자막 수")
+    parser.add_argument("--repeat", type=int, default=1, help="단계별 반복 횟수 (가장 빠른 실행 기준)")
+    parser.add_argument("--skip", default="", help="건너뛸 단계 (쉼표로 구분: asr, llm)")
+    parser.add_argument("--output", default="benchmark.json", help="결과 JSON 파일 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--threshold", type=float, default=0.1, help="느려졌다고 판단할 비율 (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    args.skip = [name.strip() for name in args.skip.split(",") if name.strip()]
+    for name in args.skip:
+        if name not in SKIPPABLE:
+            parser.error(f"--skip에 사용할 수 없는 값입니다: {name} (사용 가능: {', '.join(SKIPPABLE)})")
+    args.repeat = max(1, args.repeat)
+
+    result = run_benchmark(args)
+    print(f"\n전체 {result['total']['seconds']:.3f}초 (모델 로딩 제외, {result['total']['throughput'] or 0:.1f}배속)")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"결과 파일: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"느려진 단계: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
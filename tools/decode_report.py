@@ -0,0 +1,212 @@
+"""기본 디코딩, VAD 신뢰 디코딩(vad_trusted), 초안 모델 2단계 인식의 속도·품질 비교 보고서
+
+오디오 파일(없으면 합성 오디오)마다 디코딩, VAD, 구간 묶기를 한 번만 실행한 뒤 같은 창들을
+모드마다 인식하여 인식 시간, 실시간 배율(RTF), 기본 모드 대비 속도 향상 비율, 디코딩 통계(창 수,
+다시 디코딩한 창 수, 환각으로 버린 창 수, 검증 모델로 다시 인식한 창 수)를 비교합니다.
+--draft-model을 주면 초안 모델로 먼저 인식하고 신뢰도가 낮은 창만 --model로 다시 인식하는
+"draft" 모드도 함께 측정합니다.
+
+vad_trusted 모드의 멜 스펙트로그램과 인코더 입력은 기본 모드와 같으므로(30초 창), 속도 차이는
+온도 폴백 단계를 줄인 것과 창 길이에 따른 최대 토큰 수 제한에서만 나옵니다. 언어는 --language로
+고정하여 모든 모드에서 언어 감지 시간을 뺍니다.
+
+오디오와 같은 이름의 .txt 또는 .srt 정답 파일이 있으면 각 모드의 WER/CER을 정답 기준으로
+계산하고, 없으면 기본 디코딩 결과를 기준으로 각 모드의 단어/글자 변화율을 계산합니다.
+
+사용 예:
+    python tools/decode_report.py --model small --audio fixtures/*.mp3
+    python tools/decode_report.py --model large --draft-model tiny --audio fixtures/*.mp3
+    python tools/decode_report.py --duration 300 --output decode_report.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import datetime
+import numpy as np
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+
+from audio_io import decode_audio, pcm_duration, SAMPLE_RATE
+from vad import detect_voice_segments, pack_segments
+from transcription import BatchTranscriber
+from model_cache import get_registry
+from benchmark import synthesize_audio, run_stage, _environment
+
+# 보고서에 함께 기록하는 vad_trusted 속도 차이의 출처
+VAD_TRUSTED_NOTE = "vad_trusted의 속도 차이는 폴백 단계 축소와 최대 토큰 수 제한에서만 나옴 (멜/인코더 입력은 동일)"
+
+# SRT 번호 줄과 시간 줄
+SRT_NOISE = re.compile(r"^\s*(\d+|\d\d:\d\d:\d\d[,.]\d{3}\s*-->.*)\s*$")
+
+
+def edit_distance(reference, hypothesis):
+    """두 토큰 목록의 편집 거리 (한 행씩 numpy로 계산)"""
+    if not reference:
+        return len(hypothesis)
+    if not hypothesis:
+        return len(reference)
+    vocabulary = {token: i for i, token in enumerate(set(reference) | set(hypothesis))}
+    ref = np.array([vocabulary[token] for token in reference])
+    columns = np.arange(len(ref) + 1)
+    row = columns.copy()
+    for token in hypothesis:
+        # 대각선(교체/일치)과 위(삽입)를 먼저 구한 뒤, 왼쪽(삭제)은 누적 최솟값으로 한 번에 전파
+        candidate = np.empty_like(row)
+        candidate[0] = row[0] + 1
+        candidate[1:] = np.minimum(row[:-1] + (ref != vocabulary[token]), row[1:] + 1)
+        row = np.minimum.accumulate(candidate - columns) + columns
+    return int(row[-1])
+
+
+def error_rates(reference, hypothesis):
+    """(WER, CER). CER은 공백을 뺀 글자 기준"""
+    ref_words = reference.split()
+    hyp_words = hypothesis.split()
+    ref_chars = list("".join(ref_words))
+    hyp_chars = list("".join(hyp_words))
+    wer = edit_distance(ref_words, hyp_words) / len(ref_words) if ref_words else float(bool(hyp_words))
+    cer = edit_distance(ref_chars, hyp_chars) / len(ref_chars) if ref_chars else float(bool(hyp_chars))
+    return round(wer, 4), round(cer, 4)
+
+
+def read_reference(audio_path):
+    """오디오와 같은 이름의 .txt/.srt 정답 텍스트 (없으면 None)"""
+    stem = os.path.splitext(audio_path)[0]
+    for extension in (".txt", ".srt"):
+        path = stem + extension
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8-sig") as f:
+                lines = f.read().splitlines()
+            if extension == ".srt":
+                lines = [line for line in lines if not SRT_NOISE.match(line)]
+            return " ".join(line.strip() for line in lines if line.strip())
+    return None
+
+
+def load_fixtures(args):
+    """(이름, PCM, 정답 텍스트) 목록"""
+    if not args.audio:
+        print(f"합성 오디오 생성 중... ({args.duration:.0f}초, seed {args.seed})")
+        return [(f"synthetic-{args.duration:.0f}s", synthesize_audio(args.duration, seed=args.seed), None)]
+    fixtures = []
+    for path in args.audio:
+        print(f"오디오 디코딩 중... ({path})")
+        fixtures.append((os.path.basename(path), decode_audio(path, SAMPLE_RATE), read_reference(path)))
+    return fixtures
+
+
+def create_transcribers(args, model, draft_model):
+    """모드 이름 -> 음성 인식기 생성 함수 (첫 번째가 기준 모드)"""
+    options = {"batch_size": args.batch_size}
+    modes = {
+        "standard": lambda: BatchTranscriber(model, **options),
+        "vad_trusted": lambda: BatchTranscriber(model, vad_trusted=True, **options),
+    }
+    if draft_model is not None:
+        modes["draft"] = lambda: BatchTranscriber(draft_model, verifier=BatchTranscriber(model, **options), **options)
+    return modes
+
+
+def run_fixture(args, modes, name, pcm, reference):
+    """오디오 하나를 모드마다 인식하여 결과 기록 반환"""
+    audio_seconds = pcm_duration(pcm)
+    voice_segments = pack_segments(detect_voice_segments(pcm, SAMPLE_RATE, args.vad_aggressiveness), pcm, SAMPLE_RATE)
+    print(f"{name}: 오디오 {audio_seconds:.0f}초, 인식 창 {len(voice_segments)}개")
+
+    record = {"audio_seconds": round(audio_seconds, 3), "windows": len(voice_segments),
+              "reference": reference is not None, "modes": {}}
+    texts = {}
+    for mode, create in modes.items():
+        transcribers = []
+
+        def transcribe():
+            # 실행마다 새 인식기를 사용하여 통계가 누적되지 않도록 함
+            transcribers.append(create())
+            return transcribers[-1].transcribe_segments(pcm, voice_segments, SAMPLE_RATE, args.language)
+
+        asr, result = run_stage(mode, transcribe, audio_seconds, args.repeat)
+        texts[mode] = " ".join(segment["text"].strip() for segment in result["segments"])
+        mode_record = {
+            "asr_seconds": asr["seconds"],
+            "rtf": round(asr["seconds"] / audio_seconds, 4) if audio_seconds else None,
+            "segments": len(result["segments"]),
+            "stats": {key: round(value, 3) for key, value in sorted(transcribers[-1].stats.items())},
+        }
+        if result.get("escalation"):
+            mode_record["escalation"] = result["escalation"]
+        if reference is not None:
+            mode_record["wer"], mode_record["cer"] = error_rates(reference, texts[mode])
+        record["modes"][mode] = mode_record
+
+    standard = record["modes"]["standard"]
+    for mode, mode_record in record["modes"].items():
+        if mode == "standard":
+            continue
+        mode_record["speedup"] = round(standard["asr_seconds"] / mode_record["asr_seconds"], 2) \
+            if mode_record["asr_seconds"] else None
+        if reference is not None:
+            mode_record["wer_change"] = round(mode_record["wer"] - standard["wer"], 4)
+            mode_record["cer_change"] = round(mode_record["cer"] - standard["cer"], 4)
+        else:
+            # 정답이 없으면 기본 디코딩 결과와 얼마나 달라졌는지만 기록
+            mode_record["wer_change"], mode_record["cer_change"] = error_rates(texts["standard"], texts[mode])
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="음성 인식 디코딩 모드별 속도·품질 비교")
+    parser.add_argument("--audio", nargs="+", help="비교할 오디오/영상 파일 (같은 이름의 .txt/.srt를 정답으로 사용)")
+    parser.add_argument("--duration", type=float, default=120, help="오디오가 없을 때 합성 오디오 길이(초)")
+    parser.add_argument("--seed", type=int, default=0, help="합성 오디오 난수 seed")
+    parser.add_argument("--model", default="small", help="Whisper 모델 크기")
+    parser.add_argument("--draft-model", help="draft 모드의 초안 모델 크기 (예: tiny, 없으면 draft 모드 생략)")
+    parser.add_argument("--device", default="cpu", help="모델 장치")
+    parser.add_argument("--language", default="ko", help="음성 인식 언어 (언어 감지 시간 제외)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Whisper 배치 크기")
+    parser.add_argument("--vad-aggressiveness", type=int, default=1, choices=range(4), help="VAD 감도 (0~3)")
+    parser.add_argument("--repeat", type=int, default=1, help="인식 반복 횟수 (가장 빠른 실행 기준)")
+    parser.add_argument("--output", default="decode_report.json", help="결과 JSON 파일 경로")
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures(args)
+    model = get_registry().get(args.model, args.device)
+    draft_model = get_registry().get(args.draft_model, args.device) if args.draft_model else None
+    modes = create_transcribers(args, model, draft_model)
+    results = {name: run_fixture(args, modes, name, pcm, reference) for name, pcm, reference in fixtures}
+
+    print(f"\n{args.model} 모델" + (f" (초안 모델 {args.draft_model})" if args.draft_model else "") + ", 기본 모드 대비:")
+    print(f"  ({VAD_TRUSTED_NOTE})")
+    for name, record in results.items():
+        label = "WER/CER 변화" if record["reference"] else "기본 대비 WER/CER"
+        for mode, mode_record in record["modes"].items():
+            if mode == "standard":
+                continue
+            if "escalation" in mode_record:
+                detail = (f"다시 인식 {mode_record['escalation']['escalated']}/"
+                          f"{mode_record['escalation']['windows']}창")
+            else:
+                detail = (f"다시 디코딩 {mode_record['stats'].get('fallbacks', 0)}창, "
+                          f"버림 {mode_record['stats'].get('dropped', 0)}창")
+            print(f"  {name:<24} {mode:<12} {mode_record['speedup'] or 0:.2f}배 빠름  {label} "
+                  f"{mode_record['wer_change'] * 100:+.1f}%/{mode_record['cer_change'] * 100:+.1f}%  {detail}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "config": {"model": args.model, "draft_model": args.draft_model, "device": args.device, "audio": args.audio,
+                       "duration": None if args.audio else args.duration, "seed": args.seed,
+                       "language": args.language, "batch_size": args.batch_size,
+                       "vad_aggressiveness": args.vad_aggressiveness, "repeat": args.repeat},
+            "environment": _environment(),
+            "note": VAD_TRUSTED_NOTE,
+            "fixtures": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"결과 파일: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
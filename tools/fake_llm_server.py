@@ -0,0 +1,150 @@
+"""OpenAI/Anthropic API를 흉내 내는 로컬 테스트 서버
+
+LLM 교정 단계를 실제 API 없이 시험하거나 벤치마크할 때 사용합니다.
+응답은 사용자 프롬프트의 '현재 자막'(배치 프롬프트는 '교정할 자막들'의
+JSON 배열)을 그대로 돌려주며, 지연 시간과
+429/500 오류 비율을 지정할 수 있습니다.
+
+사용 예:
+    python tools/fake_llm_server.py --port 8765 --latency 0.2 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=test python script.py
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=test python script.py
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CURRENT_SUB_PATTERN = re.compile(r"\*\*현재 자막\*\*:\s*```\s*(.*?)\s*```", re.S)
+BATCH_SUBS_PATTERN = re.compile(r"\*\*교정할 자막들\*\*:\s*```\s*(.*?)\s*```", re.S)
+
+
+def extract_current_subtitle(prompt):
+    """사용자 프롬프트에서 현재 자막 추출"""
+    match = CURRENT_SUB_PATTERN.search(prompt)
+    return match.group(1) if match else prompt
+
+
+def build_reply(prompt):
+    """프롬프트에 대한 가짜 교정 결과 (배치 프롬프트에는 JSON 배열로 응답)"""
+    match = BATCH_SUBS_PATTERN.search(prompt)
+    if match:
+        subs = [re.sub(r"^\d+\.\s*", "", line) for line in match.group(1).split("\n")]
+        return json.dumps(subs, ensure_ascii=False)
+    return extract_current_subtitle(prompt)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server_version = "FakeLLM/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_fail(self):
+        """설정된 비율로 429 또는 500 오류 응답"""
+        if random.random() >= self.server.error_rate:
+            return False
+        with self.server.stats_lock:
+            self.server.stats["errors"] += 1
+        if random.random() < 0.5:
+            self._send_json(429, {"error": {"type": "rate_limit_error", "message": "rate limited"}},
+                            {"retry-after": "0.1"})
+        else:
+            self._send_json(500, {"error": {"type": "api_error", "message": "internal error"}})
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self._maybe_fail():
+            return
+
+        prompt = request["messages"][-1]["content"]
+        reply = build_reply(prompt)
+        input_tokens = sum(len(str(m.get("content", ""))) for m in request["messages"]) // 2
+        output_tokens = len(reply) // 2 + 1
+
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                          "total_tokens": input_tokens + output_tokens}
+            })
+        elif self.path.rstrip("/").endswith("/messages"):
+            self._send_json(200, {
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "model": request.get("model", "fake"),
+                "content": [{"type": "text", "text": reply}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+            })
+        else:
+            self._send_json(404, {"error": {"type": "not_found", "message": self.path}})
+
+
+def start_fake_server(host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, verbose=False):
+    """백그라운드 스레드에서 서버를 시작하고 서버 객체를 반환
+
+    server.server_address[1]로 실제 포트를, server.stats로 요청/오류 수를 확인할 수 있습니다.
+    """
+    server = ThreadingHTTPServer((host, port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.verbose = verbose
+    server.stats = {"requests": 0, "errors": 0}
+    server.stats_lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 OpenAI/Anthropic API 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="요청당 지연 시간(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/500 오류 응답 비율 (0~1)")
+    args = parser.parse_args()
+
+    server = start_fake_server(args.host, args.port, args.latency, args.error_rate, verbose=True)
+    print(f"가짜 LLM 서버 실행 중: http://{args.host}:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Whisper 모델 정밀도별(FP32, int8 양자화 등) 음성 인식 속도와 메모리 비교
+
+같은 오디오(합성 오디오 또는 --audio로 준 파일)와 같은 VAD 구간을 정밀도마다 인식하여
+모델 로딩 시간, 인식 시간, 실시간 배율(RTF = 처리 시간 ÷ 오디오 길이), 모델 메모리,
+인식 중 최대 메모리를 JSON으로 저장합니다. 첫 번째 정밀도를 기준으로 속도 향상 비율과
+인식 텍스트의 글자 단위 일치율도 함께 기록합니다. 합성 오디오는 실제 말이 아니므로
+정확도를 비교하려면 --audio로 실제 녹음을 사용하세요.
+
+사용 예:
+    python tools/quantization_benchmark.py --model medium --duration 300
+    python tools/quantization_benchmark.py --model small --audio lecture.mp3 --dtypes float32,int8
+"""
+import os
+import sys
+import json
+import difflib
+import argparse
+from datetime import datetime
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+
+from audio_io import decode_audio, pcm_duration, SAMPLE_RATE
+from vad import detect_voice_segments, pack_segments
+from transcription import BatchTranscriber
+from model_cache import ModelRegistry, estimate_model_bytes, SUPPORTED_DTYPES
+from benchmark import synthesize_audio, run_stage, _environment
+
+
+def text_similarity(reference, text):
+    """두 인식 결과의 글자 단위 일치율 (0~1, 공백 무시)"""
+    reference = "".join(reference.split())
+    text = "".join(text.split())
+    if not reference and not text:
+        return 1.0
+    return difflib.SequenceMatcher(None, reference, text, autojunk=False).ratio()
+
+
+def run_comparison(args):
+    """정밀도마다 모델을 로드하여 같은 입력을 인식하고 결과 딕셔너리 반환"""
+    if args.audio:
+        print(f"오디오 디코딩 중... ({args.audio})")
+        pcm = decode_audio(args.audio, SAMPLE_RATE)
+    else:
+        print(f"합성 오디오 생성 중... ({args.duration:.0f}초, seed {args.seed})")
+        pcm = synthesize_audio(args.duration, seed=args.seed)
+    audio_seconds = pcm_duration(pcm)
+    voice_segments = pack_segments(detect_voice_segments(pcm, SAMPLE_RATE, args.vad_aggressiveness), pcm, SAMPLE_RATE)
+
+    # 정밀도마다 새 레지스트리를 사용하여 앞 모델을 해제한 뒤 측정
+    results = {}
+    baseline = None
+    for dtype in args.dtypes:
+        print(f"{dtype}:")
+        registry = ModelRegistry(memory_budget_mb=0)
+        load, model = run_stage("model_load", lambda: registry.get(args.model, args.device, dtype), audio_seconds)
+        transcriber = BatchTranscriber(model, batch_size=args.batch_size, fp16=dtype == "float16")
+        asr, result = run_stage(
+            "asr", lambda: transcriber.transcribe_segments(pcm, voice_segments, SAMPLE_RATE, args.language),
+            audio_seconds, args.repeat
+        )
+        record = {
+            "model_load_seconds": load["seconds"],
+            "asr_seconds": asr["seconds"],
+            "rtf": round(asr["seconds"] / audio_seconds, 4) if audio_seconds else None,
+            "model_mb": round(estimate_model_bytes(model) / (1024 ** 2), 1),
+            "peak_rss_mb": asr["peak_rss_mb"],
+            "peak_rss_scope": asr["peak_rss_scope"],
+            "segments": len(result["segments"]),
+        }
+        text = " ".join(segment["text"] for segment in result["segments"])
+        if baseline is None:
+            baseline = (dtype, record, text)
+        else:
+            _, base_record, base_text = baseline
+            record["speedup"] = round(base_record["asr_seconds"] / record["asr_seconds"], 2) \
+                if record["asr_seconds"] else None
+            record["text_similarity"] = round(text_similarity(base_text, text), 4)
+        results[dtype] = record
+        del registry, model, transcriber
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "model": args.model, "device": args.device, "dtypes": args.dtypes, "audio": args.audio,
+            "duration": None if args.audio else args.duration, "seed": args.seed, "language": args.language,
+            "batch_size": args.batch_size, "vad_aggressiveness": args.vad_aggressiveness, "repeat": args.repeat,
+        },
+        "environment": _environment(),
+        "audio_seconds": round(audio_seconds, 3),
+        "voice_segments": len(voice_segments),
+        "baseline": args.dtypes[0],
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Whisper 모델 정밀도별 음성 인식 속도와 메모리 비교")
+    parser.add_argument("--model", default="small", help="Whisper 모델 크기")
+    parser.add_argument("--device", default="cpu", help="모델 장치 (int8은 CPU 전용)")
+    parser.add_argument("--dtypes", default="float32,int8",
+                        help="비교할 정밀도 (쉼표로 구분, 첫 번째가 기준)")
+    parser.add_argument("--audio", help="인식할 오디오/영상 파일 (기본값: 합성 오디오)")
+    parser.add_argument("--duration", type=float, default=120, help="합성 오디오 길이(초)")
+    parser.add_argument("--seed", type=int, default=0, help="합성 오디오 난수 seed")
+    parser.add_argument("--language", default="ko", help="음성 인식 언어 (언어 감지 시간 제외)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Whisper 배치 크기")
+    parser.add_argument("--vad-aggressiveness", type=int, default=1, choices=range(4), help="VAD 감도 (0~3)")
+    parser.add_argument("--repeat", type=int, default=1, help="인식 반복 횟수 (가장 빠른 실행 기준)")
+    parser.add_argument("--output", default="quantization.json", help="결과 JSON 파일 경로")
+    args = parser.parse_args(argv)
+
+    args.dtypes = [dtype.strip() for dtype in args.dtypes.split(",") if dtype.strip()]
+    unknown = [dtype for dtype in args.dtypes if dtype not in SUPPORTED_DTYPES]
+    if unknown:
+        parser.error(f"알 수 없는 정밀도: {', '.join(unknown)}")
+
+    result = run_comparison(args)
+    print(f"\n{args.model} 모델, 오디오 {result['audio_seconds']:.0f}초:")
+    for dtype, record in result["results"].items():
+        extra = ""
+        if "speedup" in record:
+            extra = f"  {record['speedup']:.2f}배 빠름  텍스트 일치율 {record['text_similarity'] * 100:.1f}%"
+        print(f"  {dtype:<8} RTF {record['rtf']:.3f}  모델 {record['model_mb']:.0f}MB  "
+              f"최대 메모리 {record['peak_rss_mb'] or 0:.0f}MB{extra}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"결과 파일: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
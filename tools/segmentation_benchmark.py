@@ -0,0 +1,166 @@
+"""자막 분할 엔진(segmentation.build_cues) 마이크로 벤치마크
+
+무작위 합성 세그먼트(기본 10만 개)를 여러 한도 조합으로 나누고 합쳐 처리 시간과
+세그먼트당 처리 시간을 측정합니다. 입력 크기를 1/10로 줄인 실행과 세그먼트당 시간을
+비교하여 선형 시간인지 확인하고, --check를 주면 결과가 한도를 지키는지 검사합니다.
+
+- 텍스트 보존: 공백을 뺀 전체 텍스트가 입력과 같음
+- 글자 수: 모든 자막이 max_chars 이하
+- 시간: 단어 타임스탬프가 없으면 모든 나눈 자막이 max_duration 이하
+- 순서: 자막 시작 ≤ 끝, 앞 자막 끝 ≤ 다음 자막 시작
+- 병합: 합칠 수 있는 짧은 자막이 남아 있지 않음
+
+사용 예:
+    python tools/segmentation_benchmark.py --segments 100000 --check
+    python tools/segmentation_benchmark.py --words --output segmentation.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+
+from segmentation import build_cues, MERGE_MAX_CHARS, MERGE_MAX_GAP_SECONDS
+
+# 합성 텍스트에 사용할 음절
+SYLLABLES = list("가나다라마바사아자차카타파하고노도로모보소오조초코토포호그는을를이에서의")
+
+# 측정할 한도 조합 (max_chars, min_chars, max_duration)
+CONFIGS = {
+    "max_chars": (20, None, None),
+    "max_duration": (None, None, 4.0),
+    "min_chars": (None, 8, None),
+    "all": (20, 8, 4.0),
+}
+
+# 시간 비교 허용 오차(초)
+EPSILON = 1e-6
+
+
+def synthetic_segments(count, seed=0, with_words=False, chars_per_second=6.0):
+    """길이와 간격이 제각각인 합성 세그먼트 목록 (with_words면 단어 타임스탬프 포함)"""
+    rng = np.random.default_rng(seed)
+    durations = rng.uniform(0.3, 25.0, count)
+    gaps = rng.exponential(1.0, count)
+    segments = []
+    time_cursor = 0.0
+    for duration, gap in zip(durations, gaps):
+        start = time_cursor + gap
+        end = start + duration
+        target = max(1, int(duration * chars_per_second))
+        words = []
+        length = 0
+        while length < target:
+            # 가끔 띄어쓰기 없이 길게 이어진 단어와 문장 끝 부호
+            size = int(rng.integers(12, 30)) if rng.random() < 0.02 else int(rng.integers(1, 5))
+            word = "".join(rng.choice(SYLLABLES, size=size))
+            if rng.random() < 0.1:
+                word += "."
+            words.append(word)
+            length += len(word)
+        segment = {"start": start, "end": end, "text": " ".join(words)}
+        if with_words:
+            bounds = np.sort(rng.uniform(start, end, 2 * len(words)))
+            segment["words"] = [
+                {"word": " " + word, "start": float(bounds[2 * i]), "end": float(bounds[2 * i + 1])}
+                for i, word in enumerate(words)
+            ]
+        segments.append(segment)
+        time_cursor = end
+    return segments
+
+
+def check_cues(segments, cues, max_chars, min_chars, max_duration, with_words):
+    """분할 결과가 한도를 지키는지 검사하여 위반 목록 반환"""
+    errors = []
+    source = "".join("".join(segment["text"].split()) for segment in segments)
+    result = "".join("".join(text.split()) for _, _, text in cues)
+    if source != result:
+        errors.append("텍스트가 보존되지 않음")
+    merge_limit = max_chars or MERGE_MAX_CHARS
+    for index, (start, end, text) in enumerate(cues):
+        if end < start - EPSILON:
+            errors.append(f"#{index} 시작이 끝보다 늦음")
+        if max_chars and len(text) > max_chars:
+            errors.append(f"#{index} 글자 수 {len(text)} > {max_chars}")
+        if max_duration and not with_words and end - start > max_duration + EPSILON:
+            errors.append(f"#{index} 시간 {end - start:.3f} > {max_duration}")
+        if index + 1 < len(cues):
+            next_start, next_end, next_text = cues[index + 1]
+            if end > next_start + EPSILON:
+                errors.append(f"#{index} 다음 자막과 겹침")
+            if (min_chars and len(text) < min_chars and next_start - end <= MERGE_MAX_GAP_SECONDS
+                    and len(text) + 1 + len(next_text) <= merge_limit
+                    and (not max_duration or next_end - start <= max_duration)):
+                errors.append(f"#{index} 합칠 수 있는 짧은 자막이 남음")
+        if len(errors) >= 20:
+            break
+    return errors
+
+
+def measure(segments, config, repeat):
+    """가장 빠른 실행 시간(초)과 결과 반환"""
+    max_chars, min_chars, max_duration = config
+    best = None
+    cues = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cues = build_cues(segments, None, max_chars, min_chars, max_duration)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, cues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="자막 분할 엔진 마이크로 벤치마크")
+    parser.add_argument("--segments", type=int, default=100000, help="합성 세그먼트 수")
+    parser.add_argument("--seed", type=int, default=0, help="합성 데이터 난수 시드")
+    parser.add_argument("--repeat", type=int, default=3, help="조합마다 반복 횟수 (가장 빠른 값 사용)")
+    parser.add_argument("--words", action="store_true", help="단어 타임스탬프가 있는 세그먼트 사용")
+    parser.add_argument("--check", action="store_true", help="결과가 한도를 지키는지 검사")
+    parser.add_argument("--output", help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    segments = synthetic_segments(args.segments, args.seed, args.words)
+    small = segments[:max(1, args.segments // 10)]
+    results = {}
+    failed = False
+    for name, config in CONFIGS.items():
+        seconds, cues = measure(segments, config, args.repeat)
+        small_seconds, _ = measure(small, config, args.repeat)
+        per_segment = seconds / len(segments)
+        small_per_segment = small_seconds / len(small)
+        record = {
+            "seconds": round(seconds, 4),
+            "segments_per_second": round(len(segments) / seconds) if seconds else None,
+            "microseconds_per_segment": round(per_segment * 1e6, 3),
+            "cues": len(cues),
+            # 선형 시간이면 입력 크기와 관계없이 1에 가까움
+            "scaling": round(per_segment / small_per_segment, 2) if small_per_segment else None,
+        }
+        if args.check:
+            errors = check_cues(segments, cues, *config, args.words)
+            record["violations"] = errors
+            failed = failed or bool(errors)
+        results[name] = record
+        status = ""
+        if args.check:
+            status = " 검사 통과" if not record["violations"] else f" 위반 {len(record['violations'])}건"
+        print(f"{name:<13} {record['seconds']:8.3f}초  {record['microseconds_per_segment']:7.2f}µs/세그먼트  "
+              f"자막 {record['cues']:>7}개  규모 비율 {record['scaling']}{status}")
+        for error in record.get("violations", [])[:5]:
+            print(f"  - {error}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"segments": args.segments, "words": args.words, "results": results}, f,
+                      ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""동시 음성 인식 작업의 CPU 스레드 배치별 전체 처리량 비교
+
+여러 작업(프로세스)이 같은 합성 오디오를 동시에 인식할 때, 작업 수와 작업당 스레드 수
+조합(레이아웃)마다 전체 처리량(초당 처리한 오디오 길이의 합)을 측정합니다. 작업 수 ×
+스레드 수가 코어 수 이하이면 작업마다 겹치지 않는 코어 묶음에 고정하고(job_queue의
+작업자와 같은 방식), 넘으면 고정하지 않아 각 작업이 코어를 두고 경쟁하는 기본 동작을
+재현합니다. 모델 로딩이 끝난 뒤 모든 작업을 동시에 시작하므로 로딩 시간은 제외됩니다.
+
+레이아웃은 "작업 수x스레드 수"로 쓰며, 기본값은 코어 수를 1, 2, 4, ... 개의 작업으로
+나눈 조합과 작업마다 모든 코어를 사용하는 조합(스레드 설정이 없던 상태)입니다.
+
+사용 예:
+    python tools/thread_benchmark.py --duration 120
+    python tools/thread_benchmark.py --layouts 1x16,2x8,4x4,8x2,4x16 --output threads.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+import numpy as np
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+
+from audio_io import pcm_duration, SAMPLE_RATE
+from vad import detect_voice_segments, pack_segments
+from cpu_threads import available_cores, partition_cores
+from benchmark import synthesize_audio, _environment
+
+
+def default_layouts(cores):
+    """코어를 1, 2, 4, ... 개의 작업으로 나눈 레이아웃과 작업마다 모든 코어를 쓰는 레이아웃"""
+    layouts = []
+    jobs = 1
+    while jobs <= cores:
+        layouts.append((jobs, cores // jobs))
+        jobs *= 2
+    oversubscribed = (max(2, layouts[-1][0]), cores)
+    if oversubscribed not in layouts:
+        layouts.append(oversubscribed)
+    return layouts
+
+
+def parse_layouts(text):
+    layouts = []
+    for item in text.split(","):
+        jobs, threads = item.strip().lower().split("x")
+        layouts.append((int(jobs), int(threads)))
+    return layouts
+
+
+def _job(index, args, pcm_path, voice_segments, threads, cores, barrier, results):
+    """작업 프로세스: 모델을 로드하고 다른 작업과 함께 시작하여 인식 시간을 보고"""
+    from cpu_threads import pin_to_cores, configure_threads
+    pin_to_cores(cores)
+    configure_threads(threads, 1)
+    from model_cache import get_registry
+    from transcription import BatchTranscriber
+
+    pcm = np.load(pcm_path)
+    model = get_registry().get(args.model, "cpu", args.dtype)
+    transcriber = BatchTranscriber(model, batch_size=args.batch_size)
+    barrier.wait()
+    start = time.perf_counter()
+    transcriber.transcribe_segments(pcm, voice_segments, SAMPLE_RATE, args.language)
+    results.put((index, start, time.perf_counter()))
+
+
+def run_layout(args, pcm_path, voice_segments, audio_seconds, jobs, threads, cores):
+    """레이아웃 하나를 실행하여 결과 기록 반환"""
+    pinned = args.pin and jobs * threads <= len(cores)
+    groups = partition_cores(cores, jobs) if pinned else [None] * jobs
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(jobs)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_job, args=(i, args, pcm_path, voice_segments, threads, groups[i], barrier, results))
+        for i in range(jobs)
+    ]
+    for process in processes:
+        process.start()
+    timings = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    wall = max(end for _, _, end in timings) - min(start for _, start, _ in timings)
+    job_seconds = [end - start for _, start, end in timings]
+    return {
+        "jobs": jobs,
+        "threads_per_job": threads,
+        "total_threads": jobs * threads,
+        "pinned": pinned,
+        "wall_seconds": round(wall, 3),
+        "mean_job_seconds": round(sum(job_seconds) / jobs, 3),
+        "mean_job_rtf": round(sum(job_seconds) / jobs / audio_seconds, 4),
+        "throughput": round(jobs * audio_seconds / wall, 2) if wall else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="동시 음성 인식 작업의 CPU 스레드 배치별 전체 처리량 비교")
+    parser.add_argument("--layouts", help="작업 수x스레드 수 목록 (쉼표로 구분, 예: 1x8,2x4,4x2,4x8)")
+    parser.add_argument("--duration", type=float, default=60, help="작업마다 인식할 합성 오디오 길이(초)")
+    parser.add_argument("--seed", type=int, default=0, help="합성 오디오 난수 seed")
+    parser.add_argument("--model", default="tiny", help="Whisper 모델 크기")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "int8"], help="모델 정밀도")
+    parser.add_argument("--language", default="ko", help="음성 인식 언어 (언어 감지 시간 제외)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Whisper 배치 크기")
+    parser.add_argument("--no-pin", dest="pin", action="store_false", help="작업을 코어 묶음에 고정하지 않음")
+    parser.add_argument("--output", default="threads.json", help="결과 JSON 파일 경로")
+    args = parser.parse_args(argv)
+
+    cores = available_cores()
+    layouts = parse_layouts(args.layouts) if args.layouts else default_layouts(len(cores))
+    print(f"합성 오디오 생성 중... ({args.duration:.0f}초, seed {args.seed}), 사용 가능한 코어 {len(cores)}개")
+    pcm = synthesize_audio(args.duration, seed=args.seed)
+    audio_seconds = pcm_duration(pcm)
+    voice_segments = pack_segments(detect_voice_segments(pcm, SAMPLE_RATE, 1), pcm, SAMPLE_RATE)
+
+    records = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pcm_path = os.path.join(temp_dir, "audio.npy")
+        np.save(pcm_path, pcm)
+        for jobs, threads in layouts:
+            record = run_layout(args, pcm_path, voice_segments, audio_seconds, jobs, threads, cores)
+            records.append(record)
+            print(f"  {jobs:>3}작업 x {threads:>3}스레드 {'(코어 고정)' if record['pinned'] else '(고정 안 함)'}  "
+                  f"전체 {record['wall_seconds']:8.2f}초  처리량 {record['throughput'] or 0:8.1f}배속  "
+                  f"작업당 RTF {record['mean_job_rtf']:.3f}")
+
+    best = max(records, key=lambda record: record["throughput"] or 0)
+    print(f"\n가장 높은 처리량: {best['jobs']}작업 x {best['threads_per_job']}스레드")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "config": {"duration": args.duration, "seed": args.seed, "model": args.model, "dtype": args.dtype,
+                       "language": args.language, "batch_size": args.batch_size, "pin": args.pin},
+            "environment": _environment(),
+            "cores": len(cores),
+            "audio_seconds": round(audio_seconds, 3),
+            "layouts": records,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"결과 파일: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,618 @@
+import os
+import hashlib
+import collections
+import numpy as np
+import torch
+import whisper
+from whisper.audio import SAMPLE_RATE, N_SAMPLES, N_FRAMES, HOP_LENGTH
+from whisper.decoding import DecodingOptions
+from whisper.tokenizer import get_tokenizer
+from whisper.timing import add_word_timestamps
+from disk_cache import DiskCache, DEFAULT_CACHE_DIR, hash_key
+from vad import pack_segments, merge_short_segments
+
+# 타임스탬프 토큰 하나가 나타내는 시간(초)
+TIME_PRECISION = 2 * HOP_LENGTH / SAMPLE_RATE
+
+# 음성 인식 결과 캐시 경로와 최대 용량(MB)
+TRANSCRIPTION_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "transcriptions")
+TRANSCRIPTION_CACHE_MAX_MB = int(os.getenv("TRANSCRIPTION_CACHE_MB", "500"))
+# 저장 형식이 바뀌면 올려서 이전 결과를 무시
+TRANSCRIPTION_CACHE_VERSION = 1
+
+# 언어 감지에 사용할 최대 음성 구간 수
+LANGUAGE_DETECTION_SAMPLES = 3
+
+# 스트리밍 모드에서 VAD 없이 처리하거나 끝나지 않는 음성 구간을 자를 길이(초)
+MAX_STREAM_SEGMENT_SECONDS = 300
+# 스트리밍 모드에서 버퍼를 비울 때 구간 시작 앞에 남겨 둘 샘플 수
+STREAM_KEEP_MARGIN = 160
+
+# Whisper transcribe()와 동일한 품질 기준
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# VAD를 신뢰하는 디코딩(vad_trusted)에서 품질 기준을 통과하지 못한 창을 다시 디코딩할 온도.
+# Whisper transcribe()의 0.2~1.0 단계와 best_of 샘플링 대신 이 온도까지만 한 번씩 시도
+TRUSTED_FALLBACK_TEMPERATURES = (0.2, 0.4)
+# vad_trusted에서 창 길이(초)에 비례하여 제한하는 최대 토큰 수 (초당 토큰 수와 여유분)
+TRUSTED_TOKENS_PER_SECOND = 12
+TRUSTED_TOKEN_MARGIN = 16
+
+# 초안 모델(작은 모델)의 창 결과를 검증 모델(큰 모델)로 다시 인식할 기준.
+# 작은 모델은 틀려도 확신하는 경우가 많으므로 폴백 기준(LOGPROB_THRESHOLD 등)보다 엄격하게 설정
+ESCALATE_LOGPROB_THRESHOLD = -0.5
+ESCALATE_COMPRESSION_RATIO_THRESHOLD = 2.0
+
+
+def hash_bytes(data):
+    """바이트 데이터의 SHA-256 해시"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, chunk_size=8 * 1024 * 1024):
+    """파일 내용의 SHA-256 해시 (큰 파일도 조금씩 읽음)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptionCache(DiskCache):
+    """음성 인식 결과 디스크 캐시
+
+    원본 파일 내용의 해시와 인식 설정(모델, 정밀도, 언어, VAD 감도)을 키로
+    transcribe_segments()의 결과를 저장하므로, 자막 분할이나 LLM 설정만 바꿔
+    다시 실행할 때는 변환, VAD, Whisper 인식을 모두 건너뜁니다.
+    """
+
+    def __init__(self, directory=TRANSCRIPTION_CACHE_DIR, max_bytes=TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024):
+        super().__init__(directory, max_bytes)
+
+    def key(self, audio_hash, model_size, dtype, language, vad_aggressiveness, word_timestamps=False,
+            vad_trusted=False, draft_model=None):
+        """vad_aggressiveness는 VAD를 사용하지 않았으면 None, draft_model은 초안 모델 크기"""
+        parts = [TRANSCRIPTION_CACHE_VERSION, audio_hash, model_size, dtype, language, vad_aggressiveness]
+        if word_timestamps:
+            # 단어 타임스탬프가 없는 결과와 구분 (기존 캐시 키는 그대로 유지)
+            parts.append("words")
+        if vad_trusted:
+            parts.append("trusted")
+        if draft_model:
+            parts.append(f"draft:{draft_model}")
+        return hash_key(*parts)
+
+
+class BatchTranscriber:
+    """여러 VAD 구간을 30초 창으로 패딩하여 한 번에 디코딩하는 음성 인식기
+
+    30초 이내의 구간은 batch_size개씩 묶어 배치로 디코딩하고, 30초를 넘는
+    구간이나 품질 기준을 통과하지 못한 구간은 기존처럼 model.transcribe()로
+    개별 처리합니다. word_timestamps이면 세그먼트마다 "words"(단어, 시작, 끝, 확률)
+    목록을 추가합니다. 단어 시각은 디코딩에 사용한 멜 스펙트로그램으로 교차 어텐션
+    정렬을 한 번 더 계산하여 얻으므로 다시 음성 인식을 하지 않습니다.
+    threads(cpu_threads.ThreadLease)가 주어지면 배치마다 CPU 스레드 수를 현재 몫으로 맞춥니다.
+
+    vad_trusted이면 VAD가 음성이라고 판단한 구간을 믿고 더 가볍게 디코딩합니다. 멜 스펙트로그램과
+    인코더 입력(30초)은 기본 모드와 같고, 디코딩 단계만 줄입니다.
+    - 최대 토큰 수를 창 길이에 비례하여 제한 (반복 환각이 길게 이어지지 않음)
+    - 품질 기준을 통과하지 못한 창은 transcribe()의 온도 단계 대신 TRUSTED_FALLBACK_TEMPERATURES로만
+      모아서 다시 배치 디코딩하고, 그래도 반복되는 결과는 환각으로 보고 버림
+    - 30초를 넘는 구간도 이전 구간 텍스트를 조건으로 사용하지 않음
+    stats에는 디코딩한 창 수("windows"), 다시 디코딩한 창 수("fallbacks"), 버린 창 수("dropped"),
+    transcribe()로 처리한 구간 수("single"), 그중 30초를 넘는 구간 수("long_windows")를 누적합니다.
+
+    verifier(더 큰 모델의 BatchTranscriber)가 주어지면 이 객체의 모델은 초안 모델이 됩니다.
+    모든 창을 먼저 초안 모델로 인식하고, 평균 로그 확률이 escalate_logprob보다 낮거나 압축률이
+    escalate_compression_ratio보다 높은 창만 모아 verifier로 다시 인식합니다. 무음으로 판단한 창은
+    다시 인식하지 않습니다. 언어 감지는
+    verifier가 하며, 세그먼트에는 다시 인식했는지("escalated")가 표시되고 stats에는 다시 인식한
+    창 수("escalated")와 길이("escalated_seconds")가 누적됩니다.
+    """
+
+    def __init__(self, model, batch_size=8, fp16=False, word_timestamps=False, threads=None, vad_trusted=False,
+                 verifier=None, escalate_logprob=ESCALATE_LOGPROB_THRESHOLD,
+                 escalate_compression_ratio=ESCALATE_COMPRESSION_RATIO_THRESHOLD):
+        self.model = model
+        self.batch_size = max(1, int(batch_size))
+        self.fp16 = fp16
+        self.word_timestamps = word_timestamps
+        self.threads = threads
+        self.vad_trusted = vad_trusted
+        self.verifier = verifier
+        self.escalate_logprob = escalate_logprob
+        self.escalate_compression_ratio = escalate_compression_ratio
+        self.stats = collections.Counter()
+
+    def _tokenizer(self, language):
+        return get_tokenizer(
+            self.model.is_multilingual,
+            num_languages=self.model.num_languages,
+            language=language,
+            task="transcribe",
+        )
+
+    def _slice(self, audio, start, end, sample_rate, max_samples=None):
+        """구간 오디오를 float32로 잘라냄 (int16 PCM이면 구간만 변환)"""
+        start_sample = int(start * sample_rate)
+        end_sample = min(int(end * sample_rate), len(audio))
+        if max_samples is not None:
+            end_sample = min(end_sample, start_sample + max_samples)
+        segment_audio = audio[start_sample:end_sample]
+        if segment_audio.dtype == np.int16:
+            return segment_audio.astype(np.float32) / 32768.0
+        return np.ascontiguousarray(segment_audio, dtype=np.float32)
+
+    def _mel(self, segment_audio):
+        """구간 오디오를 30초 길이의 로그 멜 스펙트로그램으로 변환"""
+        mel = whisper.log_mel_spectrogram(segment_audio, self.model.dims.n_mels, padding=N_SAMPLES)
+        return whisper.pad_or_trim(mel, N_FRAMES)
+
+    def detect_language(self, audio, voice_segments, sample_rate=SAMPLE_RATE, num_samples=LANGUAGE_DETECTION_SAMPLES):
+        """가장 긴 음성 구간 몇 개로 파일 전체의 언어를 한 번만 감지
+
+        (언어 코드, 확률)을 반환합니다. 확률은 표본 구간들의 언어 확률 평균입니다.
+        """
+        if self.verifier is not None:
+            # 몇 개 창만 사용하므로 정확한 검증 모델로 감지
+            return self.verifier.detect_language(audio, voice_segments, sample_rate, num_samples)
+        if not self.model.is_multilingual:
+            return "en", 1.0
+
+        longest = sorted(voice_segments, key=lambda seg: seg[1] - seg[0], reverse=True)[:num_samples]
+        mels = []
+        for start, end in longest:
+            segment_audio = self._slice(audio, start, end, sample_rate, N_SAMPLES)
+            if len(segment_audio) > 0:
+                mels.append(self._mel(segment_audio))
+        if not mels:
+            return None, 0.0
+
+        mels = torch.stack(mels).to(self.model.device)
+        if self.fp16:
+            mels = mels.half()
+
+        with torch.no_grad():
+            _, probs = self.model.detect_language(mels)
+
+        totals = {}
+        for sample_probs in probs:
+            for code, prob in sample_probs.items():
+                totals[code] = totals.get(code, 0.0) + prob
+        language = max(totals, key=totals.get)
+        return language, totals[language] / len(probs)
+
+    def _parse_tokens(self, tokenizer, tokens, duration):
+        """타임스탬프 토큰을 기준으로 디코딩 결과를 세부 구간으로 분리
+
+        (시작, 끝, 텍스트, 토큰 목록)을 반환합니다.
+        """
+        tokens = [t for t in tokens if t < tokenizer.eot or t >= tokenizer.timestamp_begin]
+        if not tokens:
+            return []
+
+        def text_of(sliced):
+            return tokenizer.decode([t for t in sliced if t < tokenizer.eot]).strip()
+
+        def time_of(token):
+            return min((token - tokenizer.timestamp_begin) * TIME_PRECISION, duration)
+
+        is_timestamp = [t >= tokenizer.timestamp_begin for t in tokens]
+        consecutive = [i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]]
+
+        pieces = []
+        if consecutive:
+            last_slice = 0
+            for current_slice in consecutive:
+                sliced = tokens[last_slice:current_slice]
+                pieces.append((time_of(sliced[0]), time_of(sliced[-1]), text_of(sliced), sliced))
+                last_slice = current_slice
+
+            # 남은 텍스트는 타임스탬프 하나로 끝나면 그 시각까지(Whisper transcribe()와 같음),
+            # 끝 타임스탬프가 없으면 구간 끝까지로 처리
+            remainder = tokens[last_slice:]
+            if any(not ts for ts in is_timestamp[last_slice:]):
+                start = time_of(remainder[0]) if is_timestamp[last_slice] else pieces[-1][1]
+                end = time_of(remainder[-1]) if is_timestamp[-1] else duration
+                pieces.append((start, max(start, end), text_of(remainder), remainder))
+        else:
+            end = duration
+            timestamps = [t for t in tokens if t >= tokenizer.timestamp_begin]
+            if timestamps and timestamps[-1] != tokenizer.timestamp_begin:
+                end = time_of(timestamps[-1])
+            pieces.append((0.0, end, text_of(tokens), tokens))
+
+        return [piece for piece in pieces if piece[2]]
+
+    def _align_words(self, tokenizer, mel, duration, pieces):
+        """디코딩한 토큰과 멜 스펙트로그램으로 세부 구간별 단어 시각 계산 (구간 안 상대 시각)
+
+        whisper.timing.add_word_timestamps()가 세부 구간의 시작/끝도 단어 시각에 맞춰
+        조정하므로, 조정된 (시작, 끝, 단어 목록)을 반환합니다.
+        """
+        segments = [
+            {"seek": 0, "start": start, "end": end, "tokens": [t for t in tokens if t < tokenizer.eot]}
+            for start, end, _, tokens in pieces
+        ]
+        add_word_timestamps(
+            segments=segments, model=self.model, tokenizer=tokenizer, mel=mel,
+            num_frames=min(int(duration * SAMPLE_RATE / HOP_LENGTH), N_FRAMES), last_speech_timestamp=0.0,
+        )
+        return [
+            (float(segment["start"]), float(segment["end"]), [
+                {"word": word["word"], "start": float(word["start"]), "end": float(word["end"]),
+                 "probability": round(float(word["probability"]), 3)}
+                for word in segment["words"]
+            ])
+            for segment in segments
+        ]
+
+    def _needs_fallback(self, result):
+        if result.compression_ratio > COMPRESSION_RATIO_THRESHOLD:
+            return True
+        return result.avg_logprob < LOGPROB_THRESHOLD
+
+    def _is_silence(self, result):
+        return result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+
+    def _needs_escalation(self, avg_logprob, compression_ratio):
+        """초안 모델 결과를 검증 모델로 다시 인식해야 하는지 여부"""
+        return avg_logprob < self.escalate_logprob or compression_ratio > self.escalate_compression_ratio
+
+    def _mark_escalated(self, outputs, escalated):
+        for segment in outputs:
+            segment["escalated"] = escalated
+        return outputs
+
+    def _transcribe_single(self, segment_audio, offset, language):
+        """model.transcribe()를 사용한 개별 구간 처리"""
+        if self.threads is not None:
+            self.threads.apply()
+        self.stats["single"] += 1
+        transcribe_options = {"fp16": self.fp16}
+        if language:
+            transcribe_options["language"] = language
+        if self.vad_trusted:
+            transcribe_options["temperature"] = (0.0,) + TRUSTED_FALLBACK_TEMPERATURES
+            transcribe_options["condition_on_previous_text"] = False
+
+        if self.word_timestamps:
+            transcribe_options["word_timestamps"] = True
+
+        result = self.model.transcribe(segment_audio, **transcribe_options)
+        outputs = []
+        for segment in result["segments"]:
+            output = {
+                "start": offset + segment["start"],
+                "end": offset + segment["end"],
+                "text": segment["text"].strip(),
+                "avg_logprob": segment.get("avg_logprob"),
+                "compression_ratio": segment.get("compression_ratio"),
+                "no_speech_prob": segment.get("no_speech_prob"),
+            }
+            if self.word_timestamps:
+                output["words"] = [
+                    {"word": word["word"], "start": offset + word["start"], "end": offset + word["end"],
+                     "probability": round(word["probability"], 3)}
+                    for word in segment.get("words", [])
+                ]
+            outputs.append(output)
+        return outputs
+
+    def _transcribe_long(self, segment_audio, offset, language):
+        """30초를 넘는 구간 처리 (초안 모델이면 신뢰도가 낮을 때 구간 전체를 검증 모델로 다시 인식)"""
+        self.stats["long_windows"] += 1
+        outputs = self._transcribe_single(segment_audio, offset, language)
+        if self.verifier is None:
+            return outputs
+        # 신뢰도가 낮은 세그먼트가 있으면 다시 인식 (아무것도 인식하지 못한 무음 구간은 그대로 둠)
+        if any(self._needs_escalation(output["avg_logprob"], output["compression_ratio"]) for output in outputs):
+            self.stats["escalated"] += 1
+            self.stats["escalated_seconds"] += len(segment_audio) / SAMPLE_RATE
+            return self._mark_escalated(self.verifier._transcribe_long(segment_audio, offset, language), True)
+        return self._mark_escalated(outputs, False)
+
+    def _decode_batch(self, batch, language):
+        """배치 단위 디코딩, 구간별 결과 목록 반환"""
+        if self.threads is not None:
+            self.threads.apply()
+        mels = torch.stack([self._mel(segment_audio) for segment_audio, _, _ in batch])
+        mels = mels.to(self.model.device)
+        sample_len = None
+        if self.vad_trusted:
+            longest = max(duration for _, _, duration in batch)
+            sample_len = min(self.model.dims.n_text_ctx // 2,
+                             int(longest * TRUSTED_TOKENS_PER_SECOND) + TRUSTED_TOKEN_MARGIN)
+        options = DecodingOptions(language=language, temperature=0.0, fp16=self.fp16, sample_len=sample_len)
+
+        with torch.no_grad():
+            results = whisper.decode(self.model, mels, options)
+        self.stats["windows"] += len(batch)
+
+        verified = {}
+        if self.verifier is not None:
+            # 기준에 못 미치는 창만 모아 검증 모델로 한 번에 배치 인식 (초안 모델의 폴백 단계는 건너뜀).
+            # 무음으로 판단한 창은 로그 확률이 낮아도 버릴 창이므로 다시 인식하지 않음
+            escalated = [i for i, result in enumerate(results)
+                         if not self._is_silence(result)
+                         and self._needs_escalation(result.avg_logprob, result.compression_ratio)]
+            if escalated:
+                self.stats["escalated"] += len(escalated)
+                self.stats["escalated_seconds"] += sum(batch[i][2] for i in escalated)
+                verified = dict(zip(escalated, self.verifier._decode_batch([batch[i] for i in escalated], language)))
+        elif self.vad_trusted:
+            results = self._fallback_decode(mels, results, language, sample_len)
+
+        outputs = []
+        for index, ((segment_audio, offset, duration), result, mel) in enumerate(zip(batch, results, mels)):
+            if index in verified:
+                outputs.append(self._mark_escalated(verified[index], True))
+                continue
+            if self._is_silence(result):
+                outputs.append([])
+                continue
+            if self._needs_fallback(result):
+                if not self.vad_trusted:
+                    # 반복되거나 신뢰도가 낮은 결과는 온도 폴백이 있는 transcribe()로 재처리
+                    segments = self._transcribe_single(segment_audio, offset, language)
+                    if self.verifier is not None:
+                        self._mark_escalated(segments, False)
+                    outputs.append(segments)
+                    continue
+                if result.compression_ratio > COMPRESSION_RATIO_THRESHOLD:
+                    # 폴백 온도를 모두 써도 같은 말이 반복되면 환각으로 보고 LLM에 보내지 않음
+                    self.stats["dropped"] += 1
+                    outputs.append([])
+                    continue
+
+            tokenizer = self._tokenizer(result.language or language)
+            pieces = self._parse_tokens(tokenizer, result.tokens, duration)
+            if self.word_timestamps and pieces:
+                aligned = self._align_words(tokenizer, mel.half() if self.fp16 else mel, duration, pieces)
+            else:
+                aligned = [(start, end, None) for start, end, _, _ in pieces]
+            segments = []
+            for (_, _, text, _), (start, end, words) in zip(pieces, aligned):
+                segment = {
+                    "start": offset + start,
+                    "end": offset + end,
+                    "text": text,
+                    "avg_logprob": result.avg_logprob,
+                    "compression_ratio": result.compression_ratio,
+                    "no_speech_prob": result.no_speech_prob,
+                }
+                if words is not None:
+                    segment["words"] = [
+                        dict(word, start=offset + word["start"], end=offset + word["end"]) for word in words
+                    ]
+                segments.append(segment)
+            if self.verifier is not None:
+                self._mark_escalated(segments, False)
+            outputs.append(segments)
+        return outputs
+
+    def _fallback_decode(self, mels, results, language, sample_len):
+        """품질 기준을 통과하지 못한 창만 모아 TRUSTED_FALLBACK_TEMPERATURES로 다시 배치 디코딩"""
+        results = list(results)
+        for temperature in TRUSTED_FALLBACK_TEMPERATURES:
+            failed = [i for i, result in enumerate(results)
+                      if not self._is_silence(result) and self._needs_fallback(result)]
+            if not failed:
+                break
+            self.stats["fallbacks"] += len(failed)
+            options = DecodingOptions(language=language, temperature=temperature, fp16=self.fp16,
+                                      sample_len=sample_len)
+            with torch.no_grad():
+                retried = whisper.decode(self.model, mels[failed], options)
+            for i, result in zip(failed, retried):
+                results[i] = result
+        return results
+
+    def escalation_summary(self):
+        """초안 모델로 인식한 창 수와 검증 모델로 다시 인식한 창 수/길이/비율 (verifier가 없으면 None)"""
+        if self.verifier is None:
+            return None
+        windows = self.stats["windows"] + self.stats["long_windows"]
+        return {
+            "windows": windows,
+            "escalated": self.stats["escalated"],
+            "escalated_seconds": round(self.stats["escalated_seconds"], 3),
+            "escalated_ratio": round(self.stats["escalated"] / windows, 4) if windows else 0.0,
+        }
+
+    def _result(self, segments, language, language_probability):
+        result = {
+            "segments": segments,
+            "language": language,
+            "language_probability": language_probability,
+        }
+        if self.verifier is not None:
+            result["escalation"] = self.escalation_summary()
+        return result
+
+    def transcribe_segments(self, audio, voice_segments, sample_rate=SAMPLE_RATE, language=None, progress_callback=None,
+                            segment_callback=None, checkpoint=None):
+        """VAD 구간 목록을 인식하여 결과를 반환
+
+        audio는 16kHz float32 배열 또는 int16 PCM 배열이며, int16이면 구간별로만
+        float32로 변환하므로 파일 전체를 float로 복사하지 않습니다. 반환값은 Whisper transcribe()와 같은 형태의
+        딕셔너리로, "segments"의 start/end는 전체 오디오 기준 초 단위이며
+        "language"/"language_probability"에 사용한 언어와 감지 확률이 담깁니다.
+        verifier가 있으면 "escalation"에 escalation_summary()의 검증 모델 재인식 통계가 담깁니다.
+        progress_callback(인식을 마친 음성 길이(초), 전체 음성 길이(초))가 주어지면 진행 상황을
+        알립니다. 구간 수 대신 음성 길이를 사용하므로 구간 길이가 제각각이어도 진행률이 처리량을 따라갑니다.
+        segment_callback(세그먼트 목록)이 주어지면 앞 구간부터 순서대로 인식이 끝나는 즉시
+        새 세그먼트를 넘겨주므로, 전체 인식이 끝나기 전에 다음 단계를 시작할 수 있습니다.
+        checkpoint(jobs.JobCheckpoint)가 주어지면 이미 완료된 구간은 건너뛰고, 새로 완료된
+        구간의 결과를 바로 저장합니다.
+        """
+        language_probability = 1.0
+        saved_language, saved_probability = checkpoint.language if checkpoint is not None else (None, None)
+        if saved_language and (not language or language == saved_language):
+            # 중단된 작업에서 감지했던 언어를 그대로 사용
+            language, language_probability = saved_language, saved_probability
+        else:
+            if not language:
+                # 구간마다 언어를 다시 감지하지 않도록 파일 단위로 한 번만 감지
+                language, language_probability = self.detect_language(audio, voice_segments, sample_rate)
+            if checkpoint is not None:
+                checkpoint.save_language(language, language_probability)
+
+        total = len(voice_segments)
+        results = [None] * total
+        durations = [end - start for start, end in voice_segments]
+        total_seconds = sum(durations)
+        done = 0
+        done_seconds = 0.0
+        if checkpoint is not None:
+            for index, segments in checkpoint.completed_segments().items():
+                if index < total:
+                    results[index] = segments
+                    done += 1
+                    done_seconds += durations[index]
+        emitted = 0
+        batch = []
+        batch_indices = []
+
+        def emit():
+            # 앞 구간이 모두 끝난 구간까지만 순서대로 전달
+            nonlocal emitted
+            while emitted < total and results[emitted] is not None:
+                if segment_callback and results[emitted]:
+                    segment_callback(results[emitted])
+                emitted += 1
+
+        def flush():
+            nonlocal done, done_seconds
+            if not batch:
+                return
+            for index, segments in zip(batch_indices, self._decode_batch(batch, language)):
+                results[index] = segments
+                if checkpoint is not None:
+                    checkpoint.save_segment(index, segments)
+                done_seconds += durations[index]
+            done += len(batch)
+            batch.clear()
+            batch_indices.clear()
+            if progress_callback:
+                progress_callback(done_seconds, total_seconds)
+            emit()
+
+        if done:
+            # 이전 작업에서 완료된 구간 결과를 먼저 전달
+            if progress_callback:
+                progress_callback(done_seconds, total_seconds)
+            emit()
+
+        for i, (start, end) in enumerate(voice_segments):
+            if results[i] is not None:
+                continue
+            segment_audio = self._slice(audio, start, end, sample_rate)
+            if len(segment_audio) == 0:
+                results[i] = []
+                if checkpoint is not None:
+                    checkpoint.save_segment(i, [])
+                done += 1
+                done_seconds += durations[i]
+                continue
+
+            if len(segment_audio) > N_SAMPLES:
+                # 30초를 넘는 구간은 Whisper의 창 이동 처리에 맡김
+                results[i] = self._transcribe_long(segment_audio, start, language)
+                if checkpoint is not None:
+                    checkpoint.save_segment(i, results[i])
+                done += 1
+                done_seconds += durations[i]
+                if progress_callback:
+                    progress_callback(done_seconds, total_seconds)
+                emit()
+                continue
+
+            batch.append((segment_audio, start, len(segment_audio) / sample_rate))
+            batch_indices.append(i)
+            if len(batch) >= self.batch_size:
+                flush()
+        flush()
+        emit()
+
+        all_segments = []
+        for segments in results:
+            all_segments.extend(segments or [])
+        return self._result(all_segments, language, language_probability)
+
+    def transcribe_stream(self, chunks, sample_rate=SAMPLE_RATE, language=None, vad=None,
+                          progress_callback=None, segment_callback=None):
+        """PCM 조각을 차례로 받아 음성 구간이 끝나는 대로 인식하는 스트리밍 모드
+
+        chunks는 int16 PCM 배열을 차례로 반환하는 반복 가능 객체(audio_io.stream_audio)이고,
+        vad는 vad.StreamingVAD 객체입니다(None이면 MAX_STREAM_SEGMENT_SECONDS 길이로 자름).
+        VAD 구간은 vad.pack_segments()로 인식 창 단위로 묶고 나눈 뒤 인식합니다.
+        아직 인식하지 않은 구간에 필요한 오디오만 보관하므로 입력 길이와 관계없이 메모리
+        사용량이 거의 일정합니다. 언어를 지정하지 않으면 처음 인식하는 구간들로 한 번만
+        감지합니다. progress_callback(처리한 오디오 길이(초))로 진행 상황을 알리며,
+        segment_callback과 반환값은 transcribe_segments()와 같습니다.
+        """
+        buffer = np.empty(0, dtype=np.int16)
+        buffer_start = 0
+        received = 0
+        next_start = 0.0
+        pending = []
+        all_segments = []
+        language_probability = 1.0
+
+        def transcribe_pending():
+            nonlocal language, language_probability
+            offset = buffer_start / sample_rate
+            relative = [(start - offset, end - offset) for start, end in pending]
+            if vad is not None:
+                relative = pack_segments(relative, buffer, sample_rate)
+            if not language:
+                language, language_probability = self.detect_language(buffer, relative, sample_rate)
+            result = self.transcribe_segments(buffer, relative, sample_rate, language)
+            segments = []
+            for segment in result["segments"]:
+                segment["start"] += offset
+                segment["end"] += offset
+                for word in segment.get("words", ()):
+                    word["start"] += offset
+                    word["end"] += offset
+                segments.append(segment)
+            pending.clear()
+            all_segments.extend(segments)
+            if segment_callback and segments:
+                segment_callback(segments)
+
+        for chunk in chunks:
+            buffer = np.concatenate([buffer, chunk]) if len(buffer) else chunk
+            received += len(chunk)
+            if vad is not None:
+                pending.extend(vad.feed(chunk))
+            else:
+                while received / sample_rate - next_start >= MAX_STREAM_SEGMENT_SECONDS:
+                    pending.append((next_start, next_start + MAX_STREAM_SEGMENT_SECONDS))
+                    next_start += MAX_STREAM_SEGMENT_SECONDS
+
+            # 묶은 창 수로 배치가 찼는지 판단 (긴 구간을 나누면 창은 더 늘어남)
+            if pending and (vad is None or len(merge_short_segments(pending)) >= self.batch_size):
+                transcribe_pending()
+                # 앞으로 인식할 구간이 시작될 수 있는 위치 이전의 오디오는 버림
+                # (시각→샘플 변환 오차에 대비해 조금 남김)
+                keep_from = vad.earliest_pending_time() if vad is not None else next_start
+                drop = int(keep_from * sample_rate) - STREAM_KEEP_MARGIN - buffer_start
+                if drop > 0:
+                    buffer = buffer[drop:].copy()
+                    buffer_start += drop
+
+            if progress_callback:
+                progress_callback(received / sample_rate)
+
+        if vad is not None:
+            pending.extend(vad.flush())
+        elif received / sample_rate > next_start:
+            pending.append((next_start, received / sample_rate))
+        if pending:
+            transcribe_pending()
+
+        return self._result(all_segments, language, language_probability)
@@ -0,0 +1,352 @@
+import os
+import collections
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+# 프레임 길이(ms)와 음성 시작/종료 판단에 사용하는 패딩 창 길이(ms)
+FRAME_DURATION_MS = 30
+PADDING_DURATION_MS = 2000
+# 패딩 창에서 음성(또는 무음) 프레임이 이 비율을 넘으면 상태 전환
+TRIGGER_RATIO = 0.9
+
+# 병렬 VAD의 청크 길이(초)와, 청크 앞에 덧붙여 VAD 내부 상태를 맞추는 구간 길이(초)
+PARALLEL_CHUNK_SECONDS = 300
+PARALLEL_WARMUP_SECONDS = 30
+# 기본 VAD 작업 프로세스 수. 환경 변수 VAD_WORKERS로 변경 가능 (1이면 단일 프로세스)
+DEFAULT_VAD_WORKERS = int(os.getenv("VAD_WORKERS", "1"))
+
+# 음성 구간을 묶은 인식 창의 최대 길이(초). Whisper 창(30초) 끝에 걸친 말이 잘리지 않도록 여유를 둠
+PACK_TARGET_SECONDS = 28.0
+# 이보다 짧은 무음을 사이에 둔 음성 구간만 한 창으로 묶음(초)
+PACK_MAX_GAP_SECONDS = 3.0
+# 긴 음성 구간을 나눌 때 창 끝에서 가장 조용한 지점을 찾는 범위(초)
+PACK_SPLIT_SEARCH_SECONDS = 6.0
+
+
+def _as_pcm_array(pcm):
+    """bytes/메모리뷰/배열을 복사 없이 int16 배열로 변환"""
+    if isinstance(pcm, np.ndarray):
+        return pcm if pcm.dtype == np.int16 else pcm.astype(np.int16)
+    return np.frombuffer(memoryview(pcm).cast('B'), dtype=np.int16)
+
+
+def frame_size(sample_rate, frame_duration_ms):
+    """프레임 하나의 샘플 수"""
+    return int(sample_rate * (frame_duration_ms / 1000.0) * 2) // 2
+
+
+def frame_count(num_samples, frame_samples):
+    """기존 frame_generator와 같은 프레임 수 (마지막 한 프레임은 끝까지 꽉 차도 제외)"""
+    return max(0, (num_samples - 1) // frame_samples)
+
+
+def frame_timestamps(num_frames, frame_duration):
+    """프레임 시작 시각 배열
+
+    기존 구현처럼 시각을 누적 덧셈으로 계산하여 결과가 비트 단위로 같도록 합니다.
+    """
+    timestamps = np.zeros(num_frames, dtype=np.float64)
+    if num_frames > 1:
+        timestamps[1:] = np.cumsum(np.full(num_frames - 1, frame_duration))
+    return timestamps
+
+
+def speech_flags(pcm, sample_rate, aggressiveness=1, frame_duration_ms=FRAME_DURATION_MS):
+    """프레임별 음성 여부를 bool 배열로 계산
+
+    Frame 객체나 bytes 조각을 만들지 않고 PCM 버퍼의 메모리뷰를 그대로 전달합니다.
+    """
+    pcm = _as_pcm_array(pcm)
+    frame_samples = frame_size(sample_rate, frame_duration_ms)
+    num_frames = frame_count(len(pcm), frame_samples)
+    flags = np.zeros(num_frames, dtype=np.bool_)
+    if num_frames == 0:
+        return flags
+
+    _fill_flags(flags, pcm, frame_samples, sample_rate, aggressiveness)
+    return flags
+
+
+def _fill_flags(flags, pcm, frame_samples, sample_rate, aggressiveness):
+    """pcm의 앞에서부터 len(flags)개 프레임의 음성 여부를 flags에 기록"""
+    vad = webrtcvad.Vad(aggressiveness)
+    frames = memoryview(np.ascontiguousarray(pcm[:len(flags) * frame_samples])).cast('B')
+    frame_bytes = frame_samples * 2
+    for i in range(len(flags)):
+        flags[i] = vad.is_speech(frames[i * frame_bytes:(i + 1) * frame_bytes], sample_rate)
+
+
+def _chunk_flags(pcm_bytes, num_frames, skip_frames, frame_samples, sample_rate, aggressiveness):
+    """작업 프로세스에서 실행. 앞의 skip_frames개(준비 구간)를 버린 플래그 반환"""
+    pcm = np.frombuffer(pcm_bytes, dtype=np.int16)
+    flags = np.zeros(num_frames, dtype=np.bool_)
+    _fill_flags(flags, pcm, frame_samples, sample_rate, aggressiveness)
+    return flags[skip_frames:]
+
+
+def speech_flags_parallel(pcm, sample_rate, aggressiveness=1, frame_duration_ms=FRAME_DURATION_MS,
+                          workers=None, chunk_seconds=PARALLEL_CHUNK_SECONDS,
+                          warmup_seconds=PARALLEL_WARMUP_SECONDS):
+    """PCM을 겹치는 청크로 나누어 여러 프로세스에서 음성 여부를 계산
+
+    webrtcvad는 이전 프레임으로 잡음 수준을 추정하므로, 각 청크 앞에
+    warmup_seconds만큼 이전 오디오를 덧붙여 처리한 뒤 그 부분의 결과는 버립니다.
+    청크 결과를 프레임 순서대로 이어 붙인 배열을 반환하며, 구간 분할은 이어 붙인
+    배열 전체에 대해 한 번 수행하므로 청크 경계에 걸친 구간도 그대로 이어집니다.
+    """
+    pcm = _as_pcm_array(pcm)
+    workers = workers or os.cpu_count() or 1
+    frame_samples = frame_size(sample_rate, frame_duration_ms)
+    num_frames = frame_count(len(pcm), frame_samples)
+    chunk_frames = max(1, int(chunk_seconds * 1000 / frame_duration_ms))
+    warmup_frames = int(warmup_seconds * 1000 / frame_duration_ms)
+
+    if workers <= 1 or num_frames <= chunk_frames:
+        return speech_flags(pcm, sample_rate, aggressiveness, frame_duration_ms)
+
+    jobs = []
+    for start in range(0, num_frames, chunk_frames):
+        end = min(start + chunk_frames, num_frames)
+        begin = max(0, start - warmup_frames)
+        pcm_bytes = pcm[begin * frame_samples:end * frame_samples].tobytes()
+        jobs.append((pcm_bytes, end - begin, start - begin, frame_samples, sample_rate, aggressiveness))
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        results = list(executor.map(_chunk_flags, *zip(*jobs)))
+    return np.concatenate(results)
+
+
+def collect_segments(flags, padding_frames):
+    """음성 플래그에서 (시작 프레임, 끝 프레임) 목록을 계산
+
+    기존 vad_collector와 같은 규칙입니다. 비활성 상태에서는 최근 padding_frames개
+    프레임 중 음성이 90%를 넘으면 창의 첫 프레임부터 구간을 시작하고, 활성
+    상태에서는 무음이 90%를 넘는 프레임에서 구간을 끝냅니다. 상태가 바뀔 때마다
+    창을 비우므로, 누적 합과 조건을 만족하는 위치 목록으로 다음 전환 지점을
+    찾아 프레임 하나씩 창을 다시 세지 않습니다. 끝 프레임은 구간에 포함됩니다.
+    """
+    num_frames = len(flags)
+    if num_frames == 0 or padding_frames <= 0:
+        return []
+
+    threshold = TRIGGER_RATIO * padding_frames
+    cumulative = np.zeros(num_frames + 1, dtype=np.int64)
+    np.cumsum(flags, out=cumulative[1:])
+
+    # 창이 가득 찬 위치(i >= padding_frames - 1)에서 조건을 만족하는 프레임
+    voiced_full = cumulative[padding_frames:] - cumulative[:-padding_frames]
+    voiced_hits = np.flatnonzero(voiced_full > threshold) + padding_frames - 1
+    unvoiced_hits = np.flatnonzero(padding_frames - voiced_full > threshold) + padding_frames - 1
+
+    def find_transition(start, full_hits, voiced):
+        """창을 비운 뒤 start 프레임부터 처음으로 조건을 만족하는 프레임"""
+        # 창이 아직 덜 찬 구간은 start부터의 개수로 직접 계산
+        partial_end = min(start + padding_frames - 1, num_frames)
+        if partial_end > start:
+            counts = cumulative[start + 1:partial_end + 1] - cumulative[start]
+            if not voiced:
+                counts = np.arange(1, partial_end - start + 1) - counts
+            hits = np.flatnonzero(counts > threshold)
+            if len(hits):
+                return start + int(hits[0])
+        index = np.searchsorted(full_hits, start + padding_frames - 1)
+        return int(full_hits[index]) if index < len(full_hits) else None
+
+    segments = []
+    position = 0
+    while position < num_frames:
+        trigger = find_transition(position, voiced_hits, True)
+        if trigger is None:
+            break
+        start = max(position, trigger - padding_frames + 1)
+        release = find_transition(trigger + 1, unvoiced_hits, False)
+        if release is None:
+            segments.append((start, num_frames - 1))
+            break
+        segments.append((start, release))
+        position = release + 1
+    return segments
+
+
+def detect_voice_segments(pcm, sample_rate, aggressiveness=1, workers=1,
+                          frame_duration_ms=FRAME_DURATION_MS, padding_duration_ms=PADDING_DURATION_MS):
+    """PCM 버퍼에서 음성 구간 (시작, 끝) 초 단위 목록 반환
+
+    workers가 2 이상(None이면 CPU 수)이면 긴 오디오의 VAD를 여러 프로세스에서 병렬로 수행합니다.
+    """
+    if workers == 1:
+        flags = speech_flags(pcm, sample_rate, aggressiveness, frame_duration_ms)
+    else:
+        flags = speech_flags_parallel(pcm, sample_rate, aggressiveness, frame_duration_ms, workers)
+    frame_duration = (float(frame_size(sample_rate, frame_duration_ms) * 2) / sample_rate) / 2.0
+    padding_frames = int(padding_duration_ms / frame_duration_ms)
+
+    timestamps = frame_timestamps(len(flags), frame_duration)
+    return [
+        (float(timestamps[start]), float(timestamps[end] + frame_duration))
+        for start, end in collect_segments(flags, padding_frames)
+    ]
+
+
+def _quietest_frame(pcm, start_sample, end_sample, frame_samples):
+    """start_sample~end_sample 범위에서 에너지가 가장 작은 프레임의 시작 샘플"""
+    num_frames = (end_sample - start_sample) // frame_samples
+    if num_frames <= 0:
+        return end_sample
+    frames = pcm[start_sample:start_sample + num_frames * frame_samples].astype(np.float32)
+    energy = np.square(frames).reshape(num_frames, frame_samples).sum(axis=1)
+    # 같은 에너지면 창 끝에 가까운 지점 (창을 최대한 채움)
+    index = num_frames - 1 - int(np.argmin(energy[::-1]))
+    return start_sample + index * frame_samples
+
+
+def split_long_segments(segments, pcm, sample_rate, max_seconds=PACK_TARGET_SECONDS,
+                        search_seconds=PACK_SPLIT_SEARCH_SECONDS, frame_duration_ms=FRAME_DURATION_MS):
+    """max_seconds보다 긴 구간을 창 끝 search_seconds 범위에서 가장 조용한 지점마다 나눔
+
+    나눈 조각은 빈틈없이 이어지므로 원래 구간의 오디오를 그대로 덮습니다. pcm이 None이면
+    에너지 대신 max_seconds 길이마다 자릅니다.
+    """
+    pcm = _as_pcm_array(pcm) if pcm is not None else None
+    frame_samples = frame_size(sample_rate, frame_duration_ms)
+    search_seconds = min(search_seconds, max_seconds / 2)
+    result = []
+    for start, end in segments:
+        cursor = start
+        while end - cursor > max_seconds:
+            cut = cursor + max_seconds
+            if pcm is not None:
+                search_start = int((cut - search_seconds) * sample_rate)
+                quietest = _quietest_frame(pcm, search_start, min(int(cut * sample_rate), len(pcm)), frame_samples)
+                # 프레임 가운데에서 자르고, 창 길이를 넘지 않도록 제한
+                cut = min((quietest + frame_samples // 2) / sample_rate, cut)
+            result.append((cursor, cut))
+            cursor = cut
+        result.append((cursor, end))
+    return result
+
+
+def merge_short_segments(segments, max_seconds=PACK_TARGET_SECONDS, max_gap_seconds=PACK_MAX_GAP_SECONDS):
+    """사이 무음이 max_gap_seconds 이하인 이웃 구간을 max_seconds 길이까지 한 창으로 묶음
+
+    묶은 창은 첫 구간의 시작부터 마지막 구간의 끝까지이며 사이의 무음도 포함합니다.
+    """
+    merged = []
+    for start, end in segments:
+        if merged and start - merged[-1][1] <= max_gap_seconds and end - merged[-1][0] <= max_seconds:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def pack_segments(segments, pcm, sample_rate, max_seconds=PACK_TARGET_SECONDS,
+                  max_gap_seconds=PACK_MAX_GAP_SECONDS, search_seconds=PACK_SPLIT_SEARCH_SECONDS):
+    """VAD 음성 구간을 Whisper 인식 창 단위로 다시 묶음
+
+    짧은 구간마다 30초 멜 창 하나를 쓰거나 긴 구간을 창 이동 방식으로 따로 인식하지 않도록,
+    긴 구간은 가장 조용한 지점에서 max_seconds 이하로 나누고 가까운 짧은 구간들은 한 창으로
+    묶습니다. 창은 원래 오디오의 연속된 범위이므로 인식 결과의 시각은 창 시작 시각을 더하면
+    그대로 전체 오디오 기준 시각이 됩니다.
+    """
+    pieces = split_long_segments(segments, pcm, sample_rate, max_seconds, search_seconds)
+    return merge_short_segments(pieces, max_seconds, max_gap_seconds)
+
+
+class StreamingVAD:
+    """PCM을 조각 단위로 받아 끝난 음성 구간을 차례로 반환하는 VAD
+
+    detect_voice_segments()와 같은 규칙으로 구간을 나누지만 오디오 전체나 프레임
+    플래그 배열을 보관하지 않으므로, 긴 입력도 일정한 메모리로 처리합니다.
+    max_segment_seconds를 지정하면 그보다 긴 음성 구간은 그 길이마다 잘라서 반환합니다.
+    """
+
+    def __init__(self, sample_rate, aggressiveness=1, frame_duration_ms=FRAME_DURATION_MS,
+                 padding_duration_ms=PADDING_DURATION_MS, max_segment_seconds=None):
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.frame_samples = frame_size(sample_rate, frame_duration_ms)
+        self.frame_duration = (float(self.frame_samples * 2) / sample_rate) / 2.0
+        self.padding_frames = int(padding_duration_ms / frame_duration_ms)
+        self.max_segment_seconds = max_segment_seconds
+
+        self._pending = np.empty(0, dtype=np.int16)
+        self._timestamp = 0.0
+        self._ring = collections.deque()
+        self._ring_voiced = 0
+        self._triggered = False
+        self._segment_start = None
+        self._segment_end = None
+
+    def earliest_pending_time(self):
+        """앞으로 반환될 구간이 시작될 수 있는 가장 이른 시각(초). 이전 오디오는 버려도 됨"""
+        if self._triggered:
+            return self._segment_start
+        if self._ring:
+            return self._ring[0][0]
+        return self._timestamp
+
+    def _push(self, timestamp, is_speech):
+        # 창 크기를 넘으면 가장 오래된 프레임을 빼면서 음성 프레임 수를 갱신
+        if len(self._ring) == self.padding_frames:
+            self._ring_voiced -= self._ring.popleft()[1]
+        self._ring.append((timestamp, is_speech))
+        self._ring_voiced += is_speech
+
+    def _process_frame(self, frame, segments):
+        timestamp = self._timestamp
+        is_speech = self.vad.is_speech(frame, self.sample_rate)
+        self._timestamp += self.frame_duration
+        if self.padding_frames <= 0:
+            return
+
+        threshold = TRIGGER_RATIO * self.padding_frames
+        self._push(timestamp, is_speech)
+        if not self._triggered:
+            if self._ring_voiced > threshold:
+                self._triggered = True
+                self._segment_start = self._ring[0][0]
+                self._segment_end = timestamp + self.frame_duration
+                self._ring.clear()
+                self._ring_voiced = 0
+            return
+
+        self._segment_end = timestamp + self.frame_duration
+        if len(self._ring) - self._ring_voiced > threshold:
+            segments.append((self._segment_start, self._segment_end))
+            self._triggered = False
+            self._ring.clear()
+            self._ring_voiced = 0
+        elif self.max_segment_seconds and self._segment_end - self._segment_start >= self.max_segment_seconds:
+            # 끝나지 않는 긴 음성 구간은 잘라서 먼저 반환
+            segments.append((self._segment_start, self._segment_end))
+            self._segment_start = self._segment_end
+
+    def feed(self, pcm):
+        """PCM 조각을 추가하고 새로 끝난 음성 구간 (시작, 끝) 목록을 반환"""
+        pcm = _as_pcm_array(pcm)
+        self._pending = np.concatenate([self._pending, pcm]) if len(self._pending) else pcm
+        segments = []
+        frame_bytes = self.frame_samples * 2
+        # 기존 frame_generator처럼 뒤에 샘플이 더 있는 프레임만 처리 (마지막 프레임 제외 규칙 유지)
+        num_frames = frame_count(len(self._pending), self.frame_samples)
+        if num_frames:
+            frames = memoryview(np.ascontiguousarray(self._pending[:num_frames * self.frame_samples])).cast('B')
+            for i in range(num_frames):
+                self._process_frame(frames[i * frame_bytes:(i + 1) * frame_bytes], segments)
+            self._pending = self._pending[num_frames * self.frame_samples:].copy()
+        return segments
+
+    def flush(self):
+        """입력이 끝났을 때 진행 중인 음성 구간을 반환"""
+        segments = []
+        if self._triggered:
+            segments.append((self._segment_start, self._segment_end))
+            self._triggered = False
+        self._pending = np.empty(0, dtype=np.int16)
+        return segments